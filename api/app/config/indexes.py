@@ -0,0 +1,121 @@
+"""Declare the MongoDB indexes the application relies on and apply them at startup.
+
+``INDEXES`` is the single source of truth. ``ensure_indexes`` creates anything
+missing and reports drift (a registered index whose definition differs in the
+database, or indexes nobody registered) without dropping anything, so a
+mismatch is visible in the logs instead of being silently "fixed".
+"""
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from .mongo import CHAT_MESSAGES, CHATS, TOKENS, get_collection
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    TOKENS: [
+        IndexModel([("userId", ASCENDING)], name="userId_unique", unique=True),
+    ],
+    CHATS: [
+        IndexModel([("userId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+                   name="userId_createdAt"),
+        # Search is always scoped to one user, so userId prefixes the text index.
+        IndexModel([("userId", ASCENDING), ("name", TEXT), ("code.html", TEXT), ("code.css", TEXT), ("code.js", TEXT)],
+                   name="userId_text", weights={"name": 10, "code.html": 2}),
+    ],
+    CHAT_MESSAGES: [
+        IndexModel([("chatId", ASCENDING), ("bucket", ASCENDING)], name="chatId_bucket", unique=True),
+        IndexModel([("chatId", ASCENDING), ("messages.id", ASCENDING)], name="chatId_messageId"),
+        IndexModel([("userId", ASCENDING), ("messages.content", TEXT)], name="userId_text"),
+    ],
+}
+
+# Options compared when checking a registered index against the database.
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "weights")
+
+
+def _spec(document: dict) -> dict:
+    # The server may report directions as floats (1.0); normalise before comparing.
+    # It also describes a text index by ``_fts``/``_ftsx`` keys plus the weight
+    # of every text field (1 unless given), so declared text fields are
+    # rewritten the same way.
+    key, weights = [], None
+    for field, direction in dict(document["key"]).items():
+        if direction == TEXT and field != "_fts":
+            weights = {**(weights or {}), field: 1}
+            if ("_fts", TEXT) not in key:
+                key += [("_fts", TEXT), ("_ftsx", 1)]
+        else:
+            key.append((field, int(direction) if isinstance(direction, (int, float)) else direction))
+    spec = {"key": key}
+    spec.update({option: document[option] for option in _COMPARED_OPTIONS if option in document})
+    if weights is not None or "weights" in spec:
+        spec["weights"] = {field: int(weight) for field, weight in {**(weights or {}), **spec.get("weights", {})}.items()}
+    return spec
+
+
+async def ensure_indexes() -> dict:
+    """Create missing registered indexes and report drift.
+
+    Returns:
+        dict: ``created``, ``drift`` and ``unmanaged`` lists of
+        ``"collection.index"`` names.
+    """
+    report = {"created": [], "drift": [], "unmanaged": []}
+
+    for collection_name, models in INDEXES.items():
+        collection = get_collection(collection_name)
+        existing = {index["name"]: index for index in await collection.list_indexes().to_list(length=None)}
+
+        for model in models:
+            wanted = model.document
+            name = wanted["name"]
+            label = f"{collection_name}.{name}"
+            current = existing.pop(name, None)
+
+            if current is None:
+                try:
+                    await collection.create_indexes([model])
+                    report["created"].append(label)
+                    logger.info("Created index %s", label)
+                except OperationFailure as e:
+                    report["drift"].append(label)
+                    logger.error("Could not create index %s: %s", label, e)
+            elif _spec(current) != _spec(wanted):
+                report["drift"].append(label)
+                logger.warning("Index %s differs from the registry: %s != %s",
+                               label, _spec(current), _spec(wanted))
+
+        for name in existing:
+            if name != "_id_":
+                report["unmanaged"].append(f"{collection_name}.{name}")
+                logger.warning("Index %s.%s is not in the registry", collection_name, name)
+
+    return report
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for child in plan.get("inputStages", []) + [plan[key] for key in ("inputStage", "queryPlan") if key in plan]:
+        yield from _stages(child)
+
+
+async def explain_hot_queries() -> Dict[str, List[str]]:
+    """Explain the per-request queries and return the winning plan's stages for each.
+
+    A healthy plan contains ``IXSCAN`` and no ``COLLSCAN``.
+    """
+    queries = {
+        "tokens.find_one(userId)": get_collection(TOKENS).find({"userId": "explain"}).limit(1),
+        "chats.find(userId).sort(createdAt)": get_collection(CHATS).find(
+            {"userId": "explain"}, {"name": 1, "createdAt": 1}
+        ).sort([("createdAt", DESCENDING), ("_id", DESCENDING)]),
+    }
+    plans = {}
+    for label, cursor in queries.items():
+        explanation = await cursor.explain()
+        plans[label] = [stage for stage in _stages(explanation["queryPlanner"]["winningPlan"]) if stage]
+    return plans
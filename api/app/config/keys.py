@@ -1,11 +1,39 @@
+"""Generate and load the RSA key pair that wraps the token data key.
+
+Run ``python -m app.config.keys`` to write a fresh ``private.pem``/``public.pem``
+pair into the working directory.
+"""
+import os
+from typing import Tuple
+
 from Crypto.PublicKey import RSA
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PUBLIC_KEY_PATH = os.getenv("PUBLIC_KEY_PATH", "public.pem")
+PRIVATE_KEY_PATH = os.getenv("PRIVATE_KEY_PATH", "private.pem")
+
+
+def generate_keys(public_path: str = PUBLIC_KEY_PATH, private_path: str = PRIVATE_KEY_PATH) -> None:
+    """Write a new 2048-bit RSA key pair to disk."""
+    key = RSA.generate(2048)
+
+    with open(private_path, "wb") as f:
+        f.write(key.export_key())
+
+    with open(public_path, "wb") as f:
+        f.write(key.publickey().export_key())
+
 
-key = RSA.generate(2048)
-private_key = key.export_key()
-public_key = key.publickey().export_key()
+def load_keys() -> Tuple[RSA.RsaKey, RSA.RsaKey]:
+    """Read the RSA key pair from disk and return ``(public_key, private_key)``."""
+    with open(PUBLIC_KEY_PATH) as f:
+        public_key = RSA.import_key(f.read())
+    with open(PRIVATE_KEY_PATH) as f:
+        private_key = RSA.import_key(f.read())
+    return public_key, private_key
 
-with open("private.pem", "wb") as f:
-    f.write(private_key)
 
-with open("public.pem", "wb") as f:
-    f.write(public_key)
+if __name__ == "__main__":
+    generate_keys()
@@ -1,40 +1,143 @@
-"""Connect securely to MongoDB Atlas and export collections."""
+"""Manage the async MongoDB client and expose the application's collections.
+
+The client is created in the application's lifespan hook (see ``app.main``)
+instead of at import time, so importing this module never touches the network.
+"""
 import os
 import logging
-from pymongo import MongoClient
-from pymongo.errors import ConfigurationError, ServerSelectionTimeoutError
+from typing import Optional
+
 import certifi
 from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.errors import ConfigurationError, PyMongoError
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-def verify_connection():
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB = os.getenv("MONGO_DB", "chat_db")
+MONGO_TLS = os.getenv("MONGO_TLS", "true").lower() == "true"
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+
+CHATS = "chats"
+TOKENS = "tokens"
+KEYS = "keys"
+CHAT_MESSAGES = "chat_messages"
+CODE_BLOBS = "code_blobs"
+
+client: Optional[AsyncIOMotorClient] = None
+db: Optional[AsyncIOMotorDatabase] = None
+
+
+class _PoolCounters(monitoring.ConnectionPoolListener):
+    """Count pooled connections from pymongo's connection pool events."""
+
+    def __init__(self):
+        self.created = 0
+        self.in_use = 0
+        self.checkout_failures = 0
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def connection_created(self, event):
+        self.created += 1
+
+    def connection_closed(self, event):
+        self.created -= 1
+
+    def connection_checked_out(self, event):
+        self.in_use += 1
+
+    def connection_checked_in(self, event):
+        self.in_use -= 1
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+
+_pool_counters = _PoolCounters()
+
+
+def _create_client(uri: str):
+    """Create a Motor client, or an in-memory stand-in for ``mongomock://`` URIs."""
+    if uri.startswith("mongomock://"):
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()
+
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [_pool_counters],
+    }
+    if MONGO_TLS:
+        options.update(tls=True, tlsCAFile=certifi.where())
+    return AsyncIOMotorClient(uri, **options)
+
+
+async def connect_mongo() -> None:
+    """Open the connection pool and verify the server is reachable."""
+    global client, db
+    if client is not None:
+        return
+
+    if not MONGO_URI:
+        raise ConfigurationError("MONGO_URI not found in environment variables.")
+
+    client = _create_client(MONGO_URI)
+    db = client[MONGO_DB]
     try:
-        client.admin.command("ping")
+        await client.admin.command("ping")
         logger.info("Connected to MongoDB successfully.")
-    except Exception as e:
-        logger.error("MongoDB connection failed:", str(e))
+    except PyMongoError as e:
+        logger.error("MongoDB connection error: %s", e)
+        close_mongo()
+        raise RuntimeError("Failed to connect securely to MongoDB.") from e
 
-try:
-    uri = os.getenv("MONGO_URI")
-    if not uri:
-        raise ConfigurationError("MONGO_URI not found in environment variables.")
-    
-    client = MongoClient(
-        uri,
-        tls=True,
-        tlsCAFile=certifi.where(),
-        serverSelectionTimeoutMS=5000
-    )
-
-    verify_connection() 
-
-except (ConfigurationError, ServerSelectionTimeoutError) as e:
-    logger.error(f"MongoDB connection error: {e}")
-    raise RuntimeError("Failed to connect securely to MongoDB.")
-
-db = client["chat_db"]
-chatsCollection = db["chats"]
-tokensCollection = db["tokens"]
+
+def close_mongo() -> None:
+    """Close the connection pool, if one is open."""
+    global client, db
+    if client is not None:
+        client.close()
+        logger.info("MongoDB connection closed.")
+    client = None
+    db = None
+
+
+async def ping_mongo() -> None:
+    """Round-trip to the server; raises if it is unreachable."""
+    if client is None:
+        raise RuntimeError("MongoDB is not connected; call connect_mongo() first.")
+    await client.admin.command("ping")
+
+
+def get_collection(name: str) -> AsyncIOMotorCollection:
+    """Return a collection from the connected database."""
+    if db is None:
+        raise RuntimeError("MongoDB is not connected; call connect_mongo() first.")
+    return db[name]
+
+
+def pool_stats() -> dict:
+    """Report how many pooled connections exist and how many are checked out."""
+    if client is None:
+        return {"connected": False}
+    return {
+        "connected": True,
+        "max_connections": MONGO_MAX_POOL_SIZE,
+        "created": _pool_counters.created,
+        "in_use": _pool_counters.in_use,
+        "idle": _pool_counters.created - _pool_counters.in_use,
+        "checkout_failures": _pool_counters.checkout_failures,
+    }
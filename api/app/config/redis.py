@@ -0,0 +1,98 @@
+"""Manage the process-wide async Redis connection pool.
+
+One pool is created in the application's lifespan hook and shared by every
+request, so chat turns reuse warm connections instead of paying a TCP + TLS
+handshake each time.
+"""
+import os
+import logging
+from typing import Optional
+
+from dotenv import load_dotenv
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import RedisError
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:8009/0")
+REDIS_TOKEN = os.getenv("REDIS_TOKEN")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+
+pool: Optional[ConnectionPool] = None
+client: Optional[Redis] = None
+
+
+def _create_client(url: str) -> Redis:
+    """Create a pooled client, or an in-memory stand-in for ``fakeredis://`` URLs."""
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        return fakeredis.FakeAsyncRedis()
+
+    options = {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+    }
+    if REDIS_TOKEN:
+        options["password"] = REDIS_TOKEN
+    return Redis(connection_pool=ConnectionPool.from_url(url, **options))
+
+
+async def connect_redis() -> None:
+    """Create the shared pool and verify the server is reachable."""
+    global pool, client
+    if client is not None:
+        return
+
+    client = _create_client(REDIS_URL)
+    pool = client.connection_pool
+    try:
+        await client.ping()
+        logger.info("Connected to Redis successfully.")
+    except RedisError as e:
+        logger.error("Redis connection error: %s", e)
+        await close_redis()
+        raise RuntimeError("Failed to connect to Redis.") from e
+
+
+async def close_redis() -> None:
+    """Disconnect every pooled connection, if the pool is open."""
+    global pool, client
+    if pool is not None:
+        await pool.disconnect()
+        logger.info("Redis connection pool closed.")
+    pool = None
+    client = None
+
+
+async def ping_redis() -> None:
+    """Round-trip to the server; raises if it is unreachable."""
+    await get_redis().ping()
+
+
+def get_redis() -> Redis:
+    """Return the shared Redis client."""
+    if client is None:
+        raise RuntimeError("Redis is not connected; call connect_redis() first.")
+    return client
+
+
+def pool_stats() -> dict:
+    """Report how many pooled connections exist and how many are checked out."""
+    if pool is None:
+        return {"connected": False}
+    idle = len(pool._available_connections)
+    in_use = len(pool._in_use_connections)
+    return {
+        "connected": True,
+        "max_connections": pool.max_connections,
+        "created": idle + in_use,
+        "in_use": in_use,
+        "idle": idle,
+    }
@@ -1,9 +1,99 @@
 """ Main file for the FastAPI application. """
+import os
+import signal
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import Hello,Chat
+from .config.mongo import connect_mongo, close_mongo
+from .config.indexes import ensure_indexes
+from .config.redis import connect_redis, close_redis
+from .services.chat import drain_background_tasks, preload_llm
+from .services.crypto import init_crypto
+from .services.limiter import llm_limiter
+from .services.metrics import MetricsMiddleware
+from .services.reconciler import HISTORY_RECONCILE_INTERVAL, run_reconciler
+from .utils.compression import CompressionMiddleware
+from .utils.responses import FastJSONResponse
+from .routers import Hello,Chat,Stats
+
+
+# Seconds to let in-flight generations and their saves finish on shutdown.
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", 30))
+# Seconds /ready reports "draining" after SIGTERM before uvicorn stops accepting
+# connections, so load balancers take the worker out of rotation first. Give it
+# at least one readiness probe period.
+SHUTDOWN_PRESTOP_DELAY = float(os.getenv("SHUTDOWN_PRESTOP_DELAY", 5))
+# Load LangChain and the Gemini SDK in the background once the worker is up,
+# instead of on the first chat turn. Startup itself never waits for it.
+PRELOAD_LLM = os.getenv("PRELOAD_LLM", "true").lower() == "true"
+
+
+def _drain_on_sigterm(app: FastAPI):
+    """Report draining as soon as SIGTERM arrives, then pass it to the previous handler.
+
+    The previous handler (uvicorn's, which stops accepting connections) runs
+    ``SHUTDOWN_PRESTOP_DELAY`` seconds later, or at once on a second SIGTERM.
+    Returns the replaced handler, or None outside the main thread, where
+    signal handlers cannot be installed.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    loop = asyncio.get_running_loop()
+    # None means a handler installed outside Python; treat it as the default.
+    previous = signal.getsignal(signal.SIGTERM) or signal.SIG_DFL
+
+    def hand_over(signum, frame):
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            signal.signal(signum, previous)
+            signal.raise_signal(signum)
+
+    def handle(signum, frame):
+        delay = 0 if app.state.draining else SHUTDOWN_PRESTOP_DELAY
+        app.state.draining = True
+        loop.call_soon_threadsafe(loop.call_later, delay, hand_over, signum, frame)
 
-app = FastAPI()
+    signal.signal(signal.SIGTERM, handle)
+    return previous
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients on startup and release them on shutdown.
+
+    Runs once per worker process, so every worker gets its own pools. On
+    SIGTERM the worker reports not ready for ``SHUTDOWN_PRESTOP_DELAY``
+    seconds before uvicorn stops accepting connections and gives open requests
+    its graceful timeout. Shutdown then lets LLM calls and saves that outlived
+    their requests finish (up to ``SHUTDOWN_DRAIN_TIMEOUT``) and closes the clients.
+    """
+    app.state.draining = False
+    await connect_mongo()
+    await ensure_indexes()
+    await init_crypto()
+    await connect_redis()
+    app.state.preload = asyncio.create_task(preload_llm()) if PRELOAD_LLM else None
+    reconciler = asyncio.create_task(run_reconciler()) if HISTORY_RECONCILE_INTERVAL > 0 else None
+    previous_sigterm = _drain_on_sigterm(app)
+    try:
+        yield
+    finally:
+        app.state.draining = True
+        if previous_sigterm is not None:
+            signal.signal(signal.SIGTERM, previous_sigterm)
+        if reconciler is not None:
+            reconciler.cancel()
+        await llm_limiter.drain(SHUTDOWN_DRAIN_TIMEOUT)
+        await drain_background_tasks(SHUTDOWN_DRAIN_TIMEOUT)
+        await close_redis()
+        close_mongo()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 origins=[
     "*"
@@ -14,8 +104,15 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"]
 )
 
+app.add_middleware(CompressionMiddleware)
+
+# Added last so it wraps compression and CORS too and times every request end to end.
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(Hello)
 app.include_router(Chat)
+app.include_router(Stats)
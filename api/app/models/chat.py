@@ -1,6 +1,6 @@
 from uuid import uuid4
 from datetime import datetime
-from typing import List, Optional
+from typing import Optional
 from enum import Enum
 from pydantic import BaseModel, Field
 
@@ -63,6 +63,21 @@ class MessageType(str, Enum):
     AI = "ai"
     USER = "user"
 
+class CodeSnapshot(BaseModel):
+    """Identifies a version of a chat's code by the content hashes of its sections.
+
+    Args:
+        BaseModel: Pydantic's base class for data validation and settings management.
+
+    Attributes:
+        html (str): SHA-256 of the HTML section, the id of its blob in code_blobs.
+        css (str): SHA-256 of the CSS section.
+        js (str): SHA-256 of the JavaScript section.
+    """
+    html: str
+    css: str
+    js: str
+
 class Message(BaseModel):
     """Represents a single message in a chat conversation.
 
@@ -73,10 +88,14 @@ class Message(BaseModel):
         id (str): Unique identifier for the message, generated as a UUID.
         type (MessageType): Type of the message, either from the user or the AI.
         content (str): The actual content of the message.
+        partial (bool): True when the AI response stream was cut off before it finished.
+        snapshot (Optional[CodeSnapshot]): On AI messages, the chat's code after this turn.
     """
     id: str = Field(default_factory=lambda: uuid4().hex)
     type: MessageType = Field(default=MessageType.USER)
     content: str = Field(default="")
+    partial: bool = Field(default=False)
+    snapshot: Optional[CodeSnapshot] = None
 
 class Code(BaseModel):
     """Represents code snippets (HTML, CSS, JS) that can be associated with a chat or response.
@@ -101,13 +120,14 @@ class Chat(BaseModel):
 
     Attributes:
         userId (str): Identifier for the user participating in the chat.
-        messages (List[Message]): List of messages exchanged in the chat.
+        messageCount (int): Number of messages exchanged in the chat; the messages
+            themselves are stored in buckets in the chat_messages collection.
         name (str): Name or title of the chat session.
         code (Optional[Code]): Optional code snippets (HTML, CSS, JS) attached to the chat.
         createdAt (datetime): Timestamp of when the chat was created.
     """
     userId: str
-    messages: List[Message] = []
+    messageCount: int = Field(default=0)
     name: str = Field(default="New Chat")
     code: Code = Field(default_factory=Code)
     createdAt: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,153 @@
+"""Async data access for the chats collection."""
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import DESCENDING, ReturnDocument
+
+from ..config.mongo import CHATS, get_collection
+
+
+LISTING_PROJECTION = {"name": 1, "createdAt": 1}
+
+
+async def find_chats_by_user_id(
+    user_id: str,
+    limit: Optional[int] = None,
+    after: Optional[Tuple[datetime, ObjectId]] = None,
+) -> List[dict]:
+    """Return a user's chats, newest first, with only the listing fields.
+
+    Args:
+        user_id (str): Owner of the chats.
+        limit (Optional[int]): Maximum number of chats to return; all if None.
+        after (Optional[Tuple[datetime, ObjectId]]): ``(createdAt, _id)`` of the
+            last chat on the previous page; only older chats are returned.
+    """
+    query = {"userId": user_id}
+    if after is not None:
+        created_at, chat_id = after
+        query["$or"] = [
+            {"createdAt": {"$lt": created_at}},
+            {"createdAt": created_at, "_id": {"$lt": chat_id}},
+        ]
+
+    cursor = get_collection(CHATS).find(query, LISTING_PROJECTION).sort(
+        [("createdAt", DESCENDING), ("_id", DESCENDING)]
+    )
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return await cursor.to_list(length=None)
+
+
+async def find_chat_by_id(chat_id: ObjectId) -> Optional[dict]:
+    """Return a single chat document, or None if it does not exist."""
+    return await get_collection(CHATS).find_one({"_id": chat_id})
+
+
+async def find_chat_metadata(chat_id: ObjectId, include_code: bool = True) -> Optional[dict]:
+    """Return a chat without any embedded messages.
+
+    Chats that still embed their messages (stored before bucketing) have no
+    ``messageCount`` field in the result.
+    """
+    projection = {"messages": 0}
+    if not include_code:
+        projection["code"] = 0
+    return await get_collection(CHATS).find_one({"_id": chat_id}, projection)
+
+
+async def find_chat_for_turn(chat_id: ObjectId) -> Optional[dict]:
+    """Return the fields a new turn needs: the chat's code and message count."""
+    return await get_collection(CHATS).find_one({"_id": chat_id}, {"code": 1, "messageCount": 1})
+
+
+async def record_turn(chat_id: ObjectId, fields: dict, rename_from: str, rename_to: str) -> Optional[dict]:
+    """Count a user/AI message pair in one atomic update and return the new name, count and code, plus the owner.
+
+    ``fields`` are set as given (e.g. ``{"code.html": ...}``) and the chat is
+    renamed to ``rename_to`` only if it is still called ``rename_from``. Only
+    bucketed chats are matched; None means the chat is gone or not migrated.
+    """
+    stage = {f: {"$literal": value} for f, value in fields.items()}
+    stage["messageCount"] = {"$add": ["$messageCount", 2]}
+    stage["name"] = {"$cond": [{"$eq": ["$name", rename_from]}, {"$literal": rename_to}, "$name"]}
+    return await get_collection(CHATS).find_one_and_update(
+        {"_id": chat_id, "messageCount": {"$exists": True}},
+        [{"$set": stage}],
+        projection={"userId": 1, "name": 1, "messageCount": 1, "code": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def undo_turn(chat_id: ObjectId, message_count: int, fields: dict) -> bool:
+    """Take back the turn that brought a chat to ``message_count`` messages.
+
+    The count drops by 2 and ``fields`` are set as given, but only while the
+    chat still has ``message_count`` messages, i.e. no later turn has been
+    counted since. Returns whether the turn was taken back.
+    """
+    result = await get_collection(CHATS).update_one(
+        {"_id": chat_id, "messageCount": message_count},
+        {"$set": {**fields, "messageCount": message_count - 2}},
+    )
+    return result.modified_count == 1
+
+
+async def mark_bucketed(chat_id: ObjectId, message_count: int) -> None:
+    """Drop a migrated chat's embedded messages and record how many it had."""
+    await get_collection(CHATS).update_one(
+        {"_id": chat_id, "messageCount": {"$exists": False}},
+        {"$set": {"messageCount": message_count}, "$unset": {"messages": ""}},
+    )
+
+
+async def iter_unbucketed_chat_ids(batch_size: int) -> AsyncIterator[ObjectId]:
+    """Stream the ids of chats that still embed their messages."""
+    cursor = get_collection(CHATS).find(
+        {"messageCount": {"$exists": False}}, {"_id": 1}
+    ).batch_size(batch_size)
+    async for chat in cursor:
+        yield chat["_id"]
+
+
+async def find_existing_chat_ids(chat_ids: List[ObjectId]) -> Set[ObjectId]:
+    """Return which of the given chat ids still exist."""
+    cursor = get_collection(CHATS).find({"_id": {"$in": chat_ids}}, {"_id": 1})
+    return {chat["_id"] async for chat in cursor}
+
+
+async def find_chat_owners(chat_ids: List[ObjectId]) -> Dict[ObjectId, str]:
+    """Return the ``userId`` of each of the given chats that still exists."""
+    cursor = get_collection(CHATS).find({"_id": {"$in": chat_ids}}, {"userId": 1})
+    return {chat["_id"]: chat["userId"] async for chat in cursor}
+
+
+async def find_chat_names(user_id: str, chat_ids: List[ObjectId]) -> Dict[ObjectId, str]:
+    """Return the names of those of the given chats that belong to ``user_id``."""
+    cursor = get_collection(CHATS).find({"_id": {"$in": chat_ids}, "userId": user_id}, {"name": 1})
+    return {chat["_id"]: chat["name"] async for chat in cursor}
+
+
+async def find_chat_code(chat_id: ObjectId) -> Optional[dict]:
+    """Return only a chat's code, or None if the chat does not exist."""
+    chat = await get_collection(CHATS).find_one({"_id": chat_id}, {"code": 1})
+    return chat.get("code", {}) if chat else None
+
+
+async def insert_chat(chat: dict) -> ObjectId:
+    """Insert a new chat document and return its id."""
+    result = await get_collection(CHATS).insert_one(chat)
+    return result.inserted_id
+
+
+async def update_chat_by_id(chat_id: ObjectId, update: dict) -> int:
+    """Apply an update to a chat and return the number of matched documents."""
+    result = await get_collection(CHATS).update_one({"_id": chat_id}, update)
+    return result.matched_count
+
+
+async def delete_chat_by_id(chat_id: ObjectId) -> int:
+    """Delete a chat and return the number of deleted documents."""
+    result = await get_collection(CHATS).delete_one({"_id": chat_id})
+    return result.deleted_count
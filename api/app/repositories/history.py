@@ -0,0 +1,77 @@
+"""Async data access for the Redis chat histories.
+
+A chat's history is a list at ``chat_history:<chat_id>``. Once it is windowed,
+a rolling summary is also kept at ``chat_history:<chat_id>:summary``.
+"""
+import os
+from typing import AsyncIterator, Dict, List
+
+from dotenv import load_dotenv
+from redis.exceptions import ResponseError
+
+from ..config.redis import get_redis
+
+load_dotenv()
+
+HISTORY_PREFIX = "chat_history:"
+SUMMARY_SUFFIX = ":summary"
+# Histories untouched for this long expire; every new turn restarts the clock.
+HISTORY_TTL = int(os.getenv("HISTORY_TTL", 30 * 24 * 3600))
+
+
+def history_key(session_id: str) -> str:
+    return f"{HISTORY_PREFIX}{session_id}"
+
+
+def summary_key(session_id: str) -> str:
+    return f"{HISTORY_PREFIX}{session_id}{SUMMARY_SUFFIX}"
+
+
+def session_of(key: bytes) -> str:
+    """Return the session id a history or summary key belongs to."""
+    session_id = key.decode("utf-8")[len(HISTORY_PREFIX):]
+    if session_id.endswith(SUMMARY_SUFFIX):
+        session_id = session_id[:-len(SUMMARY_SUFFIX)]
+    return session_id
+
+
+async def delete_history(session_id: str) -> int:
+    """Delete a chat's history and summary; returns the number of keys removed."""
+    return await get_redis().unlink(history_key(session_id), summary_key(session_id))
+
+
+async def scan_history_keys(batch_size: int) -> AsyncIterator[List[bytes]]:
+    """Yield history and summary keys in batches of about ``batch_size`` using ``SCAN``."""
+    cursor = 0
+    while True:
+        cursor, keys = await get_redis().scan(cursor, match=f"{HISTORY_PREFIX}*", count=batch_size)
+        if keys:
+            yield keys
+        if cursor == 0:
+            return
+
+
+async def key_sizes(keys: List[bytes]) -> Dict[bytes, int]:
+    """Return the memory used by each key, in one pipelined round trip.
+
+    Falls back to the length of the key's ``DUMP`` where ``MEMORY USAGE`` is
+    not supported.
+    """
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.memory_usage(key)
+        try:
+            sizes = await pipe.execute()
+        except ResponseError:
+            for key in keys:
+                pipe.dump(key)
+            sizes = [len(dump) if dump else 0 for dump in await pipe.execute()]
+    return {key: size or 0 for key, size in zip(keys, sizes)}
+
+
+async def delete_keys(keys: List[bytes]) -> int:
+    """Delete keys in one pipelined round trip; returns how many existed."""
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.unlink(key)
+        return sum(await pipe.execute())
@@ -0,0 +1,16 @@
+"""Async data access for the keys collection, which holds wrapped data keys."""
+from typing import Optional
+
+from ..config.mongo import KEYS, get_collection
+
+
+async def find_key(key_id: str) -> Optional[dict]:
+    """Return a wrapped key record, or None."""
+    return await get_collection(KEYS).find_one({"_id": key_id})
+
+
+async def insert_key_if_absent(key_id: str, wrapped_key: str) -> None:
+    """Store a wrapped key unless another process already stored one."""
+    await get_collection(KEYS).update_one(
+        {"_id": key_id}, {"$setOnInsert": {"wrappedKey": wrapped_key}}, upsert=True
+    )
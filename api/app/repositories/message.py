@@ -0,0 +1,152 @@
+"""Async data access for the chat_messages collection.
+
+Messages live outside the chat document, in buckets of ``CHAT_BUCKET_SIZE``
+messages per ``(chatId, bucket)`` document, so appending a turn rewrites one
+small bucket instead of an ever-growing chat. Every stored message carries
+``seq``, its zero-based position in the chat, and lives in bucket
+``seq // CHAT_BUCKET_SIZE``. Buckets also carry the chat's ``userId``, which
+scopes the text index searches run against.
+"""
+import os
+from itertools import groupby
+from typing import AsyncIterator, List, Optional
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+from ..config.mongo import CHAT_MESSAGES, get_collection
+
+load_dotenv()
+
+CHAT_BUCKET_SIZE = int(os.getenv("CHAT_BUCKET_SIZE", 100))
+
+
+def bucket_of(seq: int) -> int:
+    return seq // CHAT_BUCKET_SIZE
+
+
+def _by_bucket(messages: List[dict]):
+    return groupby(messages, key=lambda message: bucket_of(message["seq"]))
+
+
+async def append_messages(chat_id: ObjectId, user_id: str, first_seq: int, messages: List[dict]) -> None:
+    """Store messages at consecutive positions starting at ``first_seq``.
+
+    Buckets keep their messages sorted by ``seq``, so turns appended
+    concurrently still read back in order.
+    """
+    numbered = [{**message, "seq": first_seq + offset} for offset, message in enumerate(messages)]
+    for bucket, items in _by_bucket(numbered):
+        items = list(items)
+        query = {"chatId": chat_id, "bucket": bucket}
+        update = {
+            "$push": {"messages": {"$each": items, "$sort": {"seq": 1}}},
+            "$inc": {"count": len(items)},
+            "$set": {"userId": user_id},
+        }
+        try:
+            await get_collection(CHAT_MESSAGES).update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # Two turns opened the bucket at once and the other inserted it
+            # first; it exists now, so the retry updates it.
+            await get_collection(CHAT_MESSAGES).update_one(query, update, upsert=True)
+
+
+async def insert_messages(chat_id: ObjectId, user_id: str, messages: List[dict]) -> None:
+    """Write a chat's full message list into the buckets it does not have yet.
+
+    Existing buckets are left alone, so a repeated or concurrent run never
+    overwrites messages appended after an earlier run wrote the bucket.
+    """
+    numbered = [{**message, "seq": seq} for seq, message in enumerate(messages)]
+    for bucket, items in _by_bucket(numbered):
+        items = list(items)
+        try:
+            await get_collection(CHAT_MESSAGES).update_one(
+                {"chatId": chat_id, "bucket": bucket},
+                {"$setOnInsert": {"userId": user_id, "count": len(items), "messages": items}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            pass  # A concurrent run inserted it first.
+
+
+async def find_messages(chat_id: ObjectId, start: int, end: int) -> List[dict]:
+    """Return the messages with ``start <= seq < end``, oldest first."""
+    if end <= start:
+        return []
+
+    cursor = get_collection(CHAT_MESSAGES).find(
+        {"chatId": chat_id, "bucket": {"$gte": bucket_of(start), "$lte": bucket_of(end - 1)}},
+        {"messages": 1},
+    ).sort("bucket", 1)
+
+    messages = []
+    async for bucket in cursor:
+        messages.extend(
+            {field: value for field, value in message.items() if field != "seq"}
+            for message in bucket["messages"]
+            if start <= message["seq"] < end
+        )
+    return messages
+
+
+async def find_message_seq(chat_id: ObjectId, message_id: str) -> Optional[int]:
+    """Return the position of a message in its chat, or None if it is not there."""
+    bucket = await get_collection(CHAT_MESSAGES).find_one(
+        {"chatId": chat_id, "messages.id": message_id},
+        {"messages.id": 1, "messages.seq": 1},
+    )
+    if not bucket:
+        return None
+    return next(message["seq"] for message in bucket["messages"] if message["id"] == message_id)
+
+
+async def find_snapshots(chat_id: ObjectId) -> List[dict]:
+    """Return ``id``, ``seq`` and ``snapshot`` of every message that has a code snapshot, oldest first."""
+    cursor = get_collection(CHAT_MESSAGES).find(
+        {"chatId": chat_id, "messages.snapshot": {"$type": "object"}},
+        {"messages.id": 1, "messages.seq": 1, "messages.snapshot": 1},
+    ).sort("bucket", 1)
+    return [message async for bucket in cursor for message in bucket["messages"] if message.get("snapshot")]
+
+
+async def find_message_snapshot(chat_id: ObjectId, message_id: str) -> Optional[dict]:
+    """Return the code snapshot linked from a message, or None if it has none."""
+    bucket = await get_collection(CHAT_MESSAGES).find_one(
+        {"chatId": chat_id, "messages.id": message_id},
+        {"messages.id": 1, "messages.snapshot": 1},
+    )
+    if not bucket:
+        return None
+    return next(message.get("snapshot") for message in bucket["messages"] if message["id"] == message_id)
+
+
+async def iter_ownerless_chat_ids(batch_size: int) -> AsyncIterator[List[ObjectId]]:
+    """Yield, in batches, the ids of chats with buckets stored before buckets carried ``userId``."""
+    cursor = get_collection(CHAT_MESSAGES).find(
+        {"userId": {"$exists": False}}, {"chatId": 1}
+    ).batch_size(batch_size)
+    batch = set()
+    async for bucket in cursor:
+        batch.add(bucket["chatId"])
+        if len(batch) >= batch_size:
+            yield list(batch)
+            batch = set()
+    if batch:
+        yield list(batch)
+
+
+async def set_owner(chat_id: ObjectId, user_id: str) -> int:
+    """Record the chat's owner on each of its buckets and return how many were updated."""
+    result = await get_collection(CHAT_MESSAGES).update_many(
+        {"chatId": chat_id, "userId": {"$exists": False}}, {"$set": {"userId": user_id}}
+    )
+    return result.modified_count
+
+
+async def delete_messages(chat_id: ObjectId) -> int:
+    """Delete every bucket of a chat and return how many were removed."""
+    result = await get_collection(CHAT_MESSAGES).delete_many({"chatId": chat_id})
+    return result.deleted_count
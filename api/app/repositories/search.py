@@ -0,0 +1,87 @@
+"""Full-text search over a user's chats and message buckets.
+
+Both collections have a ``userId``-prefixed text index (see
+``config.indexes``), so every query is scoped to one user and ranked by
+``textScore``. Snippets are cut on the server: a hit returns a few hundred
+characters around the first query term instead of the chat's code or a
+bucket's messages.
+"""
+from typing import List
+
+from ..config.mongo import CHAT_MESSAGES, CHATS, get_collection
+
+# Chat fields that can be searched, with the aggregation path of each.
+CHAT_FIELDS = {"name": "$name", "html": "$code.html", "css": "$code.css", "js": "$code.js"}
+
+
+def snippet_expression(text, terms: List[str], chars: int) -> dict:
+    """Aggregation expression for up to ``chars`` characters of ``text`` around
+    the earliest of ``terms`` it contains (case-insensitively), or null.
+
+    ``terms`` must be lower case.
+    """
+    text = {"$ifNull": [text, ""]}
+    positions = {"$map": {"input": {"$literal": terms}, "as": "term",
+                          "in": {"$indexOfCP": ["$$lowered", "$$term"]}}}
+    first = {"$min": {"$filter": {"input": positions, "cond": {"$gte": ["$$this", 0]}}}}
+    return {"$let": {
+        "vars": {"lowered": {"$toLower": text}},
+        "in": {"$let": {
+            "vars": {"at": {"$ifNull": [first, -1]}},
+            "in": {"$cond": [
+                {"$lt": ["$$at", 0]},
+                None,
+                {"$substrCP": [text, {"$max": [0, {"$subtract": ["$$at", chars // 4]}]}, chars]},
+            ]},
+        }},
+    }}
+
+
+def _ranked(user_id: str, query: str, limit: int) -> List[dict]:
+    # $text must be the first stage. Ranking and limiting come before any
+    # projection, so snippets are only cut for the ``limit`` documents kept.
+    return [
+        {"$match": {"userId": user_id, "$text": {"$search": query}}},
+        {"$sort": {"score": {"$meta": "textScore"}, "_id": -1}},
+        {"$limit": limit},
+    ]
+
+
+async def search_chats(user_id: str, query: str, terms: List[str], limit: int, snippet_chars: int) -> List[dict]:
+    """Return the best ``limit`` chats matching ``query`` by name or code.
+
+    Each result has ``_id``, ``name``, ``score`` and ``snippets``: one per
+    field in ``CHAT_FIELDS``, null where the field contains none of ``terms``.
+    """
+    pipeline = _ranked(user_id, query, limit) + [
+        {"$project": {
+            "name": 1,
+            "score": {"$meta": "textScore"},
+            "snippets": {field: snippet_expression(path, terms, snippet_chars) for field, path in CHAT_FIELDS.items()},
+        }},
+    ]
+    return await get_collection(CHATS).aggregate(pipeline).to_list(length=None)
+
+
+async def search_messages(user_id: str, query: str, terms: List[str], limit: int,
+                          snippet_chars: int, per_bucket: int) -> List[dict]:
+    """Return the best ``limit`` message buckets matching ``query``.
+
+    Each result has ``chatId``, ``score`` and ``messages``: up to
+    ``per_bucket`` of the bucket's messages containing one of ``terms``, as
+    ``id``, ``type``, ``seq`` and ``snippet``.
+    """
+    messages = {"$map": {"input": "$messages", "as": "message", "in": {
+        "id": "$$message.id",
+        "type": "$$message.type",
+        "seq": "$$message.seq",
+        "snippet": snippet_expression("$$message.content", terms, snippet_chars),
+    }}}
+    pipeline = _ranked(user_id, query, limit) + [
+        {"$project": {
+            "chatId": 1,
+            "score": {"$meta": "textScore"},
+            "messages": {"$slice": [{"$filter": {"input": messages, "cond": {"$ne": ["$$this.snippet", None]}}}, per_bucket]},
+        }},
+    ]
+    return await get_collection(CHAT_MESSAGES).aggregate(pipeline).to_list(length=None)
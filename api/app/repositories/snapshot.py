@@ -0,0 +1,36 @@
+"""Async data access for the code_blobs collection.
+
+Code snapshots are stored by content: each blob's ``_id`` is the SHA-256 of
+the section it holds, so a section that is identical across turns (or chats)
+is stored once. Blobs are immutable and never updated in place.
+"""
+from typing import Dict, Iterable, List, Set
+
+from pymongo.errors import BulkWriteError
+
+from ..config.mongo import CODE_BLOBS, get_collection
+
+_DUPLICATE_KEY = 11000
+
+
+async def find_existing_blob_ids(blob_ids: Iterable[str]) -> Set[str]:
+    """Return which of the given blob ids are already stored."""
+    cursor = get_collection(CODE_BLOBS).find({"_id": {"$in": list(blob_ids)}}, {"_id": 1})
+    return {blob["_id"] async for blob in cursor}
+
+
+async def insert_blobs(blobs: List[dict]) -> None:
+    """Insert blobs, ignoring any that were stored concurrently."""
+    if not blobs:
+        return
+    try:
+        await get_collection(CODE_BLOBS).insert_many(blobs, ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != _DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+
+
+async def find_blobs(blob_ids: Iterable[str]) -> Dict[str, dict]:
+    """Return the stored blobs with the given ids, keyed by id."""
+    cursor = get_collection(CODE_BLOBS).find({"_id": {"$in": list(blob_ids)}})
+    return {blob["_id"]: blob async for blob in cursor}
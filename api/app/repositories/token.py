@@ -0,0 +1,56 @@
+"""Async data access for the tokens collection."""
+from typing import AsyncIterator, List, Optional
+
+from pymongo import UpdateOne
+
+from ..config.mongo import TOKENS, get_collection
+
+
+async def find_token_by_user_id(user_id: str) -> Optional[dict]:
+    """Return the stored token record for a user, or None."""
+    return await get_collection(TOKENS).find_one({"userId": user_id})
+
+
+async def upsert_token_by_user_id(user_id: str, token: str, version: int) -> None:
+    """Create or replace the encrypted token for a user."""
+    await get_collection(TOKENS).update_one(
+        {"userId": user_id}, {"$set": {"token": token, "version": version}}, upsert=True
+    )
+
+
+async def replace_token_if_unchanged(user_id: str, old_token: str, token: str, version: int) -> bool:
+    """Re-encrypt a token in place unless it was changed concurrently."""
+    result = await get_collection(TOKENS).update_one(
+        {"userId": user_id, "token": old_token},
+        {"$set": {"token": token, "version": version}},
+    )
+    return result.modified_count == 1
+
+
+async def iter_tokens_below_version(version: int, batch_size: int) -> AsyncIterator[List[dict]]:
+    """Stream token records older than ``version`` in batches."""
+    cursor = get_collection(TOKENS).find(
+        {"$or": [{"version": {"$lt": version}}, {"version": {"$exists": False}}]},
+        {"userId": 1, "token": 1, "version": 1},
+    ).batch_size(batch_size)
+
+    batch = []
+    async for record in cursor:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def bulk_replace_tokens(updates: List[dict]) -> int:
+    """Apply ``{"_id", "old", "token", "version"}`` replacements; return how many changed."""
+    if not updates:
+        return 0
+    result = await get_collection(TOKENS).bulk_write([
+        UpdateOne({"_id": u["_id"], "token": u["old"]},
+                  {"$set": {"token": u["token"], "version": u["version"]}})
+        for u in updates
+    ], ordered=False)
+    return result.modified_count
@@ -1,4 +1,5 @@
 from .hello import router as Hello
 from .chat import router as Chat
+from .stats import router as Stats
 
-__all__ = ["Hello", "Chat"]
\ No newline at end of file
+__all__ = ["Hello", "Chat", "Stats"]
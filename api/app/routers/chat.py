@@ -1,9 +1,18 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from ..services.chat import get_chats_by_user_id, create_chat_by_user_id,\
-                            get_chat_by_id, delete_chat_by_id, \
-                            post_message_by_chat_id, rename_chat_by_id, get_token_by_user_id, save_token_by_user_id
-from ..services.gemini import get_ai_response
+                            get_chat_by_id, get_code_by_chat_id, delete_chat_by_id, \
+                            post_message_by_chat_id, stream_message_by_chat_id, rename_chat_by_id, get_token_by_user_id, save_token_by_user_id, \
+                            get_default_response, get_versions_by_chat_id, restore_version_by_chat_id, \
+                            get_preview_by_chat_id
+from ..services.preview import PREVIEW_CSP
+
+from ..services.search import search_chats_by_user_id
+from ..utils.compression import choose_encoding, encoded_etag, etag_match
+from ..utils.responses import FastJSONResponse
 
 from ..models.chat import Prompt,RenameRequest, CreateChatRequest, TokenRequest
 
@@ -21,12 +30,52 @@ async def save_token(user_id: str, body: TokenRequest):
     return await save_token_by_user_id(user_id, body.token)
 
 @router.get("/users/{user_id}/all", status_code=200)
-async def get_all_chats(user_id: str):
-    return await get_chats_by_user_id(user_id)
+async def get_all_chats(user_id: str,
+                        limit: Optional[int] = Query(None, ge=1, le=100),
+                        after: Optional[str] = None):
+    page = await get_chats_by_user_id(user_id, limit, after)
+    headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else None
+    return FastJSONResponse(page["chats"], headers=headers)
+
+@router.get("/users/{user_id}/search", status_code=200)
+async def search_chats(user_id: str, q: str = Query(..., min_length=1, max_length=200),
+                       limit: int = Query(20, ge=1, le=50), offset: int = Query(0, ge=0)):
+    return FastJSONResponse(await search_chats_by_user_id(user_id, q, limit, offset))
 
 @router.get("/{chat_id}", status_code=200)
-async def get_chat(chat_id: str):
-    return await get_chat_by_id(chat_id)
+async def get_chat(chat_id: str, limit: Optional[int] = Query(None, ge=1, le=1000),
+                   before: Optional[str] = None, include_code: bool = True):
+    return FastJSONResponse(await get_chat_by_id(chat_id, limit, before, include_code))
+
+@router.get("/{chat_id}/code", status_code=200)
+async def get_chat_code(chat_id: str, request: Request):
+    code, etag = await get_code_by_chat_id(chat_id)
+    held = etag_match(etag, request.headers.get("if-none-match"))
+    if held:
+        return Response(status_code=304, headers={"ETag": held})
+    return FastJSONResponse(code, headers={"ETag": etag})
+
+@router.get("/{chat_id}/preview", status_code=200)
+async def get_chat_preview(chat_id: str, request: Request):
+    etag, page = await get_preview_by_chat_id(chat_id, request.headers.get("if-none-match"))
+    # Always revalidate; with the ETag that costs a 304 and no rendering.
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding", "Content-Security-Policy": PREVIEW_CSP}
+    if page is None:
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+    coding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if coding in page.encoded:
+        return Response(page.encoded[coding], media_type="text/html",
+                        headers={**headers, "ETag": encoded_etag(etag, coding), "Content-Encoding": coding})
+    return Response(page.body, media_type="text/html", headers={**headers, "ETag": etag})
+
+@router.get("/{chat_id}/versions", status_code=200)
+async def get_versions(chat_id: str):
+    return FastJSONResponse(await get_versions_by_chat_id(chat_id))
+
+@router.post("/{chat_id}/versions/{message_id}/restore", status_code=200)
+async def restore_version(chat_id: str, message_id: str):
+    code, etag = await restore_version_by_chat_id(chat_id, message_id)
+    return FastJSONResponse(code, headers={"ETag": etag})
 
 @router.post("/users/{user_id}", status_code=201)
 async def create_chat(user_id: str, body:CreateChatRequest):
@@ -34,11 +83,17 @@ async def create_chat(user_id: str, body:CreateChatRequest):
 
 @router.post("/default", status_code=200)
 async def default_chat(prompt: Prompt):
-    return await get_ai_response(prompt.input)
+    return await get_default_response(prompt)
 
 @router.post("/{chat_id}/messages/{user_id}", status_code=201)
 async def send_message(chat_id: str, user_id: str, prompt: Prompt):
-    return await post_message_by_chat_id(prompt, chat_id, user_id)
+    return FastJSONResponse(await post_message_by_chat_id(prompt, chat_id, user_id), status_code=201)
+
+@router.post("/{chat_id}/messages/{user_id}/stream", status_code=200)
+async def stream_message(chat_id: str, user_id: str, prompt: Prompt):
+    events = await stream_message_by_chat_id(prompt, chat_id, user_id)
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @router.post("/{chat_id}/rename", status_code=200)
 async def rename_chat(chat_id: str, body: RenameRequest):
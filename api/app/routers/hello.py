@@ -1,4 +1,16 @@
-from fastapi import APIRouter
+import os
+import asyncio
+import logging
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from ..config.mongo import ping_mongo
+from ..config.redis import ping_redis
+
+logger = logging.getLogger(__name__)
+
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", 2))
 
 router = APIRouter()
 
@@ -8,4 +20,22 @@ async def greet():
 
 @router.get("/ping",tags=["ping"], status_code=200, description="check the readiness of api")
 async def ping():
-    return {"message": "api is up..🚀"}
\ No newline at end of file
+    return {"message": "api is up..🚀"}
+
+async def _check(name: str, probe) -> str:
+    try:
+        await asyncio.wait_for(probe(), READY_TIMEOUT)
+        return "ok"
+    except Exception as e:
+        logger.warning("Readiness check for %s failed: %s", name, e)
+        return "unavailable"
+
+@router.get("/ready", tags=["ping"], status_code=200, description="check that mongo and redis are reachable")
+async def ready(request: Request):
+    if getattr(request.app.state, "draining", False):
+        return JSONResponse({"status": "draining"}, status_code=503)
+
+    mongo, redis = await asyncio.gather(_check("mongo", ping_mongo), _check("redis", ping_redis))
+    checks = {"mongo": mongo, "redis": redis}
+    ok = all(status == "ok" for status in checks.values())
+    return JSONResponse({"status": "ok" if ok else "unavailable", **checks}, status_code=200 if ok else 503)
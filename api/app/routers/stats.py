@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from ..config.mongo import pool_stats as mongo_pool_stats
+from ..config.redis import pool_stats
+from ..services.chat import chain_cache_stats, response_cache_stats, token_cache_stats
+from ..services.limiter import llm_limiter
+from ..services.metrics import render
+from ..services.preview import preview_cache_stats
+
+router = APIRouter()
+
+def _collect() -> dict:
+    return {"redis": pool_stats(), "mongo": mongo_pool_stats(), "chain_cache": chain_cache_stats(),
+            "token_cache": token_cache_stats(), "response_cache": response_cache_stats(),
+            "preview_cache": preview_cache_stats(), "llm_limiter": llm_limiter.stats()}
+
+@router.get("/stats", tags=["stats"], status_code=200, description="connection pool and cache usage")
+async def stats():
+    return _collect()
+
+@router.get("/metrics", tags=["stats"], status_code=200, description="prometheus metrics")
+async def metrics():
+    return Response(render(_collect()), media_type=CONTENT_TYPE_LATEST)
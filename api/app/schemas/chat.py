@@ -22,16 +22,23 @@ def detailed_chat(chat: dict):
     Args:
         chat (dict): The chat object from the database.
 
+    Code and the total message count are included only when the chat was
+    loaded with them.
+
     Returns:
         dict: The formatted chat object with id, name, and messages.
     """
-    return {
+    detailed = {
         "id": str(chat["_id"]),
         "name": chat["name"],
         "messages": chat["messages"],
         "created_at": chat["createdAt"],
-        "code": chat["code"],
     }
+    if "code" in chat:
+        detailed["code"] = chat["code"]
+    if "messageCount" in chat:
+        detailed["message_count"] = chat["messageCount"]
+    return detailed
 
 def all_chats(chats: List[dict]):
     """Return a list of chats.
@@ -43,3 +50,44 @@ def all_chats(chats: List[dict]):
         List[dict]: A list of formatted chat objects.
     """
     return [basic_chat(chat) for chat in chats]
+
+def chat_hit(chat: dict, field: str, snippet: str):
+    """Return a search hit on a chat's name or code.
+
+    Args:
+        chat (dict): The chat as returned by the chat search, with its ``score``.
+        field (str): The field the snippet comes from: name, html, css or js.
+        snippet (str): Text of that field around the first query term.
+
+    Returns:
+        dict: The formatted hit.
+    """
+    return {
+        "kind": "chat",
+        "chat_id": str(chat["_id"]),
+        "name": chat["name"],
+        "field": field,
+        "snippet": snippet,
+        "score": round(chat["score"], 3),
+    }
+
+def message_hit(bucket: dict, message: dict, name: str):
+    """Return a search hit on a message.
+
+    Args:
+        bucket (dict): The message bucket as returned by the message search, with its ``score``.
+        message (dict): The matching message, with its ``snippet``.
+        name (str): The name of the chat the message belongs to.
+
+    Returns:
+        dict: The formatted hit.
+    """
+    return {
+        "kind": "message",
+        "chat_id": str(bucket["chatId"]),
+        "name": name,
+        "message_id": message["id"],
+        "type": message["type"],
+        "snippet": message["snippet"],
+        "score": round(bucket["score"], 3),
+    }
@@ -0,0 +1,51 @@
+"""Record the owning ``userId`` on message buckets stored before buckets carried it.
+
+Search scopes the message text index by ``userId``, so messages in buckets
+without one are not found until this has run. New turns set it on the bucket
+they write to.
+
+Usage (from the ``api`` directory)::
+
+    python -m app.scripts.backfill_bucket_owners --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+
+from ..config.indexes import ensure_indexes
+from ..config.mongo import connect_mongo, close_mongo
+from ..repositories import chat as chats_repo, message as messages_repo
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_owners(batch_size: int) -> dict:
+    chats = buckets = orphaned = 0
+    async for chat_ids in messages_repo.iter_ownerless_chat_ids(batch_size):
+        owners = await chats_repo.find_chat_owners(chat_ids)
+        for chat_id in chat_ids:
+            if chat_id not in owners:
+                # Left behind by a chat deleted mid-way; no search can reach them.
+                orphaned += 1
+                continue
+            buckets += await messages_repo.set_owner(chat_id, owners[chat_id])
+            chats += 1
+        logger.info("Backfilled %d chats (%d buckets) so far", chats, buckets)
+    return {"chats": chats, "buckets": buckets, "orphaned_chats": orphaned}
+
+
+async def main(batch_size: int) -> None:
+    await connect_mongo()
+    try:
+        await ensure_indexes()
+        print(await backfill_owners(batch_size))
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record chat owners on message buckets.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size))
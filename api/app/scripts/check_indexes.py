@@ -0,0 +1,35 @@
+"""Apply the index registry and verify the hot queries use an index scan.
+
+Run against a real MongoDB (e.g. the docker-compose ``mongo-stack``)::
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_TLS=false python -m app.scripts.check_indexes
+
+Exits with status 1 if any hot query falls back to a collection scan.
+"""
+import asyncio
+import json
+import logging
+import sys
+
+from ..config.indexes import ensure_indexes, explain_hot_queries
+from ..config.mongo import connect_mongo, close_mongo
+
+
+async def main() -> int:
+    await connect_mongo()
+    try:
+        report = await ensure_indexes()
+        plans = await explain_hot_queries()
+    finally:
+        close_mongo()
+
+    print(json.dumps({"indexes": report, "plans": plans}, indent=2))
+    failing = [label for label, stages in plans.items() if "IXSCAN" not in stages or "COLLSCAN" in stages]
+    for label in failing:
+        print(f"{label} does not use an index scan", file=sys.stderr)
+    return 1 if failing else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,46 @@
+"""Move messages embedded in chat documents into the chat_messages buckets.
+
+Chats are migrated lazily when they are opened or written to, so running this
+is optional; it finishes the migration for chats nobody has touched since.
+
+Usage (from the ``api`` directory)::
+
+    python -m app.scripts.migrate_chat_buckets --batch-size 200
+"""
+import argparse
+import asyncio
+import logging
+
+from ..config.indexes import ensure_indexes
+from ..config.mongo import connect_mongo, close_mongo
+from ..repositories import chat as chats_repo
+from ..services.chat import migrate_chat_to_buckets
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate_chats(batch_size: int) -> dict:
+    chats = messages = 0
+    async for chat_id in chats_repo.iter_unbucketed_chat_ids(batch_size):
+        messages += await migrate_chat_to_buckets(chat_id)
+        chats += 1
+        if chats % batch_size == 0:
+            logger.info("Migrated %d chats (%d messages) so far", chats, messages)
+    return {"chats": chats, "messages": messages}
+
+
+async def main(batch_size: int) -> None:
+    await connect_mongo()
+    try:
+        await ensure_indexes()
+        print(await migrate_chats(batch_size))
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move embedded chat messages into buckets.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,36 @@
+"""Delete Redis chat histories whose chat no longer exists in MongoDB.
+
+The API runs this periodically (see ``HISTORY_RECONCILE_INTERVAL``); run it by
+hand to clean up at once or, with ``--dry-run``, to see what would go.
+
+Usage (from the ``api`` directory)::
+
+    python -m app.scripts.reconcile_histories --batch-size 500 --dry-run
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from ..config.mongo import connect_mongo, close_mongo
+from ..config.redis import connect_redis, close_redis
+from ..services.reconciler import HISTORY_RECONCILE_BATCH, reconcile_histories
+
+
+async def main(batch_size: int, dry_run: bool) -> None:
+    await connect_mongo()
+    await connect_redis()
+    try:
+        print(json.dumps(await reconcile_histories(batch_size, dry_run), indent=2))
+    finally:
+        await close_redis()
+        close_mongo()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete Redis histories of deleted chats.")
+    parser.add_argument("--batch-size", type=int, default=HISTORY_RECONCILE_BATCH)
+    parser.add_argument("--dry-run", action="store_true", help="report orphaned keys without deleting them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size, args.dry_run))
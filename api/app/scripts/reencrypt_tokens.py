@@ -0,0 +1,62 @@
+"""Re-encrypt every legacy RSA token record with the envelope data key.
+
+Tokens are upgraded lazily when read, so running this is optional; it finishes
+the migration for users who have not been active since the upgrade.
+
+Usage (from the ``api`` directory)::
+
+    python -m app.scripts.reencrypt_tokens --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+
+from ..config.mongo import connect_mongo, close_mongo
+from ..repositories import token as tokens_repo
+from ..services.crypto import CURRENT_TOKEN_VERSION, TOKEN_VERSION_RSA, decrypt_token, encrypt_token, init_crypto
+
+logger = logging.getLogger(__name__)
+
+
+def _reencrypt(record: dict) -> dict:
+    token = decrypt_token(record["token"], record.get("version", TOKEN_VERSION_RSA))
+    return {
+        "_id": record["_id"],
+        "old": record["token"],
+        "token": encrypt_token(token),
+        "version": CURRENT_TOKEN_VERSION,
+    }
+
+
+async def reencrypt_tokens(batch_size: int) -> dict:
+    """Stream outdated token records in batches and rewrite them."""
+    scanned = updated = failed = 0
+    async for batch in tokens_repo.iter_tokens_below_version(CURRENT_TOKEN_VERSION, batch_size):
+        updates = []
+        for record in batch:
+            try:
+                updates.append(await asyncio.to_thread(_reencrypt, record))
+            except Exception as e:
+                failed += 1
+                logger.error("Could not re-encrypt token %s: %s", record["_id"], e)
+        scanned += len(batch)
+        updated += await tokens_repo.bulk_replace_tokens(updates)
+        logger.info("Re-encrypted %d of %d tokens scanned so far", updated, scanned)
+    return {"scanned": scanned, "updated": updated, "failed": failed}
+
+
+async def main(batch_size: int) -> None:
+    await connect_mongo()
+    try:
+        await init_crypto()
+        print(await reencrypt_tokens(batch_size))
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-encrypt legacy RSA tokens with the data key.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size))
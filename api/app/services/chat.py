@@ -1,37 +1,110 @@
+import os
+import hashlib
+import asyncio
 import logging
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import AsyncIterator, Optional, Tuple
+
 from fastapi import HTTPException
 from bson import ObjectId
-from base64 import b64encode, b64decode
+from redis.exceptions import RedisError
 
-from ..config.mongo import chatsCollection, tokensCollection
+from ..repositories import chat as chats_repo, history as history_repo, message as messages_repo, token as tokens_repo
 from ..schemas.chat import all_chats, basic_chat, detailed_chat
 from ..models.chat import Chat, Prompt, Code, MessageType, Message
-from .gemini import get_ai_response
-
-from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_OAEP
+from ..utils.cache import TTLCache
+from ..utils.compression import etag_match
+from ..utils.responses import dumps
+from .crypto import CURRENT_TOKEN_VERSION, TOKEN_VERSION_RSA, decrypt_token, encrypt_token
+from .limiter import llm_limiter
+from .metrics import stage
+from .patch import SECTIONS
+from .preview import RenderedPage, get_preview, invalidate_preview, preview_etag
+from .prompts import PROMPT_VERSION
+from .response_cache import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, ResponseCache
+from .snapshot import SnapshotError, load_snapshot, save_snapshot, section_hash
 
 logger = logging.getLogger(__name__)
 
-try:
-    public_key = RSA.import_key(open('public.pem').read())
-    private_key = RSA.import_key(open('private.pem').read())
-except Exception as e:
-    logger.critical("Failed to load RSA keys: %s", e)
-    raise RuntimeError("Encryption keys are missing or corrupted")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 300))
+
+# Decrypted Gemini tokens by userId. Values are secrets: never log this cache.
+_tokens = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+# The LLM client module, once imported. It pulls in LangChain and takes seconds to load.
+_llm = None
+
+def _gemini():
+    global _llm
+    if _llm is None:
+        from . import gemini
+        _llm = gemini
+    return _llm
+
+async def _load_llm():
+    """Return the LLM client, importing it in a worker thread if that hasn't happened yet.
+
+    Request paths go through here: an import inline would stall every request
+    on the event loop, e.g. while ``PRELOAD_LLM`` is off or still running.
+    """
+    return _llm if _llm is not None else await asyncio.to_thread(_gemini)
+
+async def preload_llm() -> None:
+    """Import the LLM client in a worker thread so the first chat turn doesn't pay for it."""
+    await _load_llm()
+
+# Responses of the anonymous /chats/default endpoint, which keeps no history.
+_default_responses = ResponseCache(PROMPT_VERSION, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+# Strong references to fire-and-forget saves scheduled after a client disconnects.
+_background_tasks = set()
+
+
+async def _load_token(user_id: str) -> Optional[str]:
+    """Return the user's decrypted token, or None if they have not saved one.
+
+    Decrypted tokens are cached per user for ``TOKEN_CACHE_TTL`` seconds. A save
+    invalidates the entry in this process; other workers pick up the new token
+    once their entry expires. Legacy RSA records are decrypted in a worker
+    thread, so they never stall the event loop, and re-encrypted with the data key.
+    """
+    token = _tokens.get(user_id)
+    if token is not None:
+        return token
+
+    with stage("token_lookup"):
+        record = await tokens_repo.find_token_by_user_id(user_id)
+    if not record or "token" not in record:
+        return None
+
+    version = record.get("version", TOKEN_VERSION_RSA)
+    if version == CURRENT_TOKEN_VERSION:
+        with stage("decrypt"):
+            token = decrypt_token(record["token"], version)
+    else:
+        with stage("decrypt"):
+            token = await asyncio.to_thread(decrypt_token, record["token"], version)
+        upgraded = await tokens_repo.replace_token_if_unchanged(
+            user_id, record["token"], encrypt_token(token), CURRENT_TOKEN_VERSION
+        )
+        if upgraded:
+            logger.info("Token re-encrypted for user_id: %s", user_id)
+
+    _tokens.set(user_id, token)
+    return token
 
 
 async def get_token_by_user_id(user_id: str) -> dict:
     logger.info("Fetching token for user_id: %s", user_id)
     try:
-        record = tokensCollection.find_one({"userId": user_id})
-        if not record or "token" not in record:
+        token = await _load_token(user_id)
+        if token is None:
             logger.info("No token found for user_id: %s", user_id)
             return {"token": ""}
-        encrypted_token = b64decode(record["token"])
-        decrypted_token = PKCS1_OAEP.new(private_key).decrypt(encrypted_token).decode("utf-8")
         logger.info("Token successfully decrypted for user_id: %s", user_id)
-        return {"token": decrypted_token}
+        return {"token": token}
     except Exception as e:
         logger.error("Token decryption failed for user %s: %s", user_id, e)
         return {"token": ""}
@@ -40,11 +113,14 @@ async def get_token_by_user_id(user_id: str) -> dict:
 async def save_token_by_user_id(user_id: str, token: str) -> dict:
     logger.info("Saving token for user_id: %s", user_id)
     try:
-        encrypted_token = PKCS1_OAEP.new(public_key).encrypt(token.encode("utf-8"))
-        encrypted_token_b64 = b64encode(encrypted_token).decode("utf-8")
-
-        update = {"$set": {"token": encrypted_token_b64}}
-        tokensCollection.update_one({"userId": user_id}, update, upsert=True)
+        encrypted_token = encrypt_token(token)
+
+        _tokens.pop(user_id)
+        await tokens_repo.upsert_token_by_user_id(user_id, encrypted_token, CURRENT_TOKEN_VERSION)
+        _tokens.set(user_id, token)
+        # Until the LLM client is loaded there are no chains to evict.
+        if _llm is not None:
+            _llm.evict_chain(user_id)
         logger.info("Token successfully saved for user_id: %s", user_id)
         return {"message": "Token saved successfully."}
     except Exception as e:
@@ -52,11 +128,61 @@ async def save_token_by_user_id(user_id: str, token: str) -> dict:
         raise HTTPException(status_code=500, detail="Token encryption or storage failed")
 
 
-async def get_chats_by_user_id(user_id: str) -> all_chats:
+async def drain_background_tasks(timeout: float) -> None:
+    """Wait up to ``timeout`` seconds for saves scheduled after client disconnects."""
+    if _background_tasks:
+        _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+        if pending:
+            logger.warning("Shutdown with %d background saves still running", len(pending))
+
+
+def chain_cache_stats() -> dict:
+    # Don't load the LLM client just to report that it has no chains yet.
+    return _llm.chain_cache_stats() if _llm is not None else {"size": 0}
+
+
+def token_cache_stats() -> dict:
+    return _tokens.stats()
+
+
+async def get_default_response(prompt: Prompt) -> dict:
+    """Answer an anonymous prompt with the server key, caching identical prompts."""
+    async def generate() -> dict:
+        async with llm_limiter.slot():
+            return await (await _load_llm()).get_stateless_ai_response(prompt.input)
+
+    return await _default_responses.get_or_generate(prompt.input, generate)
+
+
+def response_cache_stats() -> dict:
+    return _default_responses.stats()
+
+
+def _encode_cursor(chat: dict) -> str:
+    raw = f"{chat['createdAt'].isoformat()}|{chat['_id']}"
+    return urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        created_at, chat_id = urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), ObjectId(chat_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def get_chats_by_user_id(user_id: str, limit: Optional[int] = None, after: Optional[str] = None) -> dict:
+    """Return a page of a user's chats, newest first.
+
+    ``next_cursor`` is set when a full page was returned and can be passed back
+    as ``after`` to fetch the following page.
+    """
     logger.info("Retrieving chats for user_id: %s", user_id)
+    position = _decode_cursor(after) if after else None
     try:
-        chats = chatsCollection.find({"userId": user_id})
-        return all_chats(chats)
+        chats = await chats_repo.find_chats_by_user_id(user_id, limit, position)
+        next_cursor = _encode_cursor(chats[-1]) if limit and len(chats) == limit else None
+        return {"chats": all_chats(chats), "next_cursor": next_cursor}
     except Exception as e:
         logger.error("Failed to retrieve chats for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail="Failed to retrieve chats")
@@ -65,10 +191,10 @@ async def get_chats_by_user_id(user_id: str) -> all_chats:
 async def create_chat_by_user_id(user_id: str, name="New Chat") -> basic_chat:
     logger.info("Creating new chat for user_id: %s", user_id)
     try:
-        chat = Chat(userId=user_id, name=name)
-        result = chatsCollection.insert_one(chat.model_dump())
-        logger.info("Chat created with ID: %s for user_id: %s", result.inserted_id, user_id)
-        return basic_chat({"_id": result.inserted_id, **chat.model_dump()})
+        chat = Chat(userId=user_id, name=name).model_dump()
+        inserted_id = await chats_repo.insert_chat(chat)
+        logger.info("Chat created with ID: %s for user_id: %s", inserted_id, user_id)
+        return basic_chat({**chat, "_id": inserted_id})
     except Exception as e:
         logger.error("Failed to create chat for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail="Failed to create chat")
@@ -80,8 +206,8 @@ async def rename_chat_by_id(chat_id: str, name: str) -> basic_chat:
         raise HTTPException(status_code=400, detail="Invalid chat ID")
 
     try:
-        result = chatsCollection.update_one({"_id": ObjectId(chat_id)}, {"$set": {"name": name}})
-        if result.matched_count == 0:
+        matched = await chats_repo.update_chat_by_id(ObjectId(chat_id), {"$set": {"name": name}})
+        if matched == 0:
             raise HTTPException(status_code=404, detail="Chat not found")
         logger.info("Chat %s renamed successfully", chat_id)
         return {"message": "Chat renamed successfully."}
@@ -90,97 +216,351 @@ async def rename_chat_by_id(chat_id: str, name: str) -> basic_chat:
         raise HTTPException(status_code=500, detail="Failed to rename chat")
 
 
-async def get_chat_by_id(chat_id: str) -> detailed_chat:
+async def migrate_chat_to_buckets(chat_id: ObjectId) -> int:
+    """Move a chat's embedded messages into buckets and return how many there were.
+
+    Safe to run more than once or concurrently: only missing buckets are
+    inserted, so a run that read the chat before another run migrated it
+    cannot overwrite turns appended since, and the chat is only marked
+    migrated if it has not been already.
+    """
+    chat = await chats_repo.find_chat_by_id(chat_id)
+    if not chat:
+        return 0
+    if "messageCount" in chat:
+        return chat["messageCount"]
+
+    messages = chat.get("messages", [])
+    await messages_repo.insert_messages(chat_id, chat["userId"], messages)
+    await chats_repo.mark_bucketed(chat_id, len(messages))
+    logger.info("Migrated %d messages of chat %s into buckets", len(messages), chat_id)
+    return len(messages)
+
+
+async def _ensure_bucketed(chat: dict) -> int:
+    """Return a chat's message count, migrating it to buckets first if needed."""
+    if "messageCount" in chat:
+        return chat["messageCount"]
+    return await migrate_chat_to_buckets(chat["_id"])
+
+
+async def get_chat_by_id(chat_id: str, limit: Optional[int] = None, before: Optional[str] = None,
+                         include_code: bool = True) -> detailed_chat:
+    """Return a chat with the latest ``limit`` messages, or those before message ``before``.
+
+    Without ``limit`` or ``before`` the whole chat is returned, as before.
+    """
     logger.info("Fetching chat by ID: %s", chat_id)
     if not ObjectId.is_valid(chat_id):
         raise HTTPException(status_code=400, detail="Invalid chat ID")
 
     try:
-        chat = chatsCollection.find_one({"_id": ObjectId(chat_id)})
+        chat = await chats_repo.find_chat_metadata(ObjectId(chat_id), include_code)
         if not chat:
             raise HTTPException(status_code=404, detail="Chat not found")
+        chat["messageCount"] = await _ensure_bucketed(chat)
+
+        end = chat["messageCount"]
+        if before is not None:
+            end = await messages_repo.find_message_seq(chat["_id"], before)
+            if end is None:
+                raise HTTPException(status_code=404, detail="Message not found")
+        start = 0 if limit is None else max(0, end - limit)
+
+        chat["messages"] = await messages_repo.find_messages(chat["_id"], start, end)
         logger.info("Chat %s retrieved successfully", chat_id)
         return detailed_chat(chat)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to get chat %s: %s", chat_id, e)
         raise HTTPException(status_code=500, detail="Failed to retrieve chat")
 
 
+def code_etag(code: dict) -> str:
+    """Return a strong ETag for a chat's code."""
+    digest = hashlib.sha256()
+    for section in ("html", "css", "js"):
+        digest.update((code.get(section) or "").encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+async def get_code_by_chat_id(chat_id: str) -> Tuple[dict, str]:
+    """Return a chat's code and its ETag."""
+    logger.info("Fetching code for chat: %s", chat_id)
+    if not ObjectId.is_valid(chat_id):
+        raise HTTPException(status_code=400, detail="Invalid chat ID")
+
+    try:
+        code = await chats_repo.find_chat_code(ObjectId(chat_id))
+    except Exception as e:
+        logger.error("Failed to get code for chat %s: %s", chat_id, e)
+        raise HTTPException(status_code=500, detail="Failed to retrieve code")
+    if code is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return code, code_etag(code)
+
+
+async def get_preview_by_chat_id(chat_id: str, if_none_match: Optional[str] = None) -> Tuple[str, Optional[RenderedPage]]:
+    """Return the ETag of a chat's preview page and the page itself.
+
+    When ``if_none_match`` (the client's header) lists the page's ETag or one
+    of its per-coding variants, the page is None and the ETag returned is the
+    variant the client holds, so a repeat preview costs a code lookup and no
+    rendering.
+    """
+    code, _ = await get_code_by_chat_id(chat_id)
+    etag = preview_etag(code)
+    held = etag_match(etag, if_none_match)
+    if held:
+        return held, None
+    try:
+        return etag, await get_preview(chat_id, code, etag)
+    except Exception as e:
+        logger.error("Failed to render preview of chat %s: %s", chat_id, e)
+        raise HTTPException(status_code=500, detail="Failed to render preview")
+
+
+async def get_versions_by_chat_id(chat_id: str) -> dict:
+    """List the code versions of a chat, oldest first.
+
+    Each version is identified by the AI message whose turn produced it;
+    ``current`` marks the versions matching the chat's code right now.
+    """
+    logger.info("Listing code versions of chat: %s", chat_id)
+    if not ObjectId.is_valid(chat_id):
+        raise HTTPException(status_code=400, detail="Invalid chat ID")
+
+    try:
+        code = await chats_repo.find_chat_code(ObjectId(chat_id))
+        if code is None:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        snapshots = await messages_repo.find_snapshots(ObjectId(chat_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to list versions of chat %s: %s", chat_id, e)
+        raise HTTPException(status_code=500, detail="Failed to retrieve versions")
+
+    current = {section: section_hash(code.get(section) or "") for section in ("html", "css", "js")}
+    return {"versions": [
+        {"id": message["id"], "seq": message["seq"], "snapshot": message["snapshot"],
+         "current": message["snapshot"] == current}
+        for message in snapshots
+    ]}
+
+
+async def restore_version_by_chat_id(chat_id: str, message_id: str) -> Tuple[dict, str]:
+    """Set a chat's code back to the version saved with AI message ``message_id``.
+
+    Returns the restored code and its ETag. History is left as it is; the
+    next turn builds on the restored code.
+    """
+    logger.info("Restoring chat %s to the code of message %s", chat_id, message_id)
+    if not ObjectId.is_valid(chat_id):
+        raise HTTPException(status_code=400, detail="Invalid chat ID")
+
+    try:
+        snapshot = await messages_repo.find_message_snapshot(ObjectId(chat_id), message_id)
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="Version not found")
+        code = await load_snapshot(snapshot)
+        matched = await chats_repo.update_chat_by_id(ObjectId(chat_id), {"$set": {"code": code}})
+        if matched == 0:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        invalidate_preview(chat_id)
+    except HTTPException:
+        raise
+    except SnapshotError as e:
+        logger.error("Cannot restore chat %s to message %s: %s", chat_id, message_id, e)
+        raise HTTPException(status_code=500, detail="Version is incomplete")
+    except Exception as e:
+        logger.error("Failed to restore chat %s to message %s: %s", chat_id, message_id, e)
+        raise HTTPException(status_code=500, detail="Failed to restore version")
+    logger.info("Chat %s restored to the code of message %s", chat_id, message_id)
+    return code, code_etag(code)
+
+
 async def delete_chat_by_id(chat_id: str) -> dict:
     logger.info("Deleting chat by ID: %s", chat_id)
     if not ObjectId.is_valid(chat_id):
         raise HTTPException(status_code=400, detail="Invalid chat ID")
 
     try:
-        result = chatsCollection.delete_one({"_id": ObjectId(chat_id)})
-        if result.deleted_count == 0:
+        deleted = await chats_repo.delete_chat_by_id(ObjectId(chat_id))
+        await messages_repo.delete_messages(ObjectId(chat_id))
+        if deleted == 0:
             raise HTTPException(status_code=404, detail="Chat not found")
+        try:
+            await history_repo.delete_history(chat_id)
+        except RedisError as e:
+            # The chat is gone; the history reconciler removes what is left behind.
+            logger.warning("Failed to delete history of chat %s: %s", chat_id, e)
         logger.info("Chat %s deleted successfully", chat_id)
         return {"message": "Chat deleted successfully."}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to delete chat %s: %s", chat_id, e)
         raise HTTPException(status_code=500, detail="Failed to delete chat")
 
 
+async def _get_decrypted_token(user_id: str) -> str:
+    """Load and decrypt the user's Gemini token, raising 401 if there is none."""
+    decrypted_token = await _load_token(user_id)
+    if decrypted_token is None:
+        raise HTTPException(status_code=401, detail="Unauthorized: No token found")
+
+    if not decrypted_token:
+        raise HTTPException(status_code=401, detail="Unauthorized: Invalid token")
+    return decrypted_token
+
+
+async def _prepare_turn(chat_id: str) -> dict:
+    """Check the chat exists before generating and return its current code.
+
+    Chats that still embed their messages are migrated to buckets here, so the
+    turn itself can be saved with a single update.
+    """
+    with stage("chat_lookup"):
+        chat = await chats_repo.find_chat_for_turn(ObjectId(chat_id))
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    await _ensure_bucketed(chat)
+    return chat.get("code", {})
+
+
+async def _save_turn(chat_id: str, prompt: Prompt, response: dict, previous_code: dict,
+                     partial: bool = False) -> dict:
+    """Append the user/AI message pair to a chat and update its code.
+
+    ``_prepare_turn`` must have run first and returned ``previous_code``. The
+    chat's count, code and placeholder name are updated in one atomic write,
+    which also reserves the pair's positions; the messages are then stored in
+    their bucket. If that fails, the count and code are put back (unless a
+    later turn has been counted since) so the chat never claims messages it
+    does not have. Partial turns (a stream cut off by the client) keep the
+    chat's existing code, since half-generated HTML/CSS/JS is rarely usable.
+    The AI message links a snapshot of the code as it stands after the turn;
+    if storing it fails, the turn is saved without one.
+    """
+    user_msg = Message(content=prompt.input, type=MessageType.USER)
+    ai_msg = Message(content=response.get('explanation', "") or "", type=MessageType.AI, partial=partial)
+    code = Code() if partial else Code(
+        html=response.get('html', "") or "", 
+        css=response.get('css', "") or "", 
+        js=response.get('js', "") or ""
+    )
+
+    fields = {f"code.{section}": value for section, value in code.model_dump().items() if value.strip()}
+    if not partial:
+        # Blank sections mean "unchanged"; patch replies list those they emptied.
+        fields.update({f"code.{section}": "" for section in response.get("cleared") or [] if section in SECTIONS})
+    with stage("mongo_write"):
+        updated = await chats_repo.record_turn(ObjectId(chat_id), fields, rename_from="New Chat", rename_to=prompt.input)
+        if not updated:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        if fields:
+            invalidate_preview(chat_id)
+        try:
+            ai_msg.snapshot = await save_snapshot(updated.get("code", {}))
+        except Exception as e:
+            logger.warning("Failed to snapshot code of chat %s: %s", chat_id, e)
+        try:
+            await messages_repo.append_messages(
+                ObjectId(chat_id), updated["userId"], updated["messageCount"] - 2,
+                [user_msg.model_dump(), ai_msg.model_dump()]
+            )
+        except Exception:
+            restore = {field: (previous_code or {}).get(field.partition(".")[2]) or "" for field in fields}
+            if not await chats_repo.undo_turn(ObjectId(chat_id), updated["messageCount"], restore):
+                logger.error("Chat %s counts messages %d-%d that were not stored",
+                             chat_id, updated["messageCount"] - 2, updated["messageCount"] - 1)
+            raise
+    logger.info("Message posted and chat updated for chat_id: %s", chat_id)
+
+    return {
+        "name": updated["name"],
+        "message": ai_msg.model_dump(),
+        "code": code.model_dump()
+    }
+
+
 async def post_message_by_chat_id(prompt: Prompt, chat_id: str, user_id: str) -> dict:
     logger.info("Posting message to chat_id: %s by user_id: %s", chat_id, user_id)
     if not ObjectId.is_valid(chat_id):
         raise HTTPException(status_code=400, detail="Invalid chat ID")
 
-    try:
-        record = tokensCollection.find_one({"userId": user_id})
-        if not record or "token" not in record:
-            raise HTTPException(status_code=401, detail="Unauthorized: No token found")
+    decrypted_token = await _get_decrypted_token(user_id)
+    code = await _prepare_turn(chat_id)
+    llm = await _load_llm()
 
-        decrypted_token = PKCS1_OAEP.new(private_key).decrypt(
-            b64decode(record["token"])
-        ).decode("utf-8")
+    async with llm_limiter.slot(user_id):
+        try:
+            response = await llm.get_ai_response(prompt.input, chat_id, decrypted_token, code, user_id)
+            logger.info("AI response generated for chat %s", chat_id)
 
-        if not decrypted_token:
-            raise HTTPException(status_code=401, detail="Unauthorized: Invalid token")
+        except Exception as e:
+            logger.error("AI response failed for chat %s: %s", chat_id, e)
+            raise HTTPException(status_code=500, detail="AI response generation failed")
 
-        response = await get_ai_response(prompt.input, chat_id, decrypted_token)
-        logger.info("AI response generated for chat %s", chat_id)
+    try:
+        return await _save_turn(chat_id, prompt, response, code)
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error("AI response failed for chat %s: %s", chat_id, e)
-        raise HTTPException(status_code=500, detail="AI response generation failed")
-
-    try:
-        user_msg = Message(content=prompt.input, type=MessageType.USER)
-        ai_msg = Message(content=response['explanation'], type=MessageType.AI)
-        code = Code(
-            html=response.get('html', "") or "", 
-            css=response.get('css', "") or "", 
-            js=response.get('js', "") or ""
-        )
+        logger.error("Failed to post message in chat %s: %s", chat_id, e)
+        raise HTTPException(status_code=500, detail="Failed to save message in chat")
 
-        chat = chatsCollection.find_one({"_id": ObjectId(chat_id)})
-        if not chat:
-            raise HTTPException(status_code=404, detail="Chat not found")
 
-        update_data = {
-            "$push": {
-                "messages": {"$each": [user_msg.model_dump(), ai_msg.model_dump()]}
-            },
-            "$set": {}
-        }
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
 
-        if code.html.strip(): update_data["$set"]["code.html"] = code.html
-        if code.css.strip(): update_data["$set"]["code.css"] = code.css
-        if code.js.strip(): update_data["$set"]["code.js"] = code.js
-        if chat.get("name") == "New Chat": update_data["$set"]["name"] = prompt.input
-        if not update_data["$set"]: del update_data["$set"]
 
-        chatsCollection.update_one({"_id": ObjectId(chat_id)}, update_data)
-        logger.info("Message posted and chat updated for chat_id: %s", chat_id)
+async def stream_message_by_chat_id(prompt: Prompt, chat_id: str, user_id: str) -> AsyncIterator[str]:
+    """Validate a message and return an SSE stream of the AI response.
 
-        return {
-            "name": update_data.get("$set", {}).get("name", chat.get("name")),
-            "message": ai_msg.model_dump(),
-            "code": code.model_dump()
-        }
+    The stream emits ``partial`` events carrying the response parsed so far,
+    then a ``done`` event with the same body ``post_message_by_chat_id`` returns.
+    The turn is saved once the model finishes; if the client disconnects first,
+    whatever was received is saved with the AI message marked ``partial``.
+    """
+    logger.info("Streaming message to chat_id: %s by user_id: %s", chat_id, user_id)
+    if not ObjectId.is_valid(chat_id):
+        raise HTTPException(status_code=400, detail="Invalid chat ID")
 
-    except Exception as e:
-        logger.error("Failed to post message in chat %s: %s", chat_id, e)
-        raise HTTPException(status_code=500, detail="Failed to save message in chat")
+    decrypted_token = await _get_decrypted_token(user_id)
+    code = await _prepare_turn(chat_id)
+    llm_limiter.check(user_id)
+    llm = await _load_llm()
+
+    async def events() -> AsyncIterator[str]:
+        response = {}
+        try:
+            async with llm_limiter.slot(user_id):
+                async for response in llm.stream_ai_response(prompt.input, chat_id, decrypted_token, code, user_id):
+                    yield _sse("partial", response)
+        except (asyncio.CancelledError, GeneratorExit):
+            logger.info("Client disconnected from stream for chat %s", chat_id)
+            task = asyncio.create_task(_save_turn(chat_id, prompt, response, code, partial=True))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+            raise
+        except HTTPException as e:
+            yield _sse("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            logger.error("AI response stream failed for chat %s: %s", chat_id, e)
+            yield _sse("error", {"detail": "AI response generation failed"})
+            return
+
+        try:
+            yield _sse("done", await _save_turn(chat_id, prompt, response, code))
+        except Exception as e:
+            logger.error("Failed to post message in chat %s: %s", chat_id, e)
+            yield _sse("error", {"detail": "Failed to save message in chat"})
+
+    return events()
@@ -0,0 +1,91 @@
+"""Envelope encryption for stored Gemini tokens.
+
+Tokens are encrypted with a 256-bit AES-GCM data key. The data key is kept in
+the ``keys`` collection wrapped with the RSA public key and is unwrapped once
+at startup, so per-request crypto is symmetric and takes microseconds.
+
+Records written before envelope encryption hold raw RSA-OAEP ciphertext and
+carry no ``version`` field (version 1). They are still readable and are
+re-encrypted with the data key when read.
+"""
+import logging
+from base64 import b64decode, b64encode
+from typing import Optional
+
+from Crypto.Cipher import AES, PKCS1_OAEP
+from Crypto.PublicKey import RSA
+from Crypto.Random import get_random_bytes
+
+from ..config.keys import load_keys
+from ..repositories import key as keys_repo
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION_RSA = 1
+TOKEN_VERSION_AES_GCM = 2
+CURRENT_TOKEN_VERSION = TOKEN_VERSION_AES_GCM
+
+DATA_KEY_ID = "tokens"
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+
+public_key: Optional[RSA.RsaKey] = None
+private_key: Optional[RSA.RsaKey] = None
+_data_key: Optional[bytes] = None
+
+
+async def init_crypto() -> None:
+    """Load the RSA key pair and unwrap (or create) the token data key."""
+    global public_key, private_key, _data_key
+    if _data_key is not None:
+        return
+
+    try:
+        public_key, private_key = load_keys()
+    except Exception as e:
+        logger.critical("Failed to load RSA keys: %s", e)
+        raise RuntimeError("Encryption keys are missing or corrupted") from e
+
+    record = await keys_repo.find_key(DATA_KEY_ID)
+    if record is None:
+        wrapped = b64encode(PKCS1_OAEP.new(public_key).encrypt(get_random_bytes(32))).decode("utf-8")
+        await keys_repo.insert_key_if_absent(DATA_KEY_ID, wrapped)
+        # Another worker may have created the key first; always use the stored one.
+        record = await keys_repo.find_key(DATA_KEY_ID)
+        logger.info("Token data key initialised.")
+
+    _data_key = PKCS1_OAEP.new(private_key).decrypt(b64decode(record["wrappedKey"]))
+
+
+def _require_data_key() -> bytes:
+    if _data_key is None:
+        raise RuntimeError("Token encryption is not initialised; call init_crypto() first.")
+    return _data_key
+
+
+def encrypt_token(token: str) -> str:
+    """Encrypt a token with the data key, returning ``base64(nonce | ciphertext | tag)``."""
+    nonce = get_random_bytes(_NONCE_SIZE)
+    cipher = AES.new(_require_data_key(), AES.MODE_GCM, nonce=nonce)
+    ciphertext, tag = cipher.encrypt_and_digest(token.encode("utf-8"))
+    return b64encode(nonce + ciphertext + tag).decode("utf-8")
+
+
+def decrypt_token(encrypted_token: str, version: int = TOKEN_VERSION_RSA) -> str:
+    """Decrypt a stored token written with the given scheme version.
+
+    Version 1 records need an RSA private-key operation (milliseconds of CPU);
+    call it off the event loop.
+    """
+    data = b64decode(encrypted_token)
+    if version == TOKEN_VERSION_RSA:
+        if private_key is None:
+            raise RuntimeError("Token encryption is not initialised; call init_crypto() first.")
+        return PKCS1_OAEP.new(private_key).decrypt(data).decode("utf-8")
+
+    if version == TOKEN_VERSION_AES_GCM:
+        nonce, ciphertext, tag = data[:_NONCE_SIZE], data[_NONCE_SIZE:-_TAG_SIZE], data[-_TAG_SIZE:]
+        cipher = AES.new(_require_data_key(), AES.MODE_GCM, nonce=nonce)
+        return cipher.decrypt_and_verify(ciphertext, tag).decode("utf-8")
+
+    raise ValueError(f"Unknown token encryption version: {version}")
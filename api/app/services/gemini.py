@@ -1,27 +1,47 @@
 import json
 import os
+import time
+import hashlib
+import logging
 from dotenv import load_dotenv
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.output_parsers import JsonOutputParser
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 from langchain_core.runnables.history import BaseChatMessageHistory
-from langchain_core.messages import BaseMessage
-import pickle
-from redis import Redis
-from typing import List
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import Generation, LLMResult
+from langchain_core.utils.json import parse_json_markdown
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+from uuid import UUID
 
+from ..config.redis import get_redis
 from ..models.chat import Response
+from ..repositories.history import HISTORY_TTL, history_key, summary_key
+from ..utils.cache import TTLCache
+from ..utils.messages import decode_message, encode_message
+from .metrics import LLM_TOKENS, STAGE_LATENCY, stage
+from .patch import SECTIONS, apply_edits
+from .prompts import CODE_CONTEXT, OUTPUT_FORMAT, RULES
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 API_KEY = os.getenv("GEMINI_API_KEY")
-REDIS_URL = os.getenv("REDIS_URL")
-REDIS_TOKEN = os.getenv("REDIS_TOKEN")
+CHAIN_CACHE_SIZE = int(os.getenv("CHAIN_CACHE_SIZE", 256))
+CHAIN_CACHE_TTL = float(os.getenv("CHAIN_CACHE_TTL", 3600))
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", 10))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", 6000))
+HISTORY_SUMMARY = os.getenv("HISTORY_SUMMARY", "true").lower() == "true"
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", 2000))
+HISTORY_SUMMARY_LINE_CHARS = 200
+# Attempts at folding overflow into the summary while other turns change the history.
+HISTORY_FOLD_ATTEMPTS = 5
 
 GENERATION_CONFIG = {
     "temperature": 2,
@@ -30,120 +50,390 @@ GENERATION_CONFIG = {
     "max_output_tokens": 8192
 }
 
+def _estimate_tokens(message: BaseMessage) -> int:
+    """Cheap token estimate (~4 characters per token) used for the history budget."""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    return len(content) // 4 + 4
+
+def _explanation(message: BaseMessage) -> str:
+    """Return the explanation of an AI JSON reply, or the raw content otherwise."""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    try:
+        reply = parser.parse(content)
+        if isinstance(reply, dict) and reply.get("explanation"):
+            return reply["explanation"]
+    except Exception:
+        pass
+    return content
+
+def _compact(message: BaseMessage) -> BaseMessage:
+    """Keep only the explanation of AI replies; the current code is sent separately."""
+    if not isinstance(message, AIMessage):
+        return message
+    return AIMessage(content=_explanation(message))
+
+async def extractive_summary(summary: str, messages: Sequence[BaseMessage]) -> str:
+    """Fold trimmed messages into the rolling summary without calling the model.
+
+    Each message becomes one short line (user requests and AI explanations, never
+    code); the oldest lines are dropped once the summary exceeds
+    ``HISTORY_SUMMARY_MAX_CHARS``.
+    """
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        role = "User" if message.type == "human" else "Assistant"
+        text = " ".join(_explanation(message).split())[:HISTORY_SUMMARY_LINE_CHARS]
+        lines.append(f"{role}: {text}")
+
+    while lines and sum(len(line) + 1 for line in lines) > HISTORY_SUMMARY_MAX_CHARS:
+        lines.pop(0)
+    return "\n".join(lines)
+
 class UpstashCompatibleChatHistory(BaseChatMessageHistory):
-    def __init__(self, session_id: str, redis_client: Redis):
-        self.key = f"chat_history:{session_id}"
+    """Chat history stored as a Redis list and accessed only through the async API.
+
+    AI replies are stored as their explanation only; the model receives the
+    current code as a separate context block on every turn. Only the last
+    ``max_turns`` turns are kept in the list; older messages are folded into a
+    rolling summary stored at ``<key>:summary`` and trimmed with ``LTRIM``,
+    in a ``WATCH``/``MULTI`` transaction so concurrent turns never fold the
+    same messages twice or trim ones that were not folded.
+    Reads return the summary (as a system message) followed by as many recent
+    messages as fit in ``max_tokens``. Entries use the compact encoding from
+    ``app.utils.messages``.
+
+    Chains only touch it through ``ainvoke``/``astream``, so the synchronous
+    ``messages``, ``add_message`` and ``clear`` raise ``TypeError`` naming the
+    async method to call instead of blocking on Redis.
+
+    Args:
+        session_id (str): Chat the history belongs to.
+        redis_client (Redis): Shared async Redis client.
+        max_turns (int): User/AI message pairs kept verbatim.
+        max_tokens (int): Approximate token budget for the verbatim messages.
+        summarize (Optional[Callable]): ``async (summary, trimmed) -> summary``;
+            None disables the summary and simply drops trimmed messages.
+        ttl (int): Seconds an idle history is kept; each append restarts it.
+    """
+    def __init__(self, session_id: str, redis_client: Redis, max_turns: int = 10,
+                 max_tokens: int = 6000,
+                 summarize: Optional[Callable[[str, Sequence[BaseMessage]], Awaitable[str]]] = extractive_summary,
+                 ttl: int = HISTORY_TTL):
+        self.key = history_key(session_id)
+        self.summary_key = summary_key(session_id)
         self.redis = redis_client
+        self.max_messages = max_turns * 2
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.ttl = ttl
         self._messages = None
 
-    def add_message(self, message: BaseMessage) -> None:
-        """Adds a new message to the Redis list."""
-        self.redis.rpush(self.key, pickle.dumps(message))
-        if self._messages is not None:
-            self._messages.append(message)
+    async def aadd_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """Appends new messages and folds anything beyond the window into the summary."""
+        if not messages:
+            return
+        with stage("history_save"):
+            await self._append(messages)
 
-    @property
-    def messages(self) -> List[BaseMessage]:
+    async def _append(self, messages: Sequence[BaseMessage]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(self.key, *[encode_message(_compact(message)) for message in messages])
+            pipe.expire(self.key, self.ttl)
+            pipe.expire(self.summary_key, self.ttl)
+            length = (await pipe.execute())[0]
+        self._messages = None
+
+        if length <= self.max_messages:
+            return
+        if self.summarize is None:
+            # Nothing to fold; keeping the last messages is idempotent.
+            await self.redis.ltrim(self.key, -self.max_messages, -1)
+            return
+        await self._fold_overflow()
+
+    async def _fold_overflow(self) -> None:
+        """Fold the messages beyond the window into the summary and trim them.
+
+        The list and summary are watched while the overflow is summarized; if
+        another turn changes either first, the transaction is dropped and the
+        fold retried on the new state. Overflow left after the last attempt is
+        folded by the next append.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for _ in range(HISTORY_FOLD_ATTEMPTS):
+                try:
+                    await pipe.watch(self.key, self.summary_key)
+                    overflow = await pipe.llen(self.key) - self.max_messages
+                    if overflow <= 0:
+                        return
+                    trimmed = [decode_message(item) for item in await pipe.lrange(self.key, 0, overflow - 1)]
+                    summary = (await pipe.get(self.summary_key) or b"").decode("utf-8")
+                    summary = await self.summarize(summary, trimmed)
+                    pipe.multi()
+                    pipe.set(self.summary_key, summary, ex=self.ttl)
+                    pipe.ltrim(self.key, overflow, -1)
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    continue
+        logger.warning("History %s changed during %d summary attempts; folding later", self.key,
+                       HISTORY_FOLD_ATTEMPTS)
+
+    async def aget_messages(self) -> List[BaseMessage]:
         if self._messages is None:
-            self._messages = [
-                pickle.loads(item)
-                for item in self.redis.lrange(self.key, 0, -1)
-            ]
+            with stage("history_load"):
+                self._messages = await self._load()
         return self._messages
 
-    def clear(self) -> None:
-        self.redis.delete(self.key)
+    async def _load(self) -> List[BaseMessage]:
+        recent = [
+            decode_message(item)
+            for item in await self.redis.lrange(self.key, -self.max_messages, -1)
+        ]
+
+        budget, start = self.max_tokens, len(recent)
+        while start > 0 and budget - _estimate_tokens(recent[start - 1]) >= 0:
+            start -= 1
+            budget -= _estimate_tokens(recent[start])
+        # Never open the window on an AI reply whose request was cut off.
+        while start < len(recent) and recent[start].type != "human":
+            start += 1
+
+        messages = recent[start:]
+        if self.summarize is not None:
+            summary = await self.redis.get(self.summary_key)
+            if summary:
+                messages.insert(0, SystemMessage(
+                    content="Summary of the earlier conversation:\n" + summary.decode("utf-8")
+                ))
+        return messages
+
+    async def aclear(self) -> None:
+        await self.redis.delete(self.key, self.summary_key)
         self._messages = []
 
-    def __len__(self) -> int:
-        return self.redis.llen(self.key)
-    
+    async def alen(self) -> int:
+        return await self.redis.llen(self.key)
+
+    def _sync_call(self, name: str, use: str) -> TypeError:
+        return TypeError(f"{type(self).__name__}.{name} is not available synchronously; await {use}() instead.")
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        raise self._sync_call("messages", "aget_messages")
+
+    def add_message(self, message: BaseMessage) -> None:
+        raise self._sync_call("add_message", "aadd_messages")
+
+    def clear(self) -> None:
+        raise self._sync_call("clear", "aclear")
+
 def get_redis_history(session_id: str):
-    redis_client = Redis(
-    host="creative-dodo-16406.upstash.io",
-    port=6379,
-    password=REDIS_TOKEN,
-    ssl=True,
+    return UpstashCompatibleChatHistory(
+        session_id, get_redis(),
+        max_turns=HISTORY_MAX_TURNS,
+        max_tokens=HISTORY_MAX_TOKENS,
+        summarize=extractive_summary if HISTORY_SUMMARY else None,
     )
-    return UpstashCompatibleChatHistory(session_id, redis_client)
-
-prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "You are a helpful, friendly web developer with modern web knowledge. Always respond in valid JSON format:\n"
-            "{{\n"
-            "  'html': '',\n"
-            "  'css': '',\n"
-            "  'js': '',\n"
-            "  'explanation': ''\n"
-            "}}\n\n"
-            "strictly follow below rules:\n"
-            "- Always use **Tailwind CSS classes** for styling. Avoid raw CSS unless necessary.\n"
-            "- Use **GSAP** (GreenSock Animation Platform) for animations in the `js` section.\n"
-            "- The `html` section must be **valid HTML** with better SEO.\n"
-            "- Consider you are working on a **single page application**, implement component-based routing using plain html and js only.\n"
-            "- Consider that boilerplate code is already present, and you only provide html code inside body tag.\n"
-            "- JS code must be **suitable for embedding in a <script> tag**. Never use `import`, `require`, or module syntax.\n"
-            "- If the user gives a casual input (like 'hi', 'thanks', etc.), return the JSON with only the 'explanation'.\n"
-            "- **Implement all necessary functionality of the site fully and accurately**.\n"
-            "- Avoid mockups or placeholders unless explicitly requested.\n"
-            "- If the user asks to update only part of the code (e.g., just JS), keep the rest unchanged.\n"
-            "- The explanation should reflect only the current change or response.\n"
-            "- Keep other sections (html, css, js) as-is unless explicitly asked to change them.\n"
-            "- Only update the existing code, never replace the entire code.\n"
-            "- Use online images wherever needed.\n"
-            "- Use **semantic Tailwind typography classes consistently**: `text-base` for body, `text-lg` to `text-2xl` for headings.\n"
-            "- Use **Tailwind spacing scale** like `p-4`, `my-4`, `gap-2`, etc., for consistent layout.\n"
-            "- Use **rounded-lg**, **shadow-md**, **bg-gray-100**, **text-gray-800**, and other utility classes for a clean modern design.\n"
-            "- Use **responsive classes** where appropriate (e.g., `md:text-lg`).\n"
-            "- Follow a neutral, modern theme: use background `bg-gray-50` to `bg-gray-100`, primary text `text-gray-800`, secondary `text-gray-500`.\n"
-            "- Assume a custom Tailwind config with: `fontFamily: 'Inter, sans-serif'`, `fontSize: base = 16px`, `lg = 18px`, `xl = 20px`, `2xl = 24px`.\n"
-
-        ),
-        MessagesPlaceholder(variable_name="history"),
-        ("user", "{input}"),
-    ]
-)
-
-async def get_ai_response(question: str, session_id: str = "default_id", token: str = API_KEY) -> Response:
-    """Get a response from the Gemini model."""
-    try:
-        parser = JsonOutputParser(pydantic_object=Response)
-        
-        model = ChatGoogleGenerativeAI(model="gemini-2.0-flash",
+
+def _build_prompt(output_format: str) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", output_format + RULES),
+            MessagesPlaceholder(variable_name="history"),
+            ("system", CODE_CONTEXT),
+            ("user", "{input}"),
+        ]
+    )
+
+prompt = _build_prompt(OUTPUT_FORMAT)
+
+def render_code(code: Optional[dict]) -> str:
+    """Render a chat's code as the compact context block sent with each turn."""
+    if not code or not any(code.get(section) for section in SECTIONS):
+        return "(no code yet)"
+    return "\n".join(f"<{section}>\n{code.get(section) or ''}\n</{section}>" for section in SECTIONS)
+
+def _resolve_edits(reply: dict, code: Optional[dict]) -> dict:
+    """Turn a patch-mode reply into html/css/js sections, leaving unchanged ones empty.
+
+    A section whose edits cannot be applied is taken whole from the reply if
+    the model sent it too; otherwise ``PatchError`` is raised. Since an empty
+    section means "unchanged", sections the edits emptied are listed under
+    ``cleared``.
+    """
+    if "edits" not in reply:
+        return reply
+    current = {section: (code or {}).get(section) or "" for section in SECTIONS}
+    patched = apply_edits(current, reply.get("edits") or [], fallback={section: reply.get(section) for section in SECTIONS})
+    resolved = {section: patched[section] if patched[section] != current[section] else "" for section in SECTIONS}
+    resolved["cleared"] = [section for section in SECTIONS if current[section].strip() and not patched[section].strip()]
+    resolved["explanation"] = reply.get("explanation", "")
+    return resolved
+
+parser = JsonOutputParser(pydantic_object=Response)
+
+def _parse_reply(content: str) -> dict:
+    """Parse a finished model reply.
+
+    Unlike ``parser.parse``, which completes truncated JSON for streaming,
+    this rejects a reply the model stopped before finishing.
+
+    Raises:
+        json.JSONDecodeError: If ``content`` is not complete JSON.
+        ValueError: If it is JSON but not an object.
+    """
+    reply = parse_json_markdown(content.strip(), parser=json.loads)
+    if not isinstance(reply, dict):
+        raise ValueError("Received a model reply that is not a JSON object.")
+    return reply
+
+class LLMMetricsHandler(AsyncCallbackHandler):
+    """Record model latency and token usage for every chat model run."""
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                                  **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            STAGE_LATENCY.labels(stage="llm_call").observe(time.perf_counter() - started)
+
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.labels(kind="input").inc(usage.get("input_tokens", 0))
+                    LLM_TOKENS.labels(kind="output").inc(usage.get("output_tokens", 0))
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+llm_metrics = LLMMetricsHandler()
+
+_chains = TTLCache(maxsize=CHAIN_CACHE_SIZE, ttl=CHAIN_CACHE_TTL)
+
+def _token_key(token: str) -> str:
+    """Hash an API token so raw tokens are never kept as cache keys."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def build_model(token: str):
+    """Create the chat model client for an API token."""
+    # The Gemini SDK takes over a second to import; load it with the first chain.
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model="gemini-2.0-flash",
                                 generation_config=GENERATION_CONFIG, api_key=token)
+
+def _build_chain(token: str) -> RunnableWithMessageHistory:
+    chain = prompt | build_model(token)
+    return RunnableWithMessageHistory(
+        chain,
+        get_redis_history,
+        input_messages_key="input",
+        history_messages_key="history",
+    )
+
+def _user_key(user_id: str) -> str:
+    return "user:" + user_id
+
+def get_chain(token: str, user_id: Optional[str] = None) -> RunnableWithMessageHistory:
+    """Return a ready-to-use chain for a token, building it on a cache miss.
+
+    A user's chain is cached under their id together with the hash of the
+    token it was built for, so a token replaced in any worker gets a new chain
+    and ``evict_chain`` needs only the user id. Without ``user_id`` the chain
+    is cached under the token's hash.
+    """
+    token_key = _token_key(token)
+    key = _user_key(user_id) if user_id is not None else token_key
+    cached = _chains.get(key)
+    if cached is None or cached[0] != token_key:
+        cached = (token_key, _build_chain(token))
+        _chains.set(key, cached)
+    return cached[1]
+
+def get_stateless_chain(token: str):
+    """Return the prompt + model chain for a token, without message history."""
+    key = "stateless:" + _token_key(token)
+    chain = _chains.get(key)
+    if chain is None:
+        chain = prompt | build_model(token)
+        _chains.set(key, chain)
+    return chain
+
+def evict_chain(user_id: str) -> None:
+    """Drop a user's cached chain, e.g. after they replace their token."""
+    _chains.pop(_user_key(user_id))
+
+def chain_cache_stats() -> dict:
+    return _chains.stats()
+
+async def get_ai_response(question: str, session_id: str = "default_id", token: str = API_KEY,
+                          code: Optional[dict] = None, user_id: Optional[str] = None) -> Response:
+    """Get a response from the Gemini model.
+
+    ``code`` is the chat's current code, sent to the model as context and used
+    as the base for edits in patch mode. ``user_id`` is the owner of ``token``,
+    whose chain is cached under it (see ``get_chain``).
+    """
+    try:
+        runnableWithHistory = get_chain(token, user_id)
         
-        chain = prompt | model
-        
-        runnableWithHistory = RunnableWithMessageHistory(
-            chain,
-            get_redis_history,
-            input_messages_key="input",
-            history_messages_key="history",
-        )
-        
-        res = runnableWithHistory.invoke(
-            {"input": question},
-            config={"configurable": {"session_id": session_id}},
+        res = await runnableWithHistory.ainvoke(
+            {"input": question, "code": render_code(code)},
+            config={"configurable": {"session_id": session_id}, "callbacks": [llm_metrics]},
         )
-        parsed_response = parser.parse(res.content)
-        return parsed_response
+        with stage("json_parse"):
+            parsed_response = _parse_reply(res.content)
+            return _resolve_edits(parsed_response, code)
     
     except json.JSONDecodeError as e:
-        print("Error parsing response as JSON:", res.content)
+        logger.warning("Model reply for chat %s is not valid JSON: %.200s", session_id, res.content)
         raise ValueError("Received invalid JSON format from the model.") from e
 
-    except Exception as e:
-        print("An error occurred:", e)
-        raise e
+    except Exception:
+        logger.exception("Generation failed for chat %s", session_id)
+        raise
+
+async def get_stateless_ai_response(question: str, token: str = API_KEY) -> Response:
+    """Get a one-off response that neither reads nor writes chat history."""
+    res = await get_stateless_chain(token).ainvoke(
+        {"input": question, "history": [], "code": render_code(None)},
+        config={"callbacks": [llm_metrics]},
+    )
+    with stage("json_parse"):
+        return _resolve_edits(_parse_reply(res.content), None)
 
-# driver code
-# if __name__ == "__main__":
-#     import asyncio
+async def stream_ai_response(question: str, session_id: str = "default_id", token: str = API_KEY,
+                             code: Optional[dict] = None, user_id: Optional[str] = None) -> AsyncIterator[dict]:
+    """Stream a response from the Gemini model, yielding the JSON parsed so far.
 
-#     async def main():
-#         response = await get_ai_response("add footer to it", "test_session_id")
-#         print(response['explanation'])
+    Each item is the partially parsed response object; the last one is the
+    finished reply parsed in full and, in patch mode, with the edits already
+    applied to ``code``.
 
-#     asyncio.run(main())
+    Raises:
+        ValueError: If the finished reply is not a JSON object, e.g. because
+            the model stopped early.
+    """
+    content, partial = "", None
+    async for chunk in get_chain(token, user_id).astream(
+        {"input": question, "code": render_code(code)},
+        config={"configurable": {"session_id": session_id}, "callbacks": [llm_metrics]},
+    ):
+        content += chunk.content
+        partial = parser.parse_result([Generation(text=content)], partial=True)
+        if partial:
+            yield partial
+    with stage("json_parse"):
+        try:
+            reply = _parse_reply(content)
+        except json.JSONDecodeError as e:
+            logger.warning("Streamed reply for chat %s is not valid JSON: %.200s", session_id, content)
+            raise ValueError("Received invalid JSON format from the model.") from e
+        resolved = _resolve_edits(reply, code)
+    yield resolved
@@ -0,0 +1,128 @@
+"""Bound how many LLM generations run at once, per process and per user."""
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 32))
+LLM_MAX_PER_USER = int(os.getenv("LLM_MAX_PER_USER", 2))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 64))
+
+
+class _UserSlots:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.refs = 0
+
+
+class ConcurrencyLimiter:
+    """Admit at most ``max_concurrency`` generations, and ``per_user`` per user.
+
+    Requests over either limit wait in a queue of at most ``max_queue``
+    entries; once the queue is full new requests are rejected with a 429
+    instead of piling up behind slow generations.
+
+    Args:
+        max_concurrency (int): Generations allowed in flight across the process.
+        per_user (int): Generations allowed in flight for a single user.
+        max_queue (int): Requests allowed to wait for a free slot.
+    """
+
+    def __init__(self, max_concurrency: int, per_user: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.per_user = per_user
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._users: Dict[str, _UserSlots] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def check(self, user_id: Optional[str] = None) -> None:
+        """Raise 429 if a request for ``user_id`` would have to queue and the queue is full."""
+        user = self._users.get(user_id) if user_id is not None else None
+        busy = self._semaphore.locked() or (user is not None and user.semaphore.locked())
+        if busy and self.waiting >= self.max_queue:
+            self.rejected += 1
+            logger.warning("LLM queue full (%d waiting); rejecting request", self.waiting)
+            raise HTTPException(status_code=429, detail="Too many requests, please retry shortly",
+                                headers={"Retry-After": "1"})
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold a generation slot for the duration of the block.
+
+        ``user_id=None`` applies only the process-wide limit.
+        """
+        self.check(user_id)
+
+        user = None
+        if user_id is not None:
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = _UserSlots(self.per_user)
+            user.refs += 1
+
+        self.waiting += 1
+        queued = True
+        try:
+            if user is not None:
+                await user.semaphore.acquire()
+            try:
+                await self._semaphore.acquire()
+            except BaseException:
+                if user is not None:
+                    user.semaphore.release()
+                raise
+            self.waiting -= 1
+            queued = False
+
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self._semaphore.release()
+                if user is not None:
+                    user.semaphore.release()
+        finally:
+            if queued:
+                self.waiting -= 1
+            if user is not None:
+                user.refs -= 1
+                if user.refs == 0:
+                    del self._users[user_id]
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for running and queued generations to finish.
+
+        Returns False if some were still running when the timeout expired.
+        """
+        deadline = asyncio.get_running_loop().time() + timeout
+        while self.in_flight or self.waiting:
+            if asyncio.get_running_loop().time() >= deadline:
+                logger.warning("Shutdown with %d generations in flight, %d waiting", self.in_flight, self.waiting)
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.per_user,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+llm_limiter = ConcurrencyLimiter(LLM_MAX_CONCURRENCY, LLM_MAX_PER_USER, LLM_MAX_QUEUE)
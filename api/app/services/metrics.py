@@ -0,0 +1,87 @@
+"""Prometheus metrics: request latency per route, chat stage timings and LLM usage.
+
+Everything is registered in one ``CollectorRegistry`` served by ``/metrics``.
+Pool and cache figures that already exist as ``stats()`` dicts are exported as
+gauges, refreshed each time the endpoint is scraped.
+"""
+import time
+from typing import Dict
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+registry = CollectorRegistry()
+
+# Chat turns span milliseconds (cache hits) to tens of seconds (long generations).
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS, registry=registry,
+)
+STAGE_LATENCY = Histogram(
+    "chat_stage_duration_seconds", "Time spent in each stage of a chat turn.",
+    ["stage"], buckets=_LATENCY_BUCKETS, registry=registry,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by the model, by direction.", ["kind"], registry=registry,
+)
+HISTORY_KEYS_RECLAIMED = Counter(
+    "history_keys_reclaimed_total", "Orphaned chat history keys deleted by the reconciler.", registry=registry,
+)
+HISTORY_BYTES_RECLAIMED = Counter(
+    "history_bytes_reclaimed_total", "Redis memory freed by the history reconciler.", registry=registry,
+)
+COMPONENT_STATS = Gauge(
+    "component_stat", "Numeric fields of the pool, cache and limiter stats.",
+    ["component", "field"], registry=registry,
+)
+
+
+def stage(name: str):
+    """Time a block as one stage of a chat turn: ``with stage("llm_call"): ...``."""
+    return STAGE_LATENCY.labels(stage=name).time()
+
+
+def _export_stats(component: str, stats: dict) -> None:
+    for field, value in stats.items():
+        if isinstance(value, (int, float)):
+            COMPONENT_STATS.labels(component=component, field=field).set(value)
+
+
+def render(stats: Dict[str, dict]) -> bytes:
+    """Refresh the component gauges from ``stats`` and return the exposition text."""
+    for component, values in stats.items():
+        _export_stats(component, values)
+    return generate_latest(registry)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request until its response body is sent.
+
+    Requests are labelled with the matched route template (``/chats/{chat_id}``),
+    never the raw path, so label cardinality stays bounded. Streaming responses
+    are timed until the stream ends.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            labels = {"method": scope["method"], "route": route.path if route is not None else "unmatched"}
+            REQUEST_LATENCY.labels(status=str(status), **labels).observe(time.perf_counter() - started)
@@ -0,0 +1,65 @@
+"""Apply find/replace edits returned by the model to a chat's code."""
+from typing import Dict, List, Optional, Tuple
+
+SECTIONS = ("html", "css", "js")
+
+
+class PatchError(ValueError):
+    """Raised when an edit cannot be applied to the current code."""
+
+
+def _check(edit) -> Tuple[str, str, str]:
+    """Return an edit as ``(section, find, replace)``, or raise if it is malformed."""
+    if not isinstance(edit, dict):
+        raise PatchError(f"Malformed edit: {edit!r:.80}")
+    section = edit.get("section")
+    if section not in SECTIONS:
+        raise PatchError(f"Unknown code section: {section!r}")
+    find, replace = edit.get("find") or "", edit.get("replace") or ""
+    if not isinstance(find, str) or not isinstance(replace, str):
+        raise PatchError(f"Malformed edit of {section}: find and replace must be text")
+    return section, find, replace
+
+
+def _apply(text: str, section: str, find: str, replace: str) -> str:
+    if not find:
+        return replace
+    count = text.count(find)
+    if count == 0:
+        raise PatchError(f"Edit target not found in {section}: {find[:80]!r}")
+    if count > 1:
+        raise PatchError(f"Edit target occurs {count} times in {section}: {find[:80]!r}")
+    return text.replace(find, replace, 1)
+
+
+def apply_edits(code: Dict[str, str], edits: List[dict],
+                fallback: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Return a copy of ``code`` with ``edits`` applied in order.
+
+    Each edit is ``{"section", "find", "replace"}``. An empty ``find`` replaces
+    the whole section; otherwise ``find`` must occur exactly once in the
+    section as it stands when the edit is applied. Sections are patched
+    independently: if one of a section's edits fails and ``fallback`` has text
+    for that section, the section becomes that text instead.
+
+    Raises:
+        PatchError: If the edits are malformed or name an unknown section, or
+            an edit's ``find`` text is missing from or ambiguous in its
+            section and there is no fallback for it.
+    """
+    if not isinstance(edits, (list, tuple)):
+        raise PatchError(f"Edits must be a list, got {type(edits).__name__}")
+    checked: List[Tuple[str, str, str]] = [_check(edit) for edit in edits]
+
+    patched = {section: code.get(section) or "" for section in SECTIONS}
+    for section in SECTIONS:
+        try:
+            for edit_section, find, replace in checked:
+                if edit_section == section:
+                    patched[section] = _apply(patched[section], section, find, replace)
+        except PatchError:
+            whole = (fallback or {}).get(section)
+            if not isinstance(whole, str) or not whole.strip():
+                raise
+            patched[section] = whole
+    return patched
@@ -0,0 +1,125 @@
+"""Render a chat's code as a complete HTML page, cached per version of the code.
+
+Pages are keyed by a hash of the code and the template, which doubles as their
+strong ETag, so a cached page can never be stale: changed code gets a new key.
+Each page is rendered and compressed (at higher levels than on-the-fly
+responses, in a worker thread) once per version; later requests only pick
+the variant the client accepts. Saving new code for a chat drops its previous page from this
+worker's cache; in other workers it ages out of the LRU.
+
+Pages are served from the API's origin, so they go out with ``PREVIEW_CSP``.
+It sandboxes them like the editor's preview iframe: scripts run, but in an
+opaque origin that cannot call the API with the user's credentials.
+"""
+import os
+import re
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict
+
+from dotenv import load_dotenv
+
+from ..utils.cache import TTLCache
+from ..utils.compression import ENCODERS, compress
+
+load_dotenv()
+
+PREVIEW_CACHE_SIZE = int(os.getenv("PREVIEW_CACHE_SIZE", 256))
+PREVIEW_CACHE_TTL = float(os.getenv("PREVIEW_CACHE_TTL", 3600))
+# Pages are compressed once per version. Brotli 10 and 11 shave a few percent
+# more at 5-30x the time, which the first view after every turn would wait for.
+PREVIEW_COMPRESS_LEVELS = {"br": int(os.getenv("PREVIEW_BROTLI_QUALITY", 9)),
+                           "gzip": int(os.getenv("PREVIEW_GZIP_LEVEL", 9))}
+
+# Kept in step with the sandbox attribute of the editor's preview iframe.
+PREVIEW_CSP = "sandbox allow-scripts"
+
+# Kept in step with the document the editor builds in ui/src/components/code-editor.jsx.
+PREVIEW_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8" />
+<meta name="viewport" content="width=device-width, initial-scale=1.0" />
+<base target="_blank" />
+<script src="https://cdn.tailwindcss.com"></script>
+<script src="https://cdnjs.cloudflare.com/ajax/libs/gsap/3.12.5/gsap.min.js"></script>
+<script src="https://cdnjs.cloudflare.com/ajax/libs/gsap/3.12.5/ScrollTrigger.min.js"></script>
+<style>{css}</style>
+<style>html, body, #root {{ height: 100%; margin: 0; padding: 0; }}</style>
+<title>Preview</title>
+</head>
+<body>
+{html}
+<script>
+{js}
+</script>
+</body>
+</html>
+"""
+
+_CLOSING_STYLE = re.compile(r"</(style)", re.IGNORECASE)
+_CLOSING_SCRIPT = re.compile(r"</(script)", re.IGNORECASE)
+
+
+@dataclass
+class RenderedPage:
+    """A rendered preview and its precompressed variants, keyed by content coding."""
+    etag: str
+    body: bytes
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+# Rendered pages by ETag, and the ETag last served for each chat.
+_pages = TTLCache(maxsize=PREVIEW_CACHE_SIZE, ttl=PREVIEW_CACHE_TTL)
+_chat_pages = TTLCache(maxsize=PREVIEW_CACHE_SIZE, ttl=PREVIEW_CACHE_TTL)
+
+
+def preview_etag(code: dict) -> str:
+    """Return the strong ETag of the page ``code`` renders to."""
+    digest = hashlib.sha256(PREVIEW_TEMPLATE.encode("utf-8"))
+    for section in ("html", "css", "js"):
+        digest.update(b"\0")
+        digest.update((code.get(section) or "").encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def render_page(code: dict) -> str:
+    """Return the complete HTML document for ``code``.
+
+    CSS and JS are inlined; a literal ``</style`` or ``</script`` inside them
+    is escaped so it cannot end its element early.
+    """
+    return PREVIEW_TEMPLATE.format(
+        html=code.get("html") or "",
+        css=_CLOSING_STYLE.sub(r"<\\/\1", code.get("css") or ""),
+        js=_CLOSING_SCRIPT.sub(r"<\\/\1", code.get("js") or ""),
+    )
+
+
+def _build(etag: str, code: dict) -> RenderedPage:
+    body = render_page(code).encode("utf-8")
+    encoded = {coding: compress(body, coding, PREVIEW_COMPRESS_LEVELS[coding]) for coding in ENCODERS}
+    return RenderedPage(etag, body, encoded)
+
+
+async def get_preview(chat_id: str, code: dict, etag: str) -> RenderedPage:
+    """Return the rendered page for a chat's code, rendering it on first use."""
+    page = _pages.get(etag)
+    if page is None:
+        page = await asyncio.to_thread(_build, etag, code)
+        _pages.set(etag, page)
+    _chat_pages.set(chat_id, etag)
+    return page
+
+
+def invalidate_preview(chat_id: str) -> None:
+    """Drop the page last rendered for a chat, whose code has just changed."""
+    etag = _chat_pages.get(chat_id)
+    if etag is not None:
+        _chat_pages.pop(chat_id)
+        _pages.pop(etag)
+
+
+def preview_cache_stats() -> dict:
+    return _pages.stats()
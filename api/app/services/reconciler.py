@@ -0,0 +1,74 @@
+"""Remove Redis chat histories whose chat no longer exists in MongoDB.
+
+Histories are normally deleted with their chat and otherwise expire after
+``HISTORY_TTL``; the reconciler catches what slips through (a failed delete,
+keys written before histories had a TTL, the old shared ``default_id``
+history). Keys are walked with ``SCAN``, checked against Mongo one batch at a
+time and deleted with a pipeline, so a run never blocks Redis.
+"""
+import os
+import asyncio
+import logging
+import time
+
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from ..config.redis import get_redis
+from ..repositories import chat as chats_repo, history as history_repo
+from .metrics import HISTORY_BYTES_RECLAIMED, HISTORY_KEYS_RECLAIMED
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HISTORY_RECONCILE_INTERVAL = float(os.getenv("HISTORY_RECONCILE_INTERVAL", 3600))
+HISTORY_RECONCILE_BATCH = int(os.getenv("HISTORY_RECONCILE_BATCH", 500))
+
+_LOCK_KEY = "history_reconciler:lock"
+
+
+async def reconcile_histories(batch_size: int = HISTORY_RECONCILE_BATCH, dry_run: bool = False) -> dict:
+    """Delete history keys of chats that no longer exist and report what was reclaimed.
+
+    Returns:
+        dict: ``scanned`` keys, ``orphaned`` keys found, ``deleted`` keys and
+        ``bytes_reclaimed`` (as reported by ``MEMORY USAGE``; what would be
+        reclaimed on a dry run), plus ``seconds``.
+    """
+    started = time.perf_counter()
+    report = {"scanned": 0, "orphaned": 0, "deleted": 0, "bytes_reclaimed": 0}
+    async for keys in history_repo.scan_history_keys(batch_size):
+        report["scanned"] += len(keys)
+        sessions = {key: history_repo.session_of(key) for key in keys}
+        chat_ids = {ObjectId(s) for s in sessions.values() if ObjectId.is_valid(s)}
+        existing = {str(chat_id) for chat_id in await chats_repo.find_existing_chat_ids(list(chat_ids))}
+
+        orphans = [key for key, session_id in sessions.items() if session_id not in existing]
+        if not orphans:
+            continue
+        report["orphaned"] += len(orphans)
+        report["bytes_reclaimed"] += sum((await history_repo.key_sizes(orphans)).values())
+        if not dry_run:
+            report["deleted"] += await history_repo.delete_keys(orphans)
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+async def run_reconciler(interval: float = HISTORY_RECONCILE_INTERVAL) -> None:
+    """Reconcile every ``interval`` seconds until cancelled.
+
+    Every worker runs this loop, but a Redis lock held for the interval lets
+    only one of them do the work each time.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await get_redis().set(_LOCK_KEY, os.getpid(), nx=True, ex=max(1, int(interval))):
+                report = await reconcile_histories()
+                HISTORY_KEYS_RECLAIMED.inc(report["deleted"])
+                HISTORY_BYTES_RECLAIMED.inc(report["bytes_reclaimed"])
+                logger.info("History reconciler: %s", report)
+        except Exception as e:
+            logger.error("History reconciler run failed: %s", e)
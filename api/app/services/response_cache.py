@@ -0,0 +1,144 @@
+"""Exact-match cache for stateless prompts, shared across workers through Redis.
+
+Entries are keyed on the normalized prompt and the prompt-template version and
+expire after ``ttl`` seconds. A sorted set of last-access times bounds the
+cache to ``maxsize`` entries, evicting the least recently used first.
+Concurrent misses for the same prompt in one process share a single
+generation instead of each calling the model.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from typing import Awaitable, Callable, Dict
+
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from ..config.redis import get_redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 10000))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 24 * 3600))
+
+_PREFIX = "response_cache"
+
+
+def normalize_prompt(text: str) -> str:
+    """Normalize Unicode, collapse whitespace and ignore case."""
+    return " ".join(unicodedata.normalize("NFKC", text).split()).casefold()
+
+
+class ResponseCache:
+    """Cache generated responses by prompt, with TTL, LRU bound and coalescing.
+
+    Redis errors are logged and treated as misses, so an unavailable cache
+    only costs the generation it would have saved.
+
+    Args:
+        version (str): Prompt-template version; part of every key.
+        maxsize (int): Maximum number of cached responses.
+        ttl (int): Seconds a response stays cached after it was generated.
+
+    Attributes:
+        hits (int): Prompts answered from Redis.
+        misses (int): Prompts that needed a generation.
+        coalesced (int): Prompts that waited on another request's generation.
+        errors (int): Redis lookups or stores that failed.
+        saved_seconds (float): Generation time avoided by hits and coalescing.
+    """
+
+    def __init__(self, version: str, maxsize: int, ttl: int):
+        self.version = version
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.index_key = f"{_PREFIX}:{version}:index"
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.saved_seconds = 0.0
+
+    def key(self, prompt: str) -> str:
+        digest = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+        return f"{_PREFIX}:{self.version}:{digest}"
+
+    async def _get(self, key: str):
+        redis = get_redis()
+        raw = await redis.get(key)
+        if raw is None:
+            await redis.zrem(self.index_key, key)
+            return None
+        await redis.zadd(self.index_key, {key: time.time()})
+        return json.loads(raw)
+
+    async def _set(self, key: str, entry: dict) -> None:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.set(key, json.dumps(entry), ex=self.ttl)
+            pipe.zadd(self.index_key, {key: time.time()})
+            pipe.zcard(self.index_key)
+            size = (await pipe.execute())[-1]
+
+        if size > self.maxsize:
+            evicted = [member for member, _ in await get_redis().zpopmin(self.index_key, size - self.maxsize)]
+            if evicted:
+                await get_redis().delete(*evicted)
+
+    async def get_or_generate(self, prompt: str, generate: Callable[[], Awaitable[dict]]) -> dict:
+        """Return the cached response for ``prompt``, generating it on a miss."""
+        key = self.key(prompt)
+        try:
+            entry = await self._get(key)
+        except RedisError as e:
+            self.errors += 1
+            logger.warning("Response cache lookup failed: %s", e)
+            entry = None
+        if entry is not None:
+            self.hits += 1
+            self.saved_seconds += entry["latency"]
+            return entry["response"]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            # Generate in a task of its own so it completes (and is cached) even
+            # if the request that started it goes away.
+            task = self._in_flight[key] = asyncio.create_task(self._generate(key, generate))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            return (await asyncio.shield(task))["response"]
+
+        self.coalesced += 1
+        entry = await asyncio.shield(task)
+        self.saved_seconds += entry["latency"]
+        return entry["response"]
+
+    async def _generate(self, key: str, generate: Callable[[], Awaitable[dict]]) -> dict:
+        started = time.perf_counter()
+        entry = {"response": await generate(), "latency": time.perf_counter() - started}
+        try:
+            await self._set(key, entry)
+        except RedisError as e:
+            self.errors += 1
+            logger.warning("Response cache store failed: %s", e)
+        return entry
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "version": self.version,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
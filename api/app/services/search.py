@@ -0,0 +1,78 @@
+import os
+import re
+import asyncio
+import logging
+from typing import List
+
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+from ..repositories import chat as chats_repo, search as search_repo
+from ..schemas.chat import chat_hit, message_hit
+from .metrics import stage
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", 160))
+# How deep a user can page: offset + limit may not exceed this.
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", 200))
+SEARCH_HITS_PER_BUCKET = int(os.getenv("SEARCH_HITS_PER_BUCKET", 3))
+
+_WORD = re.compile(r"\w+")
+_MAX_TERMS = 10
+
+
+def search_terms(query: str) -> List[str]:
+    """Return the lower-cased words of a ``$text`` query, without negated ones."""
+    terms = []
+    for token in query.lower().split():
+        if token.startswith("-"):
+            continue
+        for word in _WORD.findall(token):
+            if word not in terms:
+                terms.append(word)
+    return terms[:_MAX_TERMS]
+
+
+async def search_chats_by_user_id(user_id: str, query: str, limit: int = 20, offset: int = 0) -> dict:
+    """Search a user's chat names, code and messages, best matches first.
+
+    Chats and message buckets are searched through their text indexes and
+    their hits merged by score; a bucket yields a hit per matching message,
+    up to ``SEARCH_HITS_PER_BUCKET``. ``query`` accepts the ``$text`` syntax
+    (``"exact phrase"``, ``-excluded``). ``next_offset`` is set when there
+    may be more hits.
+    """
+    logger.info("Searching chats of user_id: %s", user_id)
+    terms = search_terms(query)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no terms")
+    depth = offset + limit
+    if depth > SEARCH_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"Cannot page past {SEARCH_MAX_RESULTS} results")
+
+    try:
+        with stage("search"):
+            chats, buckets = await asyncio.gather(
+                search_repo.search_chats(user_id, query, terms, depth, SEARCH_SNIPPET_CHARS),
+                search_repo.search_messages(user_id, query, terms, depth, SEARCH_SNIPPET_CHARS, SEARCH_HITS_PER_BUCKET),
+            )
+            names = await chats_repo.find_chat_names(user_id, list({bucket["chatId"] for bucket in buckets}))
+    except Exception as e:
+        logger.error("Search failed for user %s: %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Failed to search chats")
+
+    hits = []
+    for chat in chats:
+        # Stemmed matches may contain no query term verbatim; show the name then.
+        field = next((field for field, snippet in chat["snippets"].items() if snippet), "name")
+        hits.append(chat_hit(chat, field, chat["snippets"][field] or chat["name"]))
+    for bucket in buckets:
+        if bucket["chatId"] in names:
+            hits.extend(message_hit(bucket, message, names[bucket["chatId"]]) for message in bucket["messages"])
+    hits.sort(key=lambda hit: -hit["score"])
+
+    more = len(hits) > depth or len(chats) == depth or len(buckets) == depth
+    return {"hits": hits[offset:depth], "next_offset": depth if more else None}
@@ -0,0 +1,71 @@
+"""Content-addressed snapshots of a chat's code.
+
+A snapshot is the SHA-256 of each section (see ``CodeSnapshot``); the sections
+themselves are blobs in the code_blobs collection, keyed by that hash. Turns
+that leave a section unchanged reuse its blob, so a long chat stores each
+distinct section once instead of a full copy of the code per turn. Sections
+of ``CODE_BLOB_COMPRESS_MIN_BYTES`` or more are zlib-compressed.
+"""
+import os
+import hashlib
+import zlib
+from typing import Dict
+
+from bson import Binary
+from dotenv import load_dotenv
+
+from ..models.chat import CodeSnapshot
+from ..repositories import snapshot as snapshot_repo
+from .patch import SECTIONS
+
+load_dotenv()
+
+CODE_BLOB_COMPRESS_MIN_BYTES = int(os.getenv("CODE_BLOB_COMPRESS_MIN_BYTES", 1024))
+
+
+class SnapshotError(LookupError):
+    """Raised when a snapshot refers to a blob that is not stored."""
+
+
+def section_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_blob(text: str, compress_min_bytes: int = CODE_BLOB_COMPRESS_MIN_BYTES) -> dict:
+    """Build the stored document for a section, compressing it when that pays off."""
+    raw = text.encode("utf-8")
+    blob = {"_id": hashlib.sha256(raw).hexdigest(), "size": len(raw), "zlib": False, "data": Binary(raw)}
+    if len(raw) >= compress_min_bytes:
+        compressed = zlib.compress(raw)
+        if len(compressed) < len(raw):
+            blob.update(zlib=True, data=Binary(compressed))
+    return blob
+
+
+def decode_blob(blob: dict) -> str:
+    data = bytes(blob["data"])
+    return (zlib.decompress(data) if blob["zlib"] else data).decode("utf-8")
+
+
+async def save_snapshot(code: dict) -> CodeSnapshot:
+    """Store any sections of ``code`` not stored yet and return its snapshot.
+
+    Existing blobs are looked up by id first, so unchanged sections cost a
+    lookup rather than a resend of their contents.
+    """
+    texts = {section: code.get(section) or "" for section in SECTIONS}
+    hashes = {section: section_hash(text) for section, text in texts.items()}
+    by_hash = {hashes[section]: text for section, text in texts.items()}
+
+    existing = await snapshot_repo.find_existing_blob_ids(by_hash)
+    await snapshot_repo.insert_blobs([encode_blob(text) for blob_id, text in by_hash.items() if blob_id not in existing])
+    return CodeSnapshot(**hashes)
+
+
+async def load_snapshot(snapshot: dict) -> Dict[str, str]:
+    """Return the code a snapshot refers to, fetching its blobs in one query."""
+    blobs = await snapshot_repo.find_blobs(set(snapshot[section] for section in SECTIONS))
+    missing = [section for section in SECTIONS if snapshot[section] not in blobs]
+    if missing:
+        raise SnapshotError(f"Missing blobs for sections: {', '.join(missing)}")
+    return {section: decode_blob(blobs[snapshot[section]]) for section in SECTIONS}
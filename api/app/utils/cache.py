@@ -0,0 +1,76 @@
+"""Small in-process caches shared by the services."""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """A size-bounded LRU mapping whose entries expire after ``ttl`` seconds.
+
+    Args:
+        maxsize (int): Maximum number of entries kept; the least recently used
+            entry is evicted when the cache is full.
+        ttl (float): Seconds an entry stays valid after it was stored.
+        clock (Callable[[], float]): Monotonic time source, injectable for tests.
+
+    Attributes:
+        hits (int): Lookups that found a live entry.
+        misses (int): Lookups that found nothing or an expired entry.
+        evictions (int): Entries removed for size, expiry or invalidation.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return a live entry and mark it most recently used."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.evictions += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store an entry, evicting the least recently used one if full."""
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        """Invalidate an entry if present."""
+        if self._data.pop(key, None) is not None:
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.evictions += len(self._data)
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,181 @@
+"""Compress responses with brotli or gzip, whichever the client prefers.
+
+Only complete bodies of at least ``COMPRESS_MIN_BYTES`` are compressed.
+Streams (Server-Sent Events in particular) pass through untouched so every
+event still reaches the client as soon as it is sent, as do responses that
+already carry a ``Content-Encoding``. Brotli is used when the ``brotli``
+package is installed; gzip otherwise.
+
+A compressed body is a different representation from the identity one, so
+its ETag gets the coding appended (``"abc"`` becomes ``"abc-gzip"``);
+``etag_match`` accepts any of a tag's coded variants in ``If-None-Match``.
+"""
+import asyncio
+import gzip
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+load_dotenv()
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+# Dynamic content: fast levels give most of the size win at a fraction of the CPU.
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+# Bodies this large are compressed in a worker thread to keep the event loop free.
+COMPRESS_THREAD_MIN_BYTES = int(os.getenv("COMPRESS_THREAD_MIN_BYTES", 256 * 1024))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/css", "text/plain",
+                      "application/javascript", "text/javascript")
+
+
+def _gzip(body: bytes, level: int = COMPRESS_GZIP_LEVEL) -> bytes:
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _brotli(body: bytes, level: int = COMPRESS_BROTLI_QUALITY) -> bytes:
+    return brotli.compress(body, quality=level)
+
+
+# In order of preference when the client accepts several equally.
+ENCODERS: Dict[str, Callable[..., bytes]] = {"br": _brotli, "gzip": _gzip} if brotli else {"gzip": _gzip}
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Return the supported coding the client ranks highest in ``Accept-Encoding``, if any."""
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.strip()] = q
+
+    best = None
+    for coding in ENCODERS:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (coding, q)
+    return best[0] if best else None
+
+
+def compress(body: bytes, coding: str, level: Optional[int] = None) -> bytes:
+    """Compress ``body`` with ``coding`` at ``level``, or the configured level for responses."""
+    return ENCODERS[coding](body) if level is None else ENCODERS[coding](body, level)
+
+
+def encoded_etag(etag: str, coding: Optional[str]) -> str:
+    """Return the ETag of the ``coding`` variant of the representation tagged ``etag``."""
+    if not coding or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+# An entity tag, weak or strong; the opaque part may itself contain commas.
+_ENTITY_TAG = re.compile(r'\*|(?:W/)?("[^"]*")')
+
+
+def if_none_match(header: Optional[str]) -> List[str]:
+    """Return the entity tags listed in an ``If-None-Match`` header.
+
+    Weak tags are returned in their strong form, since ``If-None-Match`` uses
+    the weak comparison; ``*`` is returned as it is.
+    """
+    return [match.group(1) or "*" for match in _ENTITY_TAG.finditer(header or "")]
+
+
+def etag_match(etag: str, header: Optional[str]) -> Optional[str]:
+    """Return the tag in ``If-None-Match`` that ``etag`` or one of its coded variants matches.
+
+    That is the tag of the variant the client holds, which a 304 should carry;
+    ``etag`` itself when the header is ``*``. None when nothing matches.
+    """
+    variants = {etag, *(encoded_etag(etag, coding) for coding in ENCODERS)}
+    for tag in if_none_match(header):
+        if tag == "*":
+            return etag
+        if tag in variants:
+            return tag
+    return None
+
+
+def _vary_on_encoding(headers: MutableHeaders) -> None:
+    vary = {value.strip().lower() for value in headers.get("vary", "").split(",")}
+    if not vary & {"accept-encoding", "*"}:
+        headers.add_vary_header("Accept-Encoding")
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete, compressible responses.
+
+    Compressible responses and 304s vary by ``Accept-Encoding`` whether or
+    not this request's response is compressed; a compressed response's ETag
+    becomes its coding's variant (see ``encoded_etag``).
+
+    Args:
+        app: The wrapped ASGI application.
+        minimum_size (int): Smaller bodies are sent as they are.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        coding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+                passthrough = ("content-encoding" in headers or media_type not in COMPRESSIBLE_TYPES
+                               or message["status"] in (204, 206, 304))
+                if message["status"] == 304:
+                    # The 304 stands in for a 200 that would have varied by coding.
+                    _vary_on_encoding(MutableHeaders(scope=message))
+                if passthrough:
+                    await send(message)
+                else:
+                    # Hold the headers back until the body shows whether to compress.
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body" or start is None:
+                return await send(message)
+
+            headers = MutableHeaders(raw=start["headers"])
+            _vary_on_encoding(headers)
+            body = message.get("body", b"")
+            if coding and not message.get("more_body", False) and len(body) >= self.minimum_size:
+                if len(body) >= COMPRESS_THREAD_MIN_BYTES:
+                    compressed = await asyncio.to_thread(compress, body, coding)
+                else:
+                    compressed = compress(body, coding)
+                if len(compressed) < len(body):
+                    headers["Content-Encoding"] = coding
+                    headers["Content-Length"] = str(len(compressed))
+                    if "etag" in headers:
+                        headers["ETag"] = encoded_etag(headers["etag"], coding)
+                    message = {**message, "body": compressed}
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,60 @@
+"""Compact, versioned encoding for chat history entries stored in Redis.
+
+Each entry is one format byte followed by the payload:
+
+- ``0x01``: UTF-8 JSON ``{"t": type, "c": content}``
+- ``0x02``: the same JSON, zlib-compressed (used above ``compress_min_bytes``)
+
+Entries written before this format are pickled ``BaseMessage`` objects and
+start with the pickle protocol marker ``0x80``; they are still readable so
+existing histories keep working until they roll out of the window.
+"""
+import json
+import os
+import pickle
+import zlib
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+load_dotenv()
+
+HISTORY_COMPRESS_MIN_BYTES = int(os.getenv("HISTORY_COMPRESS_MIN_BYTES", 1024))
+
+FORMAT_JSON = 0x01
+FORMAT_JSON_ZLIB = 0x02
+_PICKLE_MARKER = 0x80
+
+_MESSAGE_TYPES = {
+    "human": HumanMessage,
+    "ai": AIMessage,
+    "system": SystemMessage,
+}
+
+
+def encode_message(message: BaseMessage, compress_min_bytes: int = HISTORY_COMPRESS_MIN_BYTES) -> bytes:
+    """Encode a message's role and content, compressing large payloads."""
+    message_type = "ai" if isinstance(message, AIMessage) else message.type
+    payload = json.dumps({"t": message_type, "c": message.content}, separators=(",", ":")).encode("utf-8")
+    if len(payload) >= compress_min_bytes:
+        compressed = zlib.compress(payload)
+        if len(compressed) < len(payload):
+            return bytes([FORMAT_JSON_ZLIB]) + compressed
+    return bytes([FORMAT_JSON]) + payload
+
+
+def decode_message(data: bytes) -> BaseMessage:
+    """Decode an entry written by ``encode_message`` or a legacy pickled message."""
+    marker = data[0]
+    if marker == FORMAT_JSON:
+        payload = data[1:]
+    elif marker == FORMAT_JSON_ZLIB:
+        payload = zlib.decompress(data[1:])
+    elif marker == _PICKLE_MARKER:
+        # Legacy entries were written by this service, never by clients.
+        return pickle.loads(data)
+    else:
+        raise ValueError(f"Unknown history entry format: {marker:#x}")
+
+    entry = json.loads(payload)
+    return _MESSAGE_TYPES.get(entry["t"], HumanMessage)(content=entry["c"])
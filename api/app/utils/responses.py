@@ -0,0 +1,31 @@
+"""Encode API payloads with orjson in a single pass.
+
+FastAPI's default path walks a returned dict with ``jsonable_encoder`` and
+then encodes it again with ``json.dumps``; chat payloads carry tens of KB of
+HTML/CSS/JS, so both passes show up in latency. Routes that return large
+payloads wrap them in ``FastJSONResponse`` themselves, which skips the first
+pass; the app also uses it as its default response class.
+"""
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode to compact JSON; datetimes as ISO 8601, enums by value and ObjectIds as strings."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """A ``JSONResponse`` rendered with ``dumps``."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,52 @@
+"""Compare per-request overhead of a cold vs. a warm Gemini chain.
+
+The real model client is replaced by a stub that answers instantly, so the
+numbers isolate what ``get_ai_response`` spends on building the parser, model
+client, chain and history wrapper versus reusing a cached chain.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .common import FakeGeminiModel, summarize
+
+
+async def run(requests: int) -> dict:
+    from app.config.redis import connect_redis, close_redis, get_redis
+    from app.services import gemini
+
+    gemini.build_model = lambda token: FakeGeminiModel()
+    await connect_redis()
+    try:
+        async def measure(warm: bool):
+            samples = []
+            for i in range(requests):
+                token = "warm-token" if warm else f"cold-token-{i}"
+                await get_redis().delete(f"chat_history:bench-{warm}")
+                start = time.perf_counter()
+                await gemini.get_ai_response("hi", f"bench-{warm}", token)
+                samples.append(time.perf_counter() - start)
+            return samples
+
+        cold = await measure(warm=False)
+        warm = await measure(warm=True)
+    finally:
+        await close_redis()
+
+    return {
+        "cold": summarize(cold),
+        "warm": summarize(warm),
+        "chain_cache": gemini.chain_cache_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
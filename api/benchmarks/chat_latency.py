@@ -0,0 +1,77 @@
+"""Measure ``GET /chats/{chat_id}`` latency while messages are being posted.
+
+Writers keep ``POST /chats/{chat_id}/messages/{user_id}`` requests in flight
+(with a fake LLM that sleeps ``--llm-delay-ms``) while a reader repeatedly
+fetches another chat. If any handler blocks the event loop, reader p99 climbs
+to the length of the blocking call.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .common import app_client, fake_ai_response, summarize, use_throwaway_keys
+
+
+async def run(writers: int, reads: int, llm_delay: float, interval: float) -> dict:
+    from app.services import gemini
+
+    gemini.get_ai_response = fake_ai_response(llm_delay)
+
+    async with app_client() as client:
+        user_id = "bench-user"
+        await client.post(f"/chats/users/{user_id}/token", json={"token": "bench-token"})
+        read_chat = (await client.post(f"/chats/users/{user_id}", json={"name": "read"})).json()["id"]
+        write_chats = [
+            (await client.post(f"/chats/users/{user_id}", json={"name": f"w{i}"})).json()["id"]
+            for i in range(writers)
+        ]
+
+        stop = asyncio.Event()
+        posted = 0
+
+        async def writer(chat_id: str):
+            nonlocal posted
+            while not stop.is_set():
+                await client.post(f"/chats/{chat_id}/messages/{user_id}", json={"input": "make it blue"})
+                posted += 1
+
+        async def reader():
+            samples = []
+            for _ in range(reads):
+                start = time.perf_counter()
+                response = await client.get(f"/chats/{read_chat}")
+                samples.append(time.perf_counter() - start)
+                response.raise_for_status()
+                await asyncio.sleep(interval)
+            return samples
+
+        tasks = [asyncio.create_task(writer(chat_id)) for chat_id in write_chats]
+        await asyncio.sleep(llm_delay / 2)
+        samples = await reader()
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    return {
+        "writers": writers,
+        "llm_delay_ms": llm_delay * 1000,
+        "messages_posted": posted,
+        "get_chat": summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--llm-delay-ms", type=float, default=50)
+    parser.add_argument("--read-interval-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    use_throwaway_keys()
+    report = asyncio.run(run(args.writers, args.reads, args.llm_delay_ms / 1000, args.read_interval_ms / 1000))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
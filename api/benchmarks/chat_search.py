@@ -0,0 +1,148 @@
+"""Time chat search over ``--chats`` synthetic chats (10,000 by default).
+
+Chats are spread over ``--users`` owners, each with a name, a page of code and
+``--turns`` user/AI message pairs, all drawn from a small vocabulary so
+common words match thousands of chats while planted ones match a few. For
+each query, ``search`` is ``search_chats_by_user_id`` for one owner (text
+indexes, snippets cut on the server); ``client_scan`` is the only option
+without it: list the owner's chats, fetch each with ``get_chat_by_id`` and
+look for the words locally.
+
+Text indexes need a real server: run against the docker-compose
+``mongo-stack`` with ``MONGO_URI`` exported (see ``benchmarks/common.py``).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from .common import summarize
+
+WORDS = ("hero", "pricing", "gallery", "footer", "navbar", "testimonial", "contact", "portfolio",
+         "dashboard", "landing", "gradient", "animation", "carousel", "newsletter", "blog", "signup")
+# Planted in one chat in a hundred, to measure selective queries.
+RARE_WORD = "zephyr"
+
+QUERIES = {
+    "common_word": "hero",
+    "two_words": "pricing carousel",
+    "rare_word": RARE_WORD,
+    "phrase": "\"dark gradient\"",
+}
+
+
+def _chat(rng: random.Random, user_id: str, index: int, turns: int, created_at: datetime) -> tuple:
+    words = rng.sample(WORDS, 4)
+    if index % 100 == 0:
+        words.append(RARE_WORD)
+    html = "".join(f"<section class=\"py-12\" id=\"{word}\"><h2>{word.title()} section</h2>"
+                   f"<p class=\"text-gray-600\">Copy about the {word}.</p></section>" for word in words)
+    chat = {
+        "userId": user_id,
+        "name": f"{words[0].title()} {words[1]} page",
+        "createdAt": created_at,
+        "messageCount": turns * 2,
+        "code": {"html": html, "css": f"#{words[0]} {{ background: linear-gradient(#111, #333); }}",
+                 "js": f"gsap.from('#{words[1]}', {{ opacity: 0 }});"},
+    }
+    messages = []
+    for turn in range(turns):
+        word = rng.choice(words)
+        messages.append({"id": f"{index}-{turn}-u", "type": "user", "partial": False, "seq": turn * 2,
+                         "content": f"Make the {word} section stand out, maybe a dark gradient"})
+        messages.append({"id": f"{index}-{turn}-a", "type": "ai", "partial": False, "seq": turn * 2 + 1,
+                         "content": f"Restyled the {word} section with a bolder heading and more spacing."})
+    return chat, messages
+
+
+async def seed(chats: int, users: int, turns: int, seed_value: int) -> None:
+    from app.config.mongo import CHAT_MESSAGES, CHATS, get_collection
+
+    rng = random.Random(seed_value)
+    started = datetime.now()
+    for first in range(0, chats, 1000):
+        batch = [_chat(rng, f"search-user-{i % users}", i, turns, started - timedelta(minutes=i))
+                 for i in range(first, min(first + 1000, chats))]
+        result = await get_collection(CHATS).insert_many([chat for chat, _ in batch])
+        await get_collection(CHAT_MESSAGES).insert_many([
+            {"chatId": chat_id, "userId": chat["userId"], "bucket": 0, "count": len(messages), "messages": messages}
+            for chat_id, (chat, messages) in zip(result.inserted_ids, batch)
+        ])
+
+
+async def client_scan(user_id: str, query: str) -> int:
+    from app.services.chat import get_chat_by_id, get_chats_by_user_id
+    from app.services.search import search_terms
+
+    terms = search_terms(query)
+    hits = 0
+    for chat in (await get_chats_by_user_id(user_id))["chats"]:
+        full = await get_chat_by_id(chat["id"])
+        texts = [full["name"], *full["code"].values(), *(message["content"] for message in full["messages"])]
+        hits += sum(any(term in text.lower() for term in terms) for text in texts)
+    return hits
+
+
+async def run(args) -> dict:
+    from app.config.indexes import ensure_indexes
+    from app.config.mongo import CHAT_MESSAGES, CHATS, close_mongo, connect_mongo, get_collection
+    from app.services.search import search_chats_by_user_id
+
+    await connect_mongo()
+    try:
+        for name in (CHATS, CHAT_MESSAGES):
+            await get_collection(name).delete_many({"userId": {"$regex": "^search-user-"}})
+        started = time.perf_counter()
+        await seed(args.chats, args.users, args.turns, args.seed)
+        seed_s = time.perf_counter() - started
+        await ensure_indexes()
+
+        user_id = "search-user-0"
+        report = {"chats": args.chats, "users": args.users, "chats_per_user": args.chats // args.users,
+                  "seed_s": round(seed_s, 2), "queries": {}}
+        for label, query in QUERIES.items():
+            samples = []
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                page = await search_chats_by_user_id(user_id, query, args.limit)
+                samples.append(time.perf_counter() - started)
+            scan = []
+            for _ in range(args.scan_rounds):
+                started = time.perf_counter()
+                await client_scan(user_id, query)
+                scan.append(time.perf_counter() - started)
+            report["queries"][label] = {
+                "query": query,
+                "hits_on_first_page": len(page["hits"]),
+                "response_bytes": len(json.dumps(page)),
+                "search": summarize(samples),
+                "client_scan": summarize(scan),
+            }
+
+        for name in (CHATS, CHAT_MESSAGES):
+            await get_collection(name).delete_many({"userId": {"$regex": "^search-user-"}})
+    finally:
+        close_mongo()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=5, help="user/AI message pairs per chat")
+    parser.add_argument("--limit", type=int, default=20, help="hits per page")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--scan-rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if os.environ["MONGO_URI"].startswith("mongomock://"):
+        parser.error("the in-memory stand-in has no text search; export MONGO_URI to point at a MongoDB server")
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
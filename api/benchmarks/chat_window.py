@@ -0,0 +1,69 @@
+"""Compare opening a long chat in full vs. fetching a window of its messages.
+
+A chat with ``--messages`` messages (5,000 by default) and ~20 KB of code is
+seeded directly in MongoDB, then ``GET /chats/{chat_id}`` is timed with and
+without ``limit``/``include_code`` and the response bodies are measured.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from .common import app_client, summarize, use_throwaway_keys
+
+
+async def _seed_chat(messages: int) -> str:
+    from app.config.mongo import CHATS, get_collection
+    from app.models.chat import Message, MessageType
+    from app.repositories import message as messages_repo
+
+    chat_id = (await get_collection(CHATS).insert_one({
+        "userId": "bench-user",
+        "name": "long chat",
+        "createdAt": datetime.now(),
+        "code": {"html": "<div class=\"p-4\">x</div>" * 800, "css": "", "js": "gsap.to('.x', {x: 10});" * 50},
+        "messageCount": messages,
+    })).inserted_id
+    await messages_repo.insert_messages(chat_id, "bench-user", [
+        Message(type=MessageType.USER if i % 2 == 0 else MessageType.AI,
+                content=f"message {i} " + "lorem ipsum " * 20).model_dump()
+        for i in range(messages)
+    ])
+    return str(chat_id)
+
+
+async def run(messages: int, requests: int) -> dict:
+    variants = {
+        "full": {},
+        "latest_50": {"limit": 50},
+        "latest_50_without_code": {"limit": 50, "include_code": "false"},
+    }
+    report = {"messages": messages}
+    async with app_client() as client:
+        chat_id = await _seed_chat(messages)
+
+        for name, params in variants.items():
+            samples, size = [], 0
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(f"/chats/{chat_id}", params=params)
+                samples.append(time.perf_counter() - start)
+                response.raise_for_status()
+                size = len(response.content)
+            report[name] = {"bytes": size, "latency": summarize(samples)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    use_throwaway_keys()
+    print(json.dumps(asyncio.run(run(args.messages, args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Compare code snapshot storage with a full copy of the code per turn.
+
+Simulates a ``--turns`` long chat (100 by default) in which each turn edits
+one section, as patch mode does: most turns touch the HTML, some the CSS,
+a few the JS, and every tenth turn changes nothing (e.g. a question). Each
+turn is snapshotted with ``save_snapshot``; the naive approach stores the
+whole code with every AI message. Sizes are BSON bytes as Mongo would store
+them, and ``restore_ms`` is the time to load a snapshot back.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import bson
+
+from .common import summarize
+
+SECTION_WEIGHTS = {"html": 6, "css": 3, "js": 1}
+REVISION_MARKERS = {"html": "<!-- rev {turn} -->", "css": " /* rev {turn} */", "js": " // rev {turn}"}
+
+
+def build_turns(turns: int, html_chars: int, seed: int) -> list:
+    """Return the chat's code after each turn."""
+    rng = random.Random(seed)
+    blocks = {
+        "html": [f"<section class=\"py-12 px-6\" id=\"s{i}\"><h2 class=\"text-2xl\">Section {i}</h2>"
+                 f"<p class=\"mt-2 text-gray-600\">Copy for section {i}.</p></section>"
+                 for i in range(html_chars // 130)],
+        "css": [f".s{i} {{ color: #{i:06x}; padding: {i % 8}rem; }}" for i in range(40)],
+        "js": [f"gsap.from('#s{i}', {{ opacity: 0, y: 24, duration: 0.6 }});" for i in range(20)],
+    }
+    sections, weights = zip(*SECTION_WEIGHTS.items())
+    history = []
+    for turn in range(turns):
+        if turn % 10 != 9:
+            section = rng.choices(sections, weights)[0]
+            index = rng.randrange(len(blocks[section]))
+            blocks[section][index] += REVISION_MARKERS[section].format(turn=turn)
+        history.append({section: "\n".join(lines) for section, lines in blocks.items()})
+    return history
+
+
+async def run(turns: int, html_chars: int, seed: int) -> dict:
+    from app.config.mongo import CODE_BLOBS, close_mongo, connect_mongo, get_collection
+    from app.services.snapshot import load_snapshot, save_snapshot
+
+    history = build_turns(turns, html_chars, seed)
+    await connect_mongo()
+    try:
+        await get_collection(CODE_BLOBS).delete_many({})
+        snapshots, save_ms = [], []
+        for code in history:
+            started = time.perf_counter()
+            snapshots.append((await save_snapshot(code)).model_dump())
+            save_ms.append(time.perf_counter() - started)
+
+        restore_ms = []
+        for snapshot, code in zip(snapshots, history):
+            started = time.perf_counter()
+            restored = await load_snapshot(snapshot)
+            restore_ms.append(time.perf_counter() - started)
+            assert restored == code
+
+        blobs = await get_collection(CODE_BLOBS).find({}).to_list(length=None)
+    finally:
+        close_mongo()
+
+    naive_bytes = sum(len(bson.encode({"code": code})) for code in history)
+    blob_bytes = sum(len(bson.encode(blob)) for blob in blobs)
+    link_bytes = sum(len(bson.encode({"snapshot": snapshot})) for snapshot in snapshots)
+    snapshot_bytes = blob_bytes + link_bytes
+    return {
+        "turns": turns,
+        "code_bytes_last_turn": sum(len(text.encode("utf-8")) for text in history[-1].values()),
+        "naive": {"bytes": naive_bytes, "bytes_per_turn": naive_bytes // turns},
+        "snapshots": {
+            "bytes": snapshot_bytes,
+            "bytes_per_turn": snapshot_bytes // turns,
+            "blobs": len(blobs),
+            "compressed_blobs": sum(blob["zlib"] for blob in blobs),
+            "blob_bytes": blob_bytes,
+            "link_bytes": link_bytes,
+        },
+        "reduction": round(naive_bytes / snapshot_bytes, 1),
+        "save_ms": summarize(save_ms),
+        "restore_ms": summarize(restore_ms),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--html-chars", type=int, default=12000, help="approximate size of the page's HTML")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.turns, args.html_chars, args.seed)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Shared helpers for the API benchmarks.
+
+Benchmarks drive ``app.main:app`` in-process through ``httpx``. By default they
+run against in-memory stand-ins (``MONGO_URI=mongomock://local`` and
+``REDIS_URL=fakeredis://local``); export ``MONGO_URI``/``REDIS_URL`` to point
+them at the docker-compose ``mongo-stack``/``redis-stack`` instead.
+
+Run them from the ``api`` directory, e.g. ``python -m benchmarks.chat_latency``.
+"""
+import os
+import json
+import time
+import asyncio
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+os.environ.setdefault("MONGO_URI", "mongomock://local")
+os.environ.setdefault("MONGO_TLS", "false")
+os.environ.setdefault("REDIS_URL", "fakeredis://local")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (in seconds) as milliseconds."""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples, default=0.0) * 1000, 3),
+    }
+
+
+def use_throwaway_keys() -> str:
+    """Generate a temporary RSA key pair and run from its directory.
+
+    The chat service loads ``public.pem``/``private.pem`` from the working
+    directory, so benchmarks never need the real deployment keys.
+    """
+    from Crypto.PublicKey import RSA
+
+    workdir = tempfile.mkdtemp(prefix="site-ai-bench-")
+    key = RSA.generate(2048)
+    with open(os.path.join(workdir, "private.pem"), "wb") as f:
+        f.write(key.export_key())
+    with open(os.path.join(workdir, "public.pem"), "wb") as f:
+        f.write(key.publickey().export_key())
+    os.chdir(workdir)
+    return workdir
+
+
+def fake_ai_response(delay: float):
+    """Return a stand-in for ``get_ai_response`` that waits ``delay`` seconds."""
+    async def get_ai_response(question: str, session_id: str = "default_id", token: str = None, code: dict = None,
+                              user_id: str = None):
+        await asyncio.sleep(delay)
+        return {
+            "html": f"<main>{question}</main>",
+            "css": "",
+            "js": "",
+            "explanation": f"Handled: {question}",
+        }
+    return get_ai_response
+
+
+DEFAULT_REPLY = json.dumps({
+    "html": "<main class=\"p-4\"><h1 class=\"text-2xl\">Hello</h1></main>",
+    "css": "",
+    "js": "",
+    "explanation": "Added a heading.",
+})
+
+
+class FakeGeminiModel(BaseChatModel):
+    """Chat model stand-in that waits ``delay`` seconds, then answers ``reply``.
+
+    Async calls sleep with ``asyncio.sleep`` so, like the real client, a
+    generation in flight never blocks the event loop. Streaming splits the
+    delay evenly across ``chunk_size``-character chunks. The size in
+    characters of every prompt received is appended to ``prompt_chars``; non-
+    streaming replies report usage at roughly four characters per token.
+    """
+    reply: str = DEFAULT_REPLY
+    delay: float = 0.0
+    chunk_size: int = 16
+    prompt_chars: List[int] = Field(default_factory=list)
+
+    def _record(self, messages: List[BaseMessage]) -> None:
+        self.prompt_chars.append(sum(len(str(message.content)) for message in messages))
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _result(self) -> ChatResult:
+        usage = {"input_tokens": self.prompt_chars[-1] // 4, "output_tokens": len(self.reply) // 4,
+                 "total_tokens": (self.prompt_chars[-1] + len(self.reply)) // 4}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply, usage_metadata=usage))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self._record(messages)
+        time.sleep(self.delay)
+        return self._result()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self._record(messages)
+        await asyncio.sleep(self.delay)
+        return self._result()
+
+    def _chunks(self) -> Iterator[str]:
+        for start in range(0, len(self.reply), self.chunk_size):
+            yield self.reply[start:start + self.chunk_size]
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self._record(messages)
+        chunks = list(self._chunks())
+        for text in chunks:
+            await asyncio.sleep(self.delay / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+@asynccontextmanager
+async def app_client():
+    """Start the application lifespan and yield an in-process HTTP client."""
+    import httpx
+    from app.main import app, lifespan
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
@@ -0,0 +1,81 @@
+"""Compare pickled history entries with the compact encoding.
+
+Builds a ``--messages`` long history (500 by default) of alternating user
+prompts and AI replies, stores it in a Redis list once per encoding and
+reports the bytes stored and the time to load and decode the whole list.
+"""
+import argparse
+import asyncio
+import json
+import pickle
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.utils.messages import decode_message, encode_message
+
+from .common import DEFAULT_REPLY, summarize
+
+ENCODINGS = {
+    "pickle": (pickle.dumps, pickle.loads),
+    "compact": (encode_message, decode_message),
+}
+
+
+def build_history(messages: int, reply_chars: int) -> list:
+    reply = json.loads(DEFAULT_REPLY)
+    history = []
+    for i in range(messages):
+        if i % 2 == 0:
+            history.append(HumanMessage(content=f"turn {i // 2}: make the hero section stand out more"))
+        else:
+            reply["explanation"] = f"Updated the hero section (turn {i // 2}). " + "Details. " * (reply_chars // 9)
+            history.append(AIMessage(content=json.dumps(reply)))
+    return history
+
+
+async def run(messages: int, reply_chars: int, rounds: int) -> dict:
+    from app.config.redis import connect_redis, close_redis, get_redis
+
+    history = build_history(messages, reply_chars)
+    report = {"messages": messages}
+    await connect_redis()
+    try:
+        redis = get_redis()
+        for name, (encode, decode) in ENCODINGS.items():
+            key = f"bench_history:{name}"
+            await redis.delete(key)
+            started = time.perf_counter()
+            entries = [encode(message) for message in history]
+            encode_ms = (time.perf_counter() - started) * 1000
+            await redis.rpush(key, *entries)
+
+            load_ms = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                loaded = [decode(item) for item in await redis.lrange(key, 0, -1)]
+                load_ms.append(time.perf_counter() - started)
+            assert [m.content for m in loaded] == [m.content for m in history]
+
+            report[name] = {
+                "bytes_stored": sum(len(entry) for entry in entries),
+                "encode_ms": round(encode_ms, 2),
+                "load_ms": summarize(load_ms),
+            }
+            await redis.delete(key)
+    finally:
+        await close_redis()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--reply-chars", type=int, default=1500, help="size of each AI reply's explanation")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.messages, args.reply_chars, args.rounds)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
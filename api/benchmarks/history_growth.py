@@ -0,0 +1,59 @@
+"""Measure prompt size per turn over a long chat for different history policies.
+
+Drives ``get_ai_response`` for ``--turns`` turns (200 by default) of one chat
+with a fake LLM that records every prompt it receives, once with the history
+replayed in full and once with the configured window/budget/summary policy.
+"""
+import argparse
+import asyncio
+import json
+
+from .common import DEFAULT_REPLY, FakeGeminiModel
+
+POLICIES = {
+    "unbounded": {"HISTORY_MAX_TURNS": 10**6, "HISTORY_MAX_TOKENS": 10**9, "HISTORY_SUMMARY": False},
+    "window_10_turns": {"HISTORY_MAX_TURNS": 10, "HISTORY_MAX_TOKENS": 10**9, "HISTORY_SUMMARY": False},
+    "window_budget_summary": {"HISTORY_MAX_TURNS": 10, "HISTORY_MAX_TOKENS": 2000, "HISTORY_SUMMARY": True},
+}
+
+
+async def run(turns: int, reply_chars: int) -> dict:
+    from app.config.redis import connect_redis, close_redis
+    from app.services import gemini
+
+    reply = json.loads(DEFAULT_REPLY)
+    reply["html"] = "<section class=\"p-4\">" + "x" * reply_chars + "</section>"
+
+    report = {"turns": turns}
+    await connect_redis()
+    try:
+        for name, settings in POLICIES.items():
+            for setting, value in settings.items():
+                setattr(gemini, setting, value)
+            model = FakeGeminiModel(reply=json.dumps(reply))
+            gemini.build_model = lambda token: model
+            gemini._chains.clear()
+
+            for turn in range(turns):
+                await gemini.get_ai_response(f"turn {turn}: tweak the layout", f"history-{name}", "bench-token")
+
+            sizes = model.prompt_chars
+            report[name] = {
+                "prompt_chars_at_turn": {str(t): sizes[t - 1] for t in (1, 10, 50, 100, turns) if t <= turns},
+                "total_prompt_chars": sum(sizes),
+            }
+    finally:
+        await close_redis()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--reply-chars", type=int, default=4000, help="size of the generated HTML per reply")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.turns, args.reply_chars)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Show message throughput scaling with concurrent requests.
+
+Each request goes through ``POST /chats/{chat_id}/messages/{user_id}`` with a
+fake LLM that sleeps ``--llm-delay-ms``. With native async generation the
+throughput should grow roughly linearly with concurrency, up to
+``LLM_MAX_CONCURRENCY``, instead of staying flat at ``1 / delay``.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .common import FakeGeminiModel, app_client, summarize, use_throwaway_keys
+
+
+async def run(levels, requests_per_worker: int, llm_delay: float) -> dict:
+    from app.services import gemini
+
+    gemini.build_model = lambda token: FakeGeminiModel(delay=llm_delay)
+
+    results = []
+    async with app_client() as client:
+        for concurrency in levels:
+            async def worker(index: int):
+                user_id = f"bench-{concurrency}-{index}"
+                await client.post(f"/chats/users/{user_id}/token", json={"token": "bench-token"})
+                chat_id = (await client.post(f"/chats/users/{user_id}", json={"name": "bench"})).json()["id"]
+                samples, rejected = [], 0
+                for _ in range(requests_per_worker):
+                    start = time.perf_counter()
+                    response = await client.post(f"/chats/{chat_id}/messages/{user_id}", json={"input": "hi"})
+                    samples.append(time.perf_counter() - start)
+                    rejected += response.status_code == 429
+                return samples, rejected
+
+            start = time.perf_counter()
+            outcomes = await asyncio.gather(*(worker(i) for i in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+            samples = [sample for worker_samples, _ in outcomes for sample in worker_samples]
+            results.append({
+                "concurrency": concurrency,
+                "requests": len(samples),
+                "rejected": sum(rejected for _, rejected in outcomes),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "latency": summarize(samples),
+            })
+    return {"llm_delay_ms": llm_delay * 1000, "levels": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests-per-worker", type=int, default=10)
+    parser.add_argument("--llm-delay-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    use_throwaway_keys()
+    report = asyncio.run(run(args.levels, args.requests_per_worker, args.llm_delay_ms / 1000))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Drive mixes of ``/chats`` routes at rising concurrency and write a JSON report.
+
+Boots ``app.main:app`` in-process against the in-memory Mongo and Redis
+stand-ins and a fake LLM (``--llm-delay-ms``, ``--reply-chars``). For each mix
+and each concurrency level, that many virtual users issue ``--requests``
+requests in total, picking routes by the mix's weights from a seeded RNG so
+runs are comparable. The report holds throughput, p50/p95/p99 overall and per
+route, errors and memory, plus the commit it ran on, so two reports can be
+diffed directly::
+
+    python -m benchmarks.load_suite --output before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from .common import DEFAULT_REPLY, FakeGeminiModel, app_client, summarize, use_throwaway_keys
+
+# /chats/default uses the server key; the fake model never checks it.
+os.environ.setdefault("GEMINI_API_KEY", "load-test")
+
+OWNER_ID = "load-owner"
+
+MIXES = {
+    "browse": {"list_chats": 40, "get_chat": 30, "get_code": 30},
+    "chat": {"post_message": 60, "stream_message": 20, "get_chat": 20},
+    "mixed": {"list_chats": 20, "get_chat": 25, "get_code": 15, "post_message": 25,
+              "stream_message": 10, "default_chat": 5},
+}
+
+
+def build_reply(reply_chars: int) -> str:
+    reply = json.loads(DEFAULT_REPLY)
+    reply["html"] = "<main class=\"p-4\">" + "<p class=\"text-base\">lorem ipsum</p>" * (reply_chars // 36) + "</main>"
+    return json.dumps(reply)
+
+
+async def _request(client, op: str, user_id: str, chat_id: str, etags: dict, seq: int):
+    if op == "list_chats":
+        return await client.get(f"/chats/users/{OWNER_ID}/all", params={"limit": 20})
+    if op == "get_chat":
+        return await client.get(f"/chats/{chat_id}", params={"limit": 20})
+    if op == "get_code":
+        headers = {"If-None-Match": etags[chat_id]} if chat_id in etags else {}
+        response = await client.get(f"/chats/{chat_id}/code", headers=headers)
+        if "etag" in response.headers:
+            etags[chat_id] = response.headers["etag"]
+        return response
+    if op == "post_message":
+        return await client.post(f"/chats/{chat_id}/messages/{user_id}", json={"input": f"tweak section {seq}"})
+    if op == "stream_message":
+        async with client.stream("POST", f"/chats/{chat_id}/messages/{user_id}/stream",
+                                 json={"input": f"restyle section {seq}"}) as response:
+            async for _ in response.aiter_bytes():
+                pass
+            return response
+    if op == "default_chat":
+        # A small set of prompts, so the response cache sees realistic repeats.
+        return await client.post("/chats/default", json={"input": f"landing page idea {seq % 10}"})
+    raise ValueError(f"Unknown operation: {op}")
+
+
+async def run_level(client, mix: str, concurrency: int, requests: int, chat_ids: list, seed: int) -> dict:
+    ops, weights = zip(*MIXES[mix].items())
+    rng = random.Random(seed)
+    plan = [(rng.choices(ops, weights)[0], rng.choice(chat_ids)) for _ in range(requests)]
+    samples, errors, etags = defaultdict(list), defaultdict(int), {}
+    queue = iter(enumerate(plan))
+
+    async def user(user_id: str):
+        for seq, (op, chat_id) in queue:
+            started = time.perf_counter()
+            try:
+                response = await _request(client, op, user_id, chat_id, etags, seq)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            samples[op].append(time.perf_counter() - started)
+            if not ok:
+                errors[op] += 1
+
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    # Each virtual user is a distinct account, so per-user LLM limits apply as in production.
+    await asyncio.gather(*[user(f"load-user-{i}") for i in range(concurrency)])
+    duration = time.perf_counter() - started
+
+    level = {
+        "mix": mix,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 2),
+        "latency": summarize([s for op_samples in samples.values() for s in op_samples]),
+        "routes": {op: {**summarize(op_samples), "errors": errors[op]} for op, op_samples in sorted(samples.items())},
+        "rss_max_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    if tracemalloc.is_tracing():
+        level["heap_peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+    return level
+
+
+async def run(args, meta: dict) -> dict:
+    from app.services import gemini
+
+    model = FakeGeminiModel(reply=build_reply(args.reply_chars))
+    gemini.build_model = lambda token: model
+
+    levels = []
+    async with app_client() as client:
+        for user_id in [OWNER_ID] + [f"load-user-{i}" for i in range(max(args.concurrency))]:
+            await client.post(f"/chats/users/{user_id}/token", json={"token": f"token-{user_id}"})
+        chat_ids = []
+        for i in range(args.chats):
+            chat_id = (await client.post(f"/chats/users/{OWNER_ID}", json={"name": f"load {i}"})).json()["id"]
+            for turn in range(args.seed_turns):
+                await client.post(f"/chats/{chat_id}/messages/{OWNER_ID}", json={"input": f"seed {turn}"})
+            chat_ids.append(chat_id)
+
+        model.delay = args.llm_delay_ms / 1000
+        for mix in args.mixes:
+            for concurrency in args.concurrency:
+                level = await run_level(client, mix, concurrency, args.requests, chat_ids, args.seed)
+                levels.append(level)
+                print(f"{mix:>7} c={concurrency:<4} {level['throughput_rps']:>8} req/s  "
+                      f"p50={level['latency']['p50_ms']}ms p99={level['latency']['p99_ms']}ms "
+                      f"errors={level['errors']}", file=sys.stderr)
+    return {"meta": meta, "levels": levels}
+
+
+def _meta(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mixes", type=lambda s: s.split(","), default=list(MIXES),
+                        help=f"comma-separated mixes out of {', '.join(MIXES)}")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=400, help="requests per mix and concurrency level")
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--seed-turns", type=int, default=10, help="turns posted to each chat before measuring")
+    parser.add_argument("--llm-delay-ms", type=float, default=50)
+    parser.add_argument("--reply-chars", type=int, default=2000, help="size of the fake model's HTML output")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-memory", action="store_true", help="report Python heap peaks (slower)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    unknown = set(args.mixes) - set(MIXES)
+    if unknown:
+        parser.error(f"unknown mixes: {', '.join(sorted(unknown))}")
+
+    # Resolve paths and the commit before use_throwaway_keys() changes directory.
+    meta = _meta(args)
+    output = os.path.abspath(args.output) if args.output else None
+
+    use_throwaway_keys()
+    if args.trace_memory:
+        tracemalloc.start()
+    report = json.dumps(asyncio.run(run(args, meta)), indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
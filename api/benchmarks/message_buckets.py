@@ -0,0 +1,100 @@
+"""Append and read latency for embedded vs. bucketed chat messages.
+
+For each chat size, a chat is seeded both ways:
+
+* ``embedded``: the previous layout, every message ``$push``ed into the chat
+  document and the whole document read back.
+* ``bucketed``: messages in ``chat_messages`` buckets, appended and read
+  through the repository/service code the API uses.
+
+Run against the docker-compose ``mongo-stack`` for realistic numbers; the
+in-memory stand-in copies whole documents and exaggerates large reads.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from .common import app_client, summarize, use_throwaway_keys
+
+
+def _messages(count: int, start: int = 0):
+    from app.models.chat import Message, MessageType
+
+    return [
+        Message(type=MessageType.USER if i % 2 == 0 else MessageType.AI,
+                content=f"message {i} " + "lorem ipsum " * 20).model_dump()
+        for i in range(start, start + count)
+    ]
+
+
+async def _time(operation, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await operation()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def run(sizes, repeats: int) -> dict:
+    from app.config.mongo import CHATS, get_collection
+    from app.repositories import chat as chats_repo, message as messages_repo
+    from app.services.chat import get_chat_by_id
+
+    report = {}
+    async with app_client():
+        chats = get_collection(CHATS)
+        for size in sizes:
+            base = {"userId": "bench-user", "name": "bench", "createdAt": datetime.now(),
+                    "code": {"html": "", "css": "", "js": ""}}
+
+            embedded_id = (await chats.insert_one({**base, "messages": _messages(size)})).inserted_id
+            turn = _messages(2, size)
+
+            async def embedded_append():
+                await chats.update_one({"_id": embedded_id}, {"$push": {"messages": {"$each": turn}}})
+
+            async def embedded_read():
+                await chats.find_one({"_id": embedded_id})
+
+            bucketed_id = (await chats.insert_one({**base, "messageCount": size})).inserted_id
+            await messages_repo.insert_messages(bucketed_id, base["userId"], _messages(size))
+
+            async def bucketed_append():
+                updated = await chats_repo.record_turn(bucketed_id, {}, rename_from="New Chat", rename_to="bench")
+                await messages_repo.append_messages(bucketed_id, updated["userId"], updated["messageCount"] - 2, turn)
+
+            async def bucketed_read_latest():
+                await get_chat_by_id(str(bucketed_id), limit=50)
+
+            async def bucketed_read_all():
+                await get_chat_by_id(str(bucketed_id))
+
+            report[size] = {
+                "embedded": {
+                    "append": await _time(embedded_append, repeats),
+                    "read_all": await _time(embedded_read, repeats),
+                },
+                "bucketed": {
+                    "append": await _time(bucketed_append, repeats),
+                    "read_latest_50": await _time(bucketed_read_latest, repeats),
+                    "read_all": await _time(bucketed_read_all, repeats),
+                },
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    use_throwaway_keys()
+    print(json.dumps(asyncio.run(run(args.sizes, args.repeats)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compare how much the model generates in patch mode and in full mode.
+
+Each scenario is a current code state and the edits a patch-mode reply would
+carry. For each, the script reports how many characters the model would have
+to generate in full mode (all changed sections) versus patch mode (the edits
+only). The correctness of ``apply_edits`` is covered by ``tests/test_patch.py``.
+"""
+import argparse
+import json
+
+from app.services.patch import SECTIONS, apply_edits
+
+PAGE = {
+    "html": (
+        "<header class=\"p-4 bg-gray-100\"><h1 class=\"text-2xl text-gray-800\">Acme</h1></header>\n"
+        + "".join(f"<section id=\"s{i}\" class=\"p-4 my-4\"><p class=\"text-base\">Section {i}</p></section>\n"
+                  for i in range(40))
+        + "<footer class=\"p-4 text-gray-500\">&copy; Acme</footer>"
+    ),
+    "css": "",
+    "js": "gsap.from('header', {opacity: 0, duration: 1});",
+}
+
+SCENARIOS = {
+    "rename_heading": [{"section": "html", "find": ">Acme</h1>", "replace": ">Acme Corp</h1>"}],
+    "tweak_animation": [{"section": "js", "find": "duration: 1", "replace": "duration: 0.5"}],
+    "fill_empty_section": [{"section": "css", "find": "", "replace": "html { scroll-behavior: smooth; }"}],
+    "restyle_one_section": [{"section": "html", "find": "<section id=\"s7\" class=\"p-4 my-4\">",
+                             "replace": "<section id=\"s7\" class=\"p-8 my-8 rounded-lg shadow-md bg-gray-100\">"}],
+}
+
+
+def reply_sizes(edits: list) -> dict:
+    patched = apply_edits(PAGE, edits)
+    changed = [section for section in SECTIONS if patched[section] != PAGE[section]]
+    return {
+        "full_reply_chars": sum(len(patched[section]) for section in changed),
+        "patch_reply_chars": len(json.dumps(edits)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args()
+    print(json.dumps({name: reply_sizes(edits) for name, edits in SCENARIOS.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
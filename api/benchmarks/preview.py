@@ -0,0 +1,64 @@
+"""Time ``GET /chats/{chat_id}/preview`` cold, cached and revalidated.
+
+For a chat whose code totals ``--code-kb`` KB: ``cold`` renders and
+precompresses the page (the cache is cleared before each request),
+``cached`` serves the stored variant for the client's encoding and
+``not_modified`` sends the ETag back and gets a 304. Bytes are as received.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from .common import app_client, summarize, use_throwaway_keys
+from .response_encoding import build_code
+
+
+async def _measure(client, url: str, headers: dict, rounds: int, before=None) -> dict:
+    samples, wire_bytes, status = [], 0, None
+    for _ in range(rounds):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        samples.append(time.perf_counter() - started)
+        wire_bytes, status = response.num_bytes_downloaded, response.status_code
+    return {"status": status, "bytes": wire_bytes, **summarize(samples)}
+
+
+async def run(code_kb: int, rounds: int, encoding: str) -> dict:
+    from app.config.mongo import CHATS, get_collection
+    from app.services import preview
+
+    async with app_client() as client:
+        chat_id = (await get_collection(CHATS).insert_one({
+            "userId": "bench-user", "name": "big page", "createdAt": datetime.now(),
+            "code": build_code(code_kb), "messageCount": 0,
+        })).inserted_id
+        url = f"/chats/{chat_id}/preview"
+        headers = {"Accept-Encoding": encoding}
+        etag = (await client.get(url, headers=headers)).headers["etag"]
+
+        return {
+            "code_kb": code_kb,
+            "accept_encoding": encoding,
+            # Cold renders are slow at the top compression levels; a few suffice.
+            "cold": await _measure(client, url, headers, max(1, rounds // 20), before=preview._pages.clear),
+            "cached": await _measure(client, url, headers, rounds),
+            "not_modified": await _measure(client, url, {**headers, "If-None-Match": etag}, rounds),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--code-kb", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--encoding", default="br", help="Accept-Encoding sent with every request")
+    args = parser.parse_args()
+    use_throwaway_keys()
+    print(json.dumps(asyncio.run(run(args.code_kb, args.rounds, args.encoding)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Measure encoding time and bytes on the wire for a chat with large code.
+
+Stores a chat whose code totals ``--code-kb`` KB (50 by default) with
+``--messages`` messages, loads it with ``get_chat_by_id`` and reports:
+
+- ``encode``: FastAPI's default path (``jsonable_encoder`` then ``json.dumps``,
+  as ``JSONResponse`` renders) against the single orjson pass;
+- ``wire``: bytes and compression time for identity, gzip and brotli at the
+  configured levels;
+- ``http``: ``GET /chats/{chat_id}`` end to end for each ``Accept-Encoding``.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from .common import app_client, summarize, use_throwaway_keys
+
+
+def build_code(code_kb: int) -> dict:
+    section = ("<section class=\"py-16 px-6 bg-gradient-to-b from-slate-900 to-slate-800\">"
+               "<h2 class=\"text-3xl font-bold text-white\">Feature {i}</h2>"
+               "<p class=\"mt-4 text-slate-300\">Describe feature {i} and why it matters.</p></section>\n")
+    html, i = "", 0
+    while len(html) < code_kb * 1024 * 0.7:
+        html += section.format(i=i)
+        i += 1
+    css = "".join(f".feature-{n} {{ transition: transform .3s; transform: translateY({n % 5}px); }}\n"
+                  for n in range(int(code_kb * 1024 * 0.2) // 70))
+    js = "".join(f"gsap.from('.feature-{n}', {{ opacity: 0, y: 40, duration: 0.8, delay: {n / 10} }});\n"
+                 for n in range(int(code_kb * 1024 * 0.1) // 70))
+    return {"html": html, "css": css, "js": js}
+
+
+def _time(fn, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, summarize(samples)
+
+
+def fastapi_default(payload) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+async def run(code_kb: int, messages: int, rounds: int) -> dict:
+    from app.config.mongo import CHATS, get_collection
+    from app.models.chat import Message, MessageType
+    from app.repositories import message as messages_repo
+    from app.services.chat import get_chat_by_id
+    from app.utils.compression import ENCODERS
+    from app.utils.responses import dumps
+
+    report = {}
+    async with app_client() as client:
+        chat_id = (await get_collection(CHATS).insert_one({
+            "userId": "bench-user", "name": "big page", "createdAt": datetime.now(),
+            "code": build_code(code_kb), "messageCount": messages,
+        })).inserted_id
+        await messages_repo.insert_messages(chat_id, "bench-user", [
+            Message(type=MessageType.USER if i % 2 == 0 else MessageType.AI,
+                    content=f"message {i}: make the features section pop a bit more").model_dump()
+            for i in range(messages)
+        ])
+        payload = await get_chat_by_id(str(chat_id))
+
+        default_body, default_ms = _time(lambda: fastapi_default(payload), rounds)
+        orjson_body, orjson_ms = _time(lambda: dumps(payload), rounds)
+        assert json.loads(default_body) == json.loads(orjson_body)
+        report["code_bytes"] = sum(len(text) for text in payload["code"].values())
+        report["encode"] = {"fastapi_default": default_ms, "orjson": orjson_ms}
+
+        report["wire"] = {"identity": {"bytes": len(orjson_body)}}
+        for coding, encode in ENCODERS.items():
+            compressed, compress_ms = _time(lambda: encode(orjson_body), rounds)
+            report["wire"][coding] = {"bytes": len(compressed), "ratio": round(len(orjson_body) / len(compressed), 1),
+                                      "compress": compress_ms}
+
+        report["http"] = {}
+        for coding in ["identity", *ENCODERS]:
+            samples, wire_bytes = [], 0
+            for _ in range(rounds):
+                started = time.perf_counter()
+                response = await client.get(f"/chats/{chat_id}", headers={"Accept-Encoding": coding})
+                samples.append(time.perf_counter() - started)
+                wire_bytes = response.num_bytes_downloaded
+                assert response.headers.get("content-encoding", "identity") == coding
+            report["http"][coding] = {"bytes": wire_bytes, **summarize(samples)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--code-kb", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    use_throwaway_keys()
+    print(json.dumps(asyncio.run(run(args.code_kb, args.messages, args.rounds)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Measure cold start: import time of ``app.main`` and time to the first ``/ping``.
+
+Each round runs in a fresh interpreter. ``import_ms`` comes from
+``python -X importtime -c "import app.main"``, together with the slowest
+of its direct imports by cumulative import time. ``first_ping_ms`` is the time
+from launching ``uvicorn app.main:app`` (one worker, in-memory stand-ins) to
+its first successful ``GET /ping``, which includes the lifespan startup.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+
+from .common import summarize, use_throwaway_keys
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env(workdir: str) -> dict:
+    return dict(os.environ, PYTHONPATH=API_DIR, PRELOAD_LLM="false",
+                PUBLIC_KEY_PATH=os.path.join(workdir, "public.pem"),
+                PRIVATE_KEY_PATH=os.path.join(workdir, "private.pem"))
+
+
+def measure_imports(env: dict) -> tuple:
+    """Return total ``app.main`` import seconds and cumulative seconds per direct import."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            env=env, cwd=API_DIR, capture_output=True, text=True, check=True)
+    packages = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        if module == "app.main":
+            total = cumulative / 1e6
+        # One level below the top: what app.main (and app/__init__) import directly.
+        if indent == 3:
+            packages[module] += cumulative / 1e6
+    return total, packages
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_ping(env: dict, timeout: float) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=API_DIR,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/ping", timeout=0.5) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/ping did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run(rounds: int, timeout: float) -> dict:
+    workdir = use_throwaway_keys()
+    env = _env(workdir)
+
+    imports, first_pings, packages = [], [], defaultdict(list)
+    for _ in range(rounds):
+        total, by_package = measure_imports(env)
+        imports.append(total)
+        for package, seconds in by_package.items():
+            packages[package].append(seconds)
+        first_pings.append(measure_first_ping(env, timeout))
+
+    slowest = sorted(packages.items(), key=lambda item: -sorted(item[1])[len(item[1]) // 2])[:10]
+    return {
+        "rounds": rounds,
+        "import_ms": summarize(imports),
+        "first_ping_ms": summarize(first_pings),
+        "slowest_imports_ms": {package: round(sorted(s)[len(s) // 2] * 1000, 1) for package, s in slowest},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rounds, args.timeout), indent=2))
+
+
+if __name__ == "__main__":
+    main()
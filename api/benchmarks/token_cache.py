@@ -0,0 +1,56 @@
+"""Measure messages/sec on one core with and without the decrypted-token cache.
+
+Messages are posted sequentially through ``POST /chats/{chat_id}/messages/{user_id}``
+with an instant fake LLM, so the per-message cost is dominated by token
+lookup, decryption and persistence. ``before`` disables the cache, forcing a
+tokens lookup and decryption per message as the service used to do.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .common import FakeGeminiModel, app_client, use_throwaway_keys
+
+
+async def run(messages: int) -> dict:
+    from app.services import chat as chat_service, gemini
+
+    gemini.build_model = lambda token: FakeGeminiModel()
+
+    async def measure(cached: bool) -> float:
+        chat_service._tokens.clear()
+        chat_service._tokens.maxsize = chat_service.TOKEN_CACHE_SIZE if cached else 0
+        user_id = f"bench-{cached}"
+        await client.post(f"/chats/users/{user_id}/token", json={"token": "bench-token"})
+        chat_id = (await client.post(f"/chats/users/{user_id}", json={"name": "bench"})).json()["id"]
+
+        start = time.perf_counter()
+        for _ in range(messages):
+            response = await client.post(f"/chats/{chat_id}/messages/{user_id}", json={"input": "hi"})
+            response.raise_for_status()
+        return messages / (time.perf_counter() - start)
+
+    async with app_client() as client:
+        before = await measure(cached=False)
+        after = await measure(cached=True)
+
+    return {
+        "messages": messages,
+        "before_msgs_per_sec": round(before, 2),
+        "after_msgs_per_sec": round(after, 2),
+        "speedup": round(after / before, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=300)
+    args = parser.parse_args()
+
+    use_throwaway_keys()
+    print(json.dumps(asyncio.run(run(args.messages)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,12 @@
-""" This file is used to run the FastAPI server. """
+""" This file is used to run the FastAPI server.
+
+Set ``WORKERS`` to run several worker processes (default: one per CPU). Each
+worker opens its own Mongo and Redis pools in the app's lifespan. On SIGTERM
+workers report "draining" on ``/ready`` for ``SHUTDOWN_PRESTOP_DELAY`` seconds,
+then stop accepting connections, wait up to ``GRACEFUL_SHUTDOWN_TIMEOUT``
+seconds for open requests, and drain LLM calls left over before exiting.
+``RELOAD=true`` runs a single auto-reloading process for development.
+"""
 import uvicorn
 import os
 from dotenv import load_dotenv
@@ -8,5 +16,7 @@ load_dotenv()
 if __name__ == '__main__':
     port = int(os.getenv("PORT", 8080))
     reload = os.getenv("RELOAD", "false").lower() == "true"
-    uvicorn.run("app.main:app",host="0.0.0.0",port=port,reload=reload)
-    
\ No newline at end of file
+    workers = 1 if reload else int(os.getenv("WORKERS", os.cpu_count() or 1))
+    graceful_timeout = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", 30))
+    uvicorn.run("app.main:app",host="0.0.0.0",port=port,reload=reload,
+                workers=workers,timeout_graceful_shutdown=graceful_timeout)
@@ -0,0 +1,73 @@
+"""Shared fixtures for the API tests.
+
+Run them from the ``api`` directory with ``python -m pytest``. They use the
+in-memory stand-ins (``MONGO_URI=mongomock://local``,
+``REDIS_URL=fakeredis://local``) unless those variables are exported; tests
+that need a real MongoDB server (text search, ``explain()``) skip without one.
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("MONGO_URI", "mongomock://local")
+os.environ.setdefault("MONGO_TLS", "false")
+os.environ.setdefault("MONGO_DB", "chat_db_test")
+os.environ.setdefault("REDIS_URL", "fakeredis://local")
+# Tests that need the LLM client stub it; nothing else should load it.
+os.environ.setdefault("PRELOAD_LLM", "false")
+os.environ.setdefault("HISTORY_RECONCILE_INTERVAL", "0")
+
+REAL_MONGO = not os.environ["MONGO_URI"].startswith("mongomock://")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def real_mongo():
+    """Connect to the MongoDB server in ``MONGO_URI``, or skip the test."""
+    if not REAL_MONGO:
+        pytest.skip("needs a MongoDB server; export MONGO_URI")
+    from app.config.mongo import close_mongo, connect_mongo
+
+    await connect_mongo()
+    yield
+    close_mongo()
+
+
+@pytest.fixture
+async def mongo():
+    """Connect to ``MONGO_URI``, the in-memory stand-in unless one is exported."""
+    from app.config.mongo import close_mongo, connect_mongo
+
+    await connect_mongo()
+    yield
+    close_mongo()
+
+
+@pytest.fixture(scope="session")
+def rsa_keys(tmp_path_factory):
+    """Point the app at a throwaway RSA key pair instead of the deployment keys."""
+    from app.config import keys
+
+    directory = tmp_path_factory.mktemp("keys")
+    paths = str(directory / "public.pem"), str(directory / "private.pem")
+    keys.generate_keys(*paths)
+    previous = keys.PUBLIC_KEY_PATH, keys.PRIVATE_KEY_PATH
+    keys.PUBLIC_KEY_PATH, keys.PRIVATE_KEY_PATH = paths
+    yield
+    keys.PUBLIC_KEY_PATH, keys.PRIVATE_KEY_PATH = previous
+
+
+@pytest.fixture
+async def client(rsa_keys):
+    """Run the app's lifespan and yield an in-process HTTP client for it."""
+    import httpx
+    from app.main import app, lifespan
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
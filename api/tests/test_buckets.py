@@ -0,0 +1,45 @@
+import pytest
+
+from app.config.mongo import CHATS, get_collection
+from app.repositories import chat as chats_repo, message as messages_repo
+from app.services.chat import migrate_chat_to_buckets
+
+pytestmark = pytest.mark.anyio
+
+USER = "bucket-user"
+
+
+def messages(*contents):
+    return [{"id": content, "type": "human", "content": content} for content in contents]
+
+
+async def test_migration_moves_embedded_messages(mongo):
+    chat_id = (await get_collection(CHATS).insert_one({
+        "userId": USER, "name": "Old chat", "messages": messages("hello", "hi"),
+    })).inserted_id
+
+    assert await migrate_chat_to_buckets(chat_id) == 2
+    assert await migrate_chat_to_buckets(chat_id) == 2
+
+    chat = await get_collection(CHATS).find_one({"_id": chat_id})
+    assert chat["messageCount"] == 2 and "messages" not in chat
+    assert [message["content"] for message in await messages_repo.find_messages(chat_id, 0, 2)] == ["hello", "hi"]
+
+
+async def test_stale_migration_keeps_turns_appended_since(mongo, monkeypatch):
+    chat_id = (await get_collection(CHATS).insert_one({
+        "userId": USER, "name": "Old chat", "messages": messages("hello", "hi"),
+    })).inserted_id
+    stale = await chats_repo.find_chat_by_id(chat_id)
+    await migrate_chat_to_buckets(chat_id)
+    await messages_repo.append_messages(chat_id, USER, 2, messages("make it blue", "done"))
+
+    async def find_chat_by_id(chat_id):
+        return stale
+
+    # A second run that read the chat before the first one migrated it.
+    monkeypatch.setattr(chats_repo, "find_chat_by_id", find_chat_by_id)
+    await migrate_chat_to_buckets(chat_id)
+
+    contents = [message["content"] for message in await messages_repo.find_messages(chat_id, 0, 4)]
+    assert contents == ["hello", "hi", "make it blue", "done"]
@@ -0,0 +1,145 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.config.mongo import CHAT_MESSAGES, CHATS, get_collection
+from app.services import chat as chat_service
+
+pytestmark = pytest.mark.anyio
+
+USER = "turn-user"
+
+
+@pytest.fixture
+async def llm(client, monkeypatch):
+    """Stub the model: record every prompt and answer with a page naming it.
+
+    Set ``during`` to a coroutine function taking the chat id to run it while
+    the "generation" is in progress.
+    """
+    from app.services import gemini
+
+    stub = SimpleNamespace(prompts=[], during=None)
+
+    async def get_ai_response(question, session_id="default_id", token=None, code=None, user_id=None):
+        stub.prompts.append(question)
+        if stub.during is not None:
+            await stub.during(session_id)
+        return {"html": f"<main>{question}</main>", "css": "", "js": "", "explanation": f"Done: {question}"}
+
+    monkeypatch.setattr(gemini, "get_ai_response", get_ai_response)
+    response = await client.post(f"/chats/users/{USER}/token", json={"token": "test-token"})
+    assert response.status_code == 200
+    return stub
+
+
+async def new_chat(client, name: str = "New Chat") -> str:
+    response = await client.post(f"/chats/users/{USER}", json={"name": name})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+async def send(client, chat_id: str, text: str):
+    return await client.post(f"/chats/{chat_id}/messages/{USER}", json={"input": text})
+
+
+async def test_first_message_names_the_chat(client, llm):
+    chat_id = await new_chat(client)
+
+    response = await send(client, chat_id, "Build a bakery site")
+
+    assert response.status_code == 201
+    assert response.json()["name"] == "Build a bakery site"
+    chat = (await client.get(f"/chats/{chat_id}")).json()
+    assert chat["name"] == "Build a bakery site"
+    assert chat["message_count"] == 2
+    assert chat["code"]["html"] == "<main>Build a bakery site</main>"
+
+
+async def test_later_messages_keep_the_name(client, llm):
+    chat_id = await new_chat(client)
+    await send(client, chat_id, "Build a bakery site")
+
+    response = await send(client, chat_id, "Make the header blue")
+
+    assert response.json()["name"] == "Build a bakery site"
+    chat = (await client.get(f"/chats/{chat_id}")).json()
+    assert chat["name"] == "Build a bakery site"
+    assert [message["content"] for message in chat["messages"]] == [
+        "Build a bakery site", "Done: Build a bakery site", "Make the header blue", "Done: Make the header blue",
+    ]
+
+
+async def test_named_chat_is_not_renamed(client, llm):
+    chat_id = await new_chat(client, name="Portfolio")
+
+    response = await send(client, chat_id, "Build a bakery site")
+
+    assert response.json()["name"] == "Portfolio"
+
+
+@pytest.mark.parametrize("path", ["messages/{user}", "messages/{user}/stream"])
+async def test_missing_chat_is_404_before_generation(client, llm, path):
+    url = f"/chats/{ObjectId()}/" + path.format(user=USER)
+
+    response = await client.post(url, json={"input": "Build a bakery site"})
+
+    assert response.status_code == 404
+    assert llm.prompts == []
+
+
+async def test_chat_deleted_mid_generation_is_not_recreated(client, llm):
+    chat_id = await new_chat(client)
+    llm.during = chat_service.delete_chat_by_id
+
+    response = await send(client, chat_id, "Build a bakery site")
+
+    assert response.status_code == 404
+    assert llm.prompts == ["Build a bakery site"]
+    assert await get_collection(CHATS).count_documents({"_id": ObjectId(chat_id)}) == 0
+    assert await get_collection(CHAT_MESSAGES).count_documents({"chatId": ObjectId(chat_id)}) == 0
+    assert (await client.get(f"/chats/{chat_id}")).status_code == 404
+
+
+async def test_failed_append_takes_the_turn_back(client, llm, monkeypatch):
+    chat_id = await new_chat(client)
+    await send(client, chat_id, "Build a bakery site")
+
+    async def append_messages(*args):
+        raise ConnectionError("bucket write lost")
+
+    monkeypatch.setattr(chat_service.messages_repo, "append_messages", append_messages)
+    response = await send(client, chat_id, "Make the header blue")
+
+    assert response.status_code == 500
+    chat = (await client.get(f"/chats/{chat_id}")).json()
+    assert chat["message_count"] == 2
+    assert chat["code"]["html"] == "<main>Build a bakery site</main>"
+
+
+async def test_append_retries_a_bucket_opened_concurrently(mongo, monkeypatch):
+    from pymongo.errors import DuplicateKeyError
+    from app.repositories import message as messages_repo
+
+    chat_id = ObjectId()
+    buckets = get_collection(CHAT_MESSAGES)
+
+    class Racing:
+        """Lose the upsert race once: the other turn's bucket lands first."""
+        raced = False
+
+        async def update_one(self, query, update, upsert=False):
+            if not Racing.raced:
+                Racing.raced = True
+                await buckets.insert_one({**query, "userId": USER, "count": 1, "messages": [
+                    {"id": "other", "type": "human", "content": "other turn", "seq": 1}]})
+                raise DuplicateKeyError("E11000 duplicate key error")
+            return await buckets.update_one(query, update, upsert=upsert)
+
+    monkeypatch.setattr(messages_repo, "get_collection", lambda name: Racing())
+    await messages_repo.append_messages(chat_id, USER, 0, [{"id": "mine", "type": "human", "content": "mine"}])
+
+    bucket = await buckets.find_one({"chatId": chat_id})
+    assert [message["id"] for message in bucket["messages"]] == ["mine", "other"]
+    assert bucket["count"] == 2
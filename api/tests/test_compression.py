@@ -0,0 +1,109 @@
+import httpx
+import pytest
+from bson import ObjectId
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from app.config.mongo import CHATS, get_collection
+from app.utils.compression import CompressionMiddleware, encoded_etag, etag_match, if_none_match
+
+pytestmark = pytest.mark.anyio
+
+ETAG = '"0123abcd"'
+LARGE = {"html": "<div class='card'>hello</div>" * 200}
+
+
+def test_encoded_etag():
+    assert encoded_etag(ETAG, "gzip") == '"0123abcd-gzip"'
+    assert encoded_etag('W/"0123abcd"', "br") == 'W/"0123abcd-br"'
+    assert encoded_etag(ETAG, None) == ETAG
+
+
+def test_if_none_match_parses_lists_weak_tags_and_star():
+    assert if_none_match('"a", W/"b" ,"c,d"') == ['"a"', '"b"', '"c,d"']
+    assert if_none_match("*") == ["*"]
+    assert if_none_match(None) == if_none_match("") == []
+
+
+def test_etag_match_returns_the_variant_held():
+    assert etag_match(ETAG, ETAG) == ETAG
+    assert etag_match(ETAG, f'"other", W/{ETAG}') == ETAG
+    assert etag_match(ETAG, '"x", "0123abcd-gzip"') == '"0123abcd-gzip"'
+    assert etag_match(ETAG, "*") == ETAG
+    assert etag_match(ETAG, '"0123abcd-deflate", "0123abc"') is None
+    assert etag_match(ETAG, None) is None
+
+
+def page(request):
+    return JSONResponse(LARGE, headers={"ETag": ETAG})
+
+
+def small(request):
+    return JSONResponse({"ok": True}, headers={"ETag": ETAG})
+
+
+def not_modified(request):
+    return Response(status_code=304, headers={"ETag": ETAG})
+
+
+def varied(request):
+    return Response(status_code=304, headers={"ETag": ETAG, "Vary": "Accept-Encoding"})
+
+
+@pytest.fixture
+async def wrapped():
+    app = Starlette(routes=[Route("/page", page), Route("/small", small),
+                            Route("/not-modified", not_modified), Route("/varied", varied)])
+    transport = httpx.ASGITransport(app=CompressionMiddleware(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def test_compressed_body_gets_its_coding_etag(wrapped):
+    response = await wrapped.get("/page", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"0123abcd-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == LARGE
+
+
+async def test_identity_body_keeps_its_etag_and_varies(wrapped):
+    for path, accept in (("/page", "identity"), ("/small", "gzip")):
+        response = await wrapped.get(path, headers={"Accept-Encoding": accept})
+
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"] == ETAG
+        assert response.headers["vary"] == "Accept-Encoding"
+
+
+async def test_not_modified_varies_by_encoding(wrapped):
+    for accept in ("gzip", "identity"):
+        response = await wrapped.get("/not-modified", headers={"Accept-Encoding": accept})
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == ETAG
+        assert response.headers["vary"] == "Accept-Encoding"
+    response = await wrapped.get("/varied", headers={"Accept-Encoding": "gzip"})
+    assert response.headers.get_list("vary") == ["Accept-Encoding"]
+
+
+async def test_code_revalidates_against_any_variant(client):
+    response = await client.post("/chats/users/compression-user", json={"name": "Card"})
+    chat_id = response.json()["id"]
+    await get_collection(CHATS).update_one({"_id": ObjectId(chat_id)}, {"$set": {"code": LARGE}})
+    url = f"/chats/{chat_id}/code"
+
+    first = await client.get(url, headers={"Accept-Encoding": "gzip"})
+    gzipped = first.headers["etag"]
+    assert first.headers["content-encoding"] == "gzip" and gzipped.endswith('-gzip"')
+
+    again = await client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped})
+    assert again.status_code == 304
+    assert again.headers["etag"] == gzipped
+    assert "Accept-Encoding" in again.headers["vary"]
+
+    plain = gzipped.replace("-gzip", "")
+    weak = await client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": f'"stale", W/{plain}'})
+    assert weak.status_code == 304 and weak.headers["etag"] == plain
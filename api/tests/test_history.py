@@ -0,0 +1,64 @@
+import fakeredis
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.services.gemini import UpstashCompatibleChatHistory, extractive_summary
+
+pytestmark = pytest.mark.anyio
+
+
+def turn(n: int):
+    return [HumanMessage(content=f"request {n}"), AIMessage(content=f'{{"explanation": "reply {n}"}}')]
+
+
+def folded(*turns):
+    return [line for n in turns for line in (f"User: request {n}", f"Assistant: reply {n}")]
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.aioredis.FakeRedis()
+
+
+def history(redis, summarize=extractive_summary):
+    return UpstashCompatibleChatHistory("chat", redis, max_turns=2, summarize=summarize)
+
+
+async def summary_lines(redis):
+    return (await redis.get("chat_history:chat:summary") or b"").decode("utf-8").splitlines()
+
+
+async def test_overflow_is_folded_into_the_summary(redis):
+    for n in range(4):
+        await history(redis).aadd_messages(turn(n))
+
+    messages = await history(redis).aget_messages()
+
+    assert messages[0].content.splitlines()[1:] == folded(0, 1)
+    assert [message.content for message in messages[1:]] == ["request 2", "reply 2", "request 3", "reply 3"]
+
+
+async def test_turn_folding_meanwhile_is_neither_lost_nor_repeated(redis):
+    await history(redis).aadd_messages(turn(0) + turn(1))
+
+    async def interrupted(summary, messages):
+        # Another turn is saved, and folds the same overflow, while this one summarizes.
+        if not interrupted.once:
+            interrupted.once = True
+            await history(redis).aadd_messages(turn(3))
+        return await extractive_summary(summary, messages)
+
+    interrupted.once = False
+    await history(redis, interrupted).aadd_messages(turn(2))
+
+    assert await summary_lines(redis) == folded(0, 1)
+    assert [message.content for message in await history(redis).aget_messages()][1:] == [
+        "request 2", "reply 2", "request 3", "reply 3"]
+
+
+async def test_without_summary_overflow_is_dropped(redis):
+    for n in range(3):
+        await history(redis, summarize=None).aadd_messages(turn(n))
+
+    assert await redis.llen("chat_history:chat") == 4
+    assert await summary_lines(redis) == []
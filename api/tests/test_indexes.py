@@ -0,0 +1,89 @@
+import pytest
+
+from app.config import indexes
+from app.config.indexes import INDEXES, _spec, ensure_indexes, explain_hot_queries
+from app.config.mongo import CHAT_MESSAGES, CHATS, TOKENS
+
+pytestmark = pytest.mark.anyio
+
+# As index_information() reports the chats text index: directions as floats,
+# text fields folded into _fts/_ftsx, and every text field weighted.
+CHATS_TEXT_INDEX = {
+    "v": 2,
+    "key": [("userId", 1.0), ("_fts", "text"), ("_ftsx", 1)],
+    "weights": {"name": 10, "code.html": 2, "code.css": 1, "code.js": 1},
+    "default_language": "english",
+    "language_override": "language",
+    "textIndexVersion": 3,
+}
+
+
+def registered(collection: str, name: str) -> dict:
+    return next(model.document for model in INDEXES[collection] if model.document["name"] == name)
+
+
+def test_spec_ignores_float_directions():
+    reported = {"v": 2, "key": [("userId", 1.0)], "unique": True}
+    assert _spec(reported) == _spec(registered(TOKENS, "userId_unique"))
+
+
+def test_spec_matches_server_form_of_text_index():
+    assert _spec(CHATS_TEXT_INDEX) == _spec(registered(CHATS, "userId_text"))
+
+
+def test_spec_detects_changed_options():
+    assert _spec({"v": 2, "key": [("userId", 1)]}) != _spec(registered(TOKENS, "userId_unique"))
+    reweighted = {**CHATS_TEXT_INDEX, "weights": {**CHATS_TEXT_INDEX["weights"], "name": 5}}
+    assert _spec(reweighted) != _spec(registered(CHATS, "userId_text"))
+
+
+class FakeCollection:
+    """Serves canned index documents and records the indexes created."""
+
+    def __init__(self, existing: dict):
+        self.existing = existing
+        self.created = []
+
+    def list_indexes(self):
+        documents = [{"name": name, **document} for name, document in self.existing.items()]
+
+        class Cursor:
+            async def to_list(self, length=None):
+                return documents
+
+        return Cursor()
+
+    async def create_indexes(self, models):
+        self.created += [model.document["name"] for model in models]
+
+
+async def test_ensure_indexes_reports_drift_from_canned_indexes(monkeypatch):
+    id_index = {"v": 2, "key": [("_id", 1)]}
+    collections = {
+        TOKENS: FakeCollection({"_id_": id_index, "userId_unique": {"v": 2, "key": [("userId", 1.0)], "unique": True}}),
+        CHATS: FakeCollection({
+            "_id_": id_index,
+            "userId_createdAt": {"v": 2, "key": [("userId", 1), ("createdAt", -1)]},
+            "userId_text": CHATS_TEXT_INDEX,
+            "name_1": {"v": 2, "key": [("name", 1)]},
+        }),
+        CHAT_MESSAGES: FakeCollection({"_id_": id_index}),
+    }
+    monkeypatch.setattr(indexes, "get_collection", collections.__getitem__)
+
+    report = await ensure_indexes()
+
+    assert report == {
+        "created": [f"{CHAT_MESSAGES}.chatId_bucket", f"{CHAT_MESSAGES}.chatId_messageId", f"{CHAT_MESSAGES}.userId_text"],
+        "drift": [f"{CHATS}.userId_createdAt"],
+        "unmanaged": [f"{CHATS}.name_1"],
+    }
+    assert collections[TOKENS].created == collections[CHATS].created == []
+
+
+async def test_hot_queries_use_an_index_scan(real_mongo):
+    await ensure_indexes()
+    plans = await explain_hot_queries()
+    assert plans
+    for label, stages in plans.items():
+        assert "IXSCAN" in stages and "COLLSCAN" not in stages, f"{label}: {stages}"
@@ -0,0 +1,44 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import chat as chat_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_token_save_does_not_load_the_llm_client(client, monkeypatch):
+    monkeypatch.setattr(chat_service, "_llm", None)
+    monkeypatch.setattr(chat_service, "_gemini", lambda: pytest.fail("LLM client loaded"))
+
+    response = await client.post("/chats/users/lazy-user/token", json={"token": "first"})
+
+    assert response.status_code == 200
+    assert chat_service._llm is None
+
+
+async def test_token_save_evicts_the_users_chain(client, monkeypatch):
+    evicted = []
+    monkeypatch.setattr(chat_service, "_llm", SimpleNamespace(evict_chain=evicted.append))
+
+    await client.post("/chats/users/lazy-user/token", json={"token": "second"})
+
+    assert evicted == ["lazy-user"]
+
+
+async def test_llm_client_is_imported_off_the_event_loop(monkeypatch):
+    importing = []
+    module = SimpleNamespace()
+
+    def import_llm():
+        importing.append(threading.current_thread())
+        chat_service._llm = module
+        return module
+
+    monkeypatch.setattr(chat_service, "_llm", None)
+    monkeypatch.setattr(chat_service, "_gemini", import_llm)
+
+    assert await chat_service._load_llm() is module
+    assert await chat_service._load_llm() is module
+    assert len(importing) == 1 and importing[0] is not threading.main_thread()
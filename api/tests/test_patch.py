@@ -0,0 +1,121 @@
+import pytest
+
+from app.config.mongo import CHATS, get_collection
+from app.models.chat import Prompt
+from app.services import chat as chat_service
+from app.services.gemini import _resolve_edits
+from app.services.patch import PatchError, apply_edits
+
+PAGE = {
+    "html": "<header><h1>Acme</h1></header><p>a</p><p>a</p>",
+    "css": "h1 { color: red; }",
+    "js": "gsap.from('header', {opacity: 0, duration: 1});",
+}
+
+
+@pytest.mark.parametrize("edits, expected", [
+    pytest.param([{"section": "html", "find": ">Acme<", "replace": ">Acme Corp<"}],
+                 {**PAGE, "html": PAGE["html"].replace(">Acme<", ">Acme Corp<")}, id="replace_anchor"),
+    pytest.param([{"section": "css", "find": "", "replace": "body { margin: 0; }"}],
+                 {**PAGE, "css": "body { margin: 0; }"}, id="empty_find_replaces_section"),
+    pytest.param([{"section": "html", "find": "<h1>Acme</h1>", "replace": "<h1>B</h1>"},
+                  {"section": "html", "find": "<h1>B</h1>", "replace": "<h1>C</h1>"}],
+                 {**PAGE, "html": PAGE["html"].replace("<h1>Acme</h1>", "<h1>C</h1>")}, id="edits_apply_in_order"),
+    pytest.param([{"section": "js", "find": "duration: 1", "replace": "duration: 0.5"},
+                  {"section": "css", "find": "red", "replace": "blue"}],
+                 {**PAGE, "js": PAGE["js"].replace("duration: 1", "duration: 0.5"), "css": "h1 { color: blue; }"},
+                 id="several_sections"),
+    pytest.param([{"section": "js", "find": PAGE["js"], "replace": None}], {**PAGE, "js": ""}, id="replace_with_nothing"),
+    pytest.param([], PAGE, id="no_edits"),
+])
+def test_apply_edits(edits, expected):
+    assert apply_edits(PAGE, edits) == expected
+
+
+def test_apply_edits_leaves_the_code_untouched():
+    original = dict(PAGE)
+    apply_edits(PAGE, [{"section": "css", "find": "", "replace": ""}])
+    assert PAGE == original
+
+
+@pytest.mark.parametrize("edits, message", [
+    pytest.param([{"section": "html", "find": "<nav>", "replace": "<nav class=\"p-4\">"}], "not found", id="anchor_missing"),
+    pytest.param([{"section": "html", "find": "<p>a</p>", "replace": "<p>b</p>"}], "occurs 2 times", id="ambiguous_anchor"),
+    pytest.param([{"section": "python", "find": "", "replace": "print()"}], "Unknown code section", id="unknown_section"),
+    pytest.param(["html: replace everything"], "Malformed edit", id="edit_not_an_object"),
+    pytest.param([{"section": "css", "find": ["h1"], "replace": "h2"}], "must be text", id="find_not_text"),
+    pytest.param({"section": "css", "find": "", "replace": ""}, "must be a list", id="edits_not_a_list"),
+])
+def test_apply_edits_rejects(edits, message):
+    with pytest.raises(PatchError, match=message):
+        apply_edits(PAGE, edits)
+
+
+def test_malformed_edit_fails_before_any_section_is_patched():
+    edits = [{"section": "html", "find": ">Acme<", "replace": ">B<"}, {"section": "css"}, 42]
+    with pytest.raises(PatchError, match="Malformed edit"):
+        apply_edits(PAGE, edits)
+
+
+def test_failed_section_falls_back_to_whole_text():
+    edits = [{"section": "html", "find": "<nav>", "replace": "<nav/>"},
+             {"section": "css", "find": "red", "replace": "blue"}]
+    patched = apply_edits(PAGE, edits, fallback={"html": "<main>whole</main>", "css": "ignored"})
+    assert patched == {**PAGE, "html": "<main>whole</main>", "css": "h1 { color: blue; }"}
+
+
+@pytest.mark.parametrize("fallback", [None, {"html": ""}, {"html": "   "}, {"html": 7}], ids=["none", "empty", "blank", "not_text"])
+def test_failed_section_without_usable_fallback_raises(fallback):
+    with pytest.raises(PatchError):
+        apply_edits(PAGE, [{"section": "html", "find": "<nav>", "replace": ""}], fallback=fallback)
+
+
+def test_resolve_edits_passes_full_replies_through():
+    reply = {"html": "<main/>", "css": "", "js": "", "explanation": "Rewrote it."}
+    assert _resolve_edits(reply, PAGE) is reply
+
+
+def test_resolve_edits_keeps_only_changed_sections():
+    reply = {"edits": [{"section": "css", "find": "red", "replace": "blue"}], "explanation": "Blue heading."}
+    assert _resolve_edits(reply, PAGE) == {
+        "html": "", "css": "h1 { color: blue; }", "js": "", "cleared": [], "explanation": "Blue heading.",
+    }
+
+
+def test_resolve_edits_falls_back_to_whole_section_in_reply():
+    reply = {"edits": [{"section": "html", "find": "<nav>", "replace": "<nav/>"}],
+             "html": "<main>whole</main>", "explanation": "Replaced the page."}
+    resolved = _resolve_edits(reply, PAGE)
+    assert resolved["html"] == "<main>whole</main>"
+    assert resolved["css"] == resolved["js"] == ""
+
+
+def test_resolve_edits_raises_without_whole_section():
+    with pytest.raises(PatchError):
+        _resolve_edits({"edits": [{"section": "html", "find": "<nav>", "replace": ""}]}, PAGE)
+
+
+def test_resolve_edits_lists_emptied_sections():
+    reply = {"edits": [{"section": "js", "find": "", "replace": ""}], "explanation": "Removed the animation."}
+    resolved = _resolve_edits(reply, PAGE)
+    assert resolved["js"] == ""
+    assert resolved["cleared"] == ["js"]
+
+
+def test_resolve_edits_applies_to_a_chat_without_code():
+    reply = {"edits": [{"section": "html", "find": "", "replace": "<main/>"}]}
+    assert _resolve_edits(reply, None)["html"] == "<main/>"
+
+
+@pytest.mark.anyio
+async def test_emptied_section_is_saved(mongo):
+    chat_id = (await get_collection(CHATS).insert_one({
+        "userId": "patch-user", "name": "Page", "messageCount": 0, "code": PAGE,
+    })).inserted_id
+    reply = {"edits": [{"section": "js", "find": "", "replace": ""},
+                       {"section": "css", "find": "red", "replace": "blue"}], "explanation": "No animation."}
+
+    await chat_service._save_turn(str(chat_id), Prompt(input="drop the animation"), _resolve_edits(reply, PAGE), PAGE)
+
+    chat = await get_collection(CHATS).find_one({"_id": chat_id})
+    assert chat["code"] == {**PAGE, "css": "h1 { color: blue; }", "js": ""}
@@ -0,0 +1,79 @@
+import pytest
+from bson import ObjectId
+
+from app.config.mongo import CHATS, get_collection
+from app.services import preview
+from app.utils.compression import ENCODERS
+
+pytestmark = pytest.mark.anyio
+
+CODE = {"html": "<main class='hero'>Fresh bread daily</main>" * 50, "css": "main { color: brown; }", "js": ""}
+
+
+@pytest.fixture
+async def preview_url(client):
+    response = await client.post("/chats/users/preview-user", json={"name": "Bakery"})
+    chat_id = response.json()["id"]
+    await get_collection(CHATS).update_one({"_id": ObjectId(chat_id)}, {"$set": {"code": CODE}})
+    return f"/chats/{chat_id}/preview"
+
+
+async def fetch(client, url, accept="identity", if_none_match=None):
+    headers = {"Accept-Encoding": accept}
+    if if_none_match:
+        headers["If-None-Match"] = if_none_match
+    return await client.get(url, headers=headers)
+
+
+async def test_each_coding_has_its_own_etag(client, preview_url):
+    etag = preview.preview_etag(CODE)
+    tags = {}
+    for coding in (*ENCODERS, "identity"):
+        response = await fetch(client, preview_url, coding)
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding", "identity") == coding
+        assert "Fresh bread daily" in response.text
+        assert response.headers["content-security-policy"] == "sandbox allow-scripts"
+        tags[coding] = response.headers["etag"]
+
+    assert tags["identity"] == etag
+    assert tags["gzip"] == etag[:-1] + '-gzip"'
+    assert len(set(tags.values())) == len(tags)
+
+
+async def test_any_variant_revalidates_without_rendering(client, preview_url):
+    tags = {coding: (await fetch(client, preview_url, coding)).headers["etag"] for coding in (*ENCODERS, "identity")}
+    preview._pages.clear()
+
+    for coding, tag in tags.items():
+        response = await fetch(client, preview_url, coding, tag)
+        assert response.status_code == 304
+        assert response.headers["etag"] == tag
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.headers["content-security-policy"] == "sandbox allow-scripts"
+    assert preview.preview_cache_stats()["size"] == 0
+
+
+async def test_if_none_match_uses_weak_comparison(client, preview_url):
+    etag = preview.preview_etag(CODE)
+    gzipped = etag[:-1] + '-gzip"'
+
+    weak = await fetch(client, preview_url, "gzip", f"W/{etag}")
+    assert (weak.status_code, weak.headers["etag"]) == (304, etag)
+    listed = await fetch(client, preview_url, "gzip", f'"stale", W/{gzipped}')
+    assert (listed.status_code, listed.headers["etag"]) == (304, gzipped)
+    star = await fetch(client, preview_url, "gzip", "*")
+    assert (star.status_code, star.headers["etag"]) == (304, etag)
+    stale = await fetch(client, preview_url, "gzip", '"stale", W/"stale-gzip"')
+    assert (stale.status_code, stale.headers["etag"]) == (200, gzipped)
+
+
+async def test_changed_code_gets_new_etags(client, preview_url):
+    old = (await fetch(client, preview_url, "gzip")).headers["etag"]
+    chat_id = preview_url.split("/")[2]
+    await get_collection(CHATS).update_one({"_id": ObjectId(chat_id)}, {"$set": {"code.js": "console.log(1)"}})
+
+    response = await fetch(client, preview_url, "gzip", old)
+
+    assert response.status_code == 200
+    assert response.headers["etag"] not in (old, old.replace("-gzip", ""))
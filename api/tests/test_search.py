@@ -0,0 +1,159 @@
+import uuid
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.config.indexes import ensure_indexes
+from app.config.mongo import CHAT_MESSAGES, CHATS, get_collection
+from app.repositories import chat as chats_repo, search as search_repo
+from app.services import search
+from app.services.search import search_chats_by_user_id, search_terms
+
+pytestmark = pytest.mark.anyio
+
+OWN, OTHER, GONE = ObjectId(), ObjectId(), ObjectId()
+
+
+def chat(chat_id, name, score, **snippets):
+    return {"_id": chat_id, "name": name, "score": score,
+            "snippets": {field: snippets.get(field) for field in search_repo.CHAT_FIELDS}}
+
+
+def bucket(chat_id, score, *snippets):
+    return {"chatId": chat_id, "score": score,
+            "messages": [{"id": f"m{seq}", "type": "human", "seq": seq, "snippet": snippet}
+                         for seq, snippet in enumerate(snippets)]}
+
+
+@pytest.fixture
+def repos(monkeypatch):
+    """Stub the repository searches with canned results; record what they are asked for."""
+    results = {"chats": [], "buckets": [], "names": {OWN: "Own chat", OTHER: "Other chat"}}
+    calls = []
+
+    async def search_chats(user_id, query, terms, limit, snippet_chars):
+        calls.append(("chats", terms, limit))
+        return results["chats"][:limit]
+
+    async def search_messages(user_id, query, terms, limit, snippet_chars, per_bucket):
+        calls.append(("messages", terms, limit))
+        return results["buckets"][:limit]
+
+    async def find_chat_names(user_id, chat_ids):
+        return {chat_id: name for chat_id, name in results["names"].items() if chat_id in chat_ids}
+
+    monkeypatch.setattr(search_repo, "search_chats", search_chats)
+    monkeypatch.setattr(search_repo, "search_messages", search_messages)
+    monkeypatch.setattr(chats_repo, "find_chat_names", find_chat_names)
+    results["calls"] = calls
+    return results
+
+
+def test_search_terms():
+    assert search_terms('Flex-Box "Grid layout" -table grid') == ["flex", "box", "grid", "layout"]
+    assert search_terms("-only -negated") == []
+
+
+async def test_hits_are_merged_by_score(repos):
+    repos["chats"] = [chat(OWN, "Own chat", 2.0, html="<div class=grid>"), chat(OTHER, "Other chat", 0.5, js="grid()")]
+    repos["buckets"] = [bucket(OTHER, 1.5, "a grid here", "and a grid there")]
+
+    page = await search_chats_by_user_id("user", "grid")
+
+    assert [(hit["kind"], hit["chat_id"], hit["score"]) for hit in page["hits"]] == [
+        ("chat", str(OWN), 2.0), ("message", str(OTHER), 1.5), ("message", str(OTHER), 1.5), ("chat", str(OTHER), 0.5),
+    ]
+    assert [hit.get("message_id") for hit in page["hits"][1:3]] == ["m0", "m1"]
+    assert page["hits"][1]["name"] == "Other chat"
+    assert page["next_offset"] is None
+
+
+async def test_message_hits_of_unknown_chats_are_dropped(repos):
+    # A bucket can outlive its chat, or carry a stale userId; only chats the
+    # user still owns are reported.
+    repos["buckets"] = [bucket(GONE, 3.0, "grid"), bucket(OWN, 1.0, "grid")]
+
+    page = await search_chats_by_user_id("user", "grid")
+
+    assert [(hit["chat_id"], hit["name"]) for hit in page["hits"]] == [(str(OWN), "Own chat")]
+
+
+async def test_chat_hit_snippet_falls_back_to_the_name(repos):
+    repos["chats"] = [chat(OWN, "Own chat", 1.0, css=".grid {}", js="grid()"), chat(OTHER, "Other chat", 0.9)]
+
+    hits = (await search_chats_by_user_id("user", "grid"))["hits"]
+
+    assert [(hit["field"], hit["snippet"]) for hit in hits] == [("css", ".grid {}"), ("name", "Other chat")]
+
+
+async def test_pages_through_the_ranked_hits(repos):
+    repos["chats"] = [chat(ObjectId(), f"Chat {i}", 10.0 - i) for i in range(5)]
+    repos["names"] = {}
+
+    first = await search_chats_by_user_id("user", "chat", limit=2)
+    second = await search_chats_by_user_id("user", "chat", limit=2, offset=first["next_offset"])
+    last = await search_chats_by_user_id("user", "chat", limit=2, offset=second["next_offset"])
+
+    assert [hit["name"] for page in (first, second, last) for hit in page["hits"]] == [f"Chat {i}" for i in range(5)]
+    assert (first["next_offset"], second["next_offset"], last["next_offset"]) == (2, 4, None)
+    # Each page asks both searches for everything up to its end.
+    assert [limit for kind, _, limit in repos["calls"] if kind == "chats"] == [2, 4, 6]
+
+
+async def test_a_full_bucket_page_means_there_may_be_more(repos):
+    repos["buckets"] = [bucket(OWN, 1.0, "grid"), bucket(OWN, 0.5, "grid")]
+
+    page = await search_chats_by_user_id("user", "grid", limit=2)
+
+    assert len(page["hits"]) == 2 and page["next_offset"] == 2
+
+
+async def test_rejects_queries_without_terms_and_deep_pages(repos, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_MAX_RESULTS", 50)
+    with pytest.raises(HTTPException) as error:
+        await search_chats_by_user_id("user", "-grid")
+    assert error.value.status_code == 400
+    with pytest.raises(HTTPException) as error:
+        await search_chats_by_user_id("user", "grid", limit=20, offset=40)
+    assert error.value.status_code == 400
+    assert repos["calls"] == []
+
+
+async def test_repository_failures_are_reported(repos, monkeypatch):
+    async def broken(*args):
+        raise RuntimeError("text index required")
+
+    monkeypatch.setattr(search_repo, "search_messages", broken)
+    with pytest.raises(HTTPException) as error:
+        await search_chats_by_user_id("user", "grid")
+    assert error.value.status_code == 500
+
+
+async def test_snippets_come_from_the_server(real_mongo):
+    user_id, stranger = f"search-{uuid.uuid4()}", f"search-{uuid.uuid4()}"
+    filler = "x" * 500
+    chats = get_collection(CHATS)
+    buckets = get_collection(CHAT_MESSAGES)
+    await ensure_indexes()
+    try:
+        own = (await chats.insert_one({"userId": user_id, "name": "Landing page", "code": {
+            "html": f"<main>{filler}<section class='Pricing'>plans</section>{filler}</main>", "css": "", "js": ""}})).inserted_id
+        await chats.insert_one({"userId": stranger, "name": "Pricing", "code": {}})
+        await buckets.insert_one({"chatId": own, "userId": user_id, "bucket": 0, "count": 2, "messages": [
+            {"id": "a", "type": "human", "seq": 0, "content": "make it pop"},
+            {"id": "b", "type": "human", "seq": 1, "content": f"{filler} add a pricing table {filler}"},
+        ]})
+
+        page = await search_chats_by_user_id(user_id, "pricing", limit=10)
+
+        by_kind = {hit["kind"]: hit for hit in page["hits"]}
+        assert sorted(by_kind) == ["chat", "message"] and len(page["hits"]) == 2
+        assert by_kind["chat"]["field"] == "html" and "Pricing" in by_kind["chat"]["snippet"]
+        assert len(by_kind["chat"]["snippet"]) == search.SEARCH_SNIPPET_CHARS
+        assert by_kind["message"]["message_id"] == "b" and "pricing table" in by_kind["message"]["snippet"]
+        assert by_kind["message"]["name"] == "Landing page"
+        assert page["hits"] == sorted(page["hits"], key=lambda hit: -hit["score"])
+    finally:
+        await chats.delete_many({"userId": {"$in": [user_id, stranger]}})
+        await buckets.delete_many({"userId": user_id})
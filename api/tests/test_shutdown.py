@@ -0,0 +1,51 @@
+import asyncio
+import signal
+
+import httpx
+import pytest
+
+from app import main
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sigterms():
+    """Replace the SIGTERM handler (uvicorn's, when served) with one recording each signal."""
+    received = []
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+    yield received
+    signal.signal(signal.SIGTERM, previous)
+
+
+async def test_sigterm_reports_draining_before_handing_over(rsa_keys, sigterms, monkeypatch):
+    monkeypatch.setattr(main, "SHUTDOWN_PRESTOP_DELAY", 0.2)
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/ready")).status_code == 200
+
+            signal.raise_signal(signal.SIGTERM)
+            ready = await client.get("/ready")
+            assert ready.status_code == 503
+            assert ready.json() == {"status": "draining"}
+            assert sigterms == []
+
+            await asyncio.sleep(0.4)
+            assert sigterms == [signal.SIGTERM]
+
+
+async def test_second_sigterm_hands_over_at_once(rsa_keys, sigterms, monkeypatch):
+    monkeypatch.setattr(main, "SHUTDOWN_PRESTOP_DELAY", 60)
+    async with main.lifespan(main.app):
+        signal.raise_signal(signal.SIGTERM)
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.sleep(0.05)
+        assert sigterms == [signal.SIGTERM]
+
+
+async def test_shutdown_restores_the_previous_handler(rsa_keys, sigterms):
+    handler = signal.getsignal(signal.SIGTERM)
+    async with main.lifespan(main.app):
+        assert signal.getsignal(signal.SIGTERM) is not handler
+    assert signal.getsignal(signal.SIGTERM) is handler
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from bson import ObjectId
+
+from app.config.mongo import CHAT_MESSAGES, CHATS, get_collection
+from app.models.chat import Prompt
+from app.services import chat as chat_service
+from benchmarks.common import DEFAULT_REPLY, FakeGeminiModel
+
+pytestmark = pytest.mark.anyio
+
+USER = "stream-user"
+
+
+@pytest.fixture
+async def model(client, monkeypatch):
+    """Answer every generation from a fake streaming model; set its ``reply`` per test."""
+    from app.services import gemini
+
+    fake = FakeGeminiModel(reply=DEFAULT_REPLY, chunk_size=24)
+    monkeypatch.setattr(gemini, "build_model", lambda token: fake)
+    gemini._chains.clear()
+    response = await client.post(f"/chats/users/{USER}/token", json={"token": "test-token"})
+    assert response.status_code == 200
+    yield fake
+    gemini._chains.clear()
+
+
+async def new_chat(client) -> str:
+    return (await client.post(f"/chats/users/{USER}", json={"name": "New Chat"})).json()["id"]
+
+
+async def stream(client, chat_id: str, text: str):
+    """Return the stream's events as ``(event, data)`` pairs."""
+    response = await client.post(f"/chats/{chat_id}/messages/{USER}/stream", json={"input": text})
+    assert response.status_code == 200
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def comparable(body: dict) -> dict:
+    # Message ids and snapshot references differ between turns.
+    message = {field: body["message"][field] for field in ("type", "content", "partial")}
+    return {"name": body["name"], "code": body["code"], "message": message}
+
+
+async def test_partials_then_done_like_the_post_route(client, model):
+    streamed, posted = await new_chat(client), await new_chat(client)
+
+    events = await stream(client, streamed, "Say hello")
+    response = await client.post(f"/chats/{posted}/messages/{USER}", json={"input": "Say hello"})
+
+    kinds = [event for event, _ in events]
+    assert kinds[-1] == "done" and set(kinds[:-1]) == {"partial"} and len(kinds) > 2
+    partials = [data for event, data in events if event == "partial"]
+    assert partials[-1]["explanation"] == "Added a heading."
+    assert "explanation" not in partials[0]
+    assert comparable(events[-1][1]) == comparable(response.json())
+    chat = (await client.get(f"/chats/{streamed}")).json()
+    assert chat["message_count"] == 2 and chat["code"]["html"] == json.loads(DEFAULT_REPLY)["html"]
+
+
+@pytest.mark.parametrize("reply", [DEFAULT_REPLY[:-20], "", "Sorry, I can't help with that."])
+async def test_unfinished_reply_is_an_error(client, model, reply):
+    model.reply = reply
+    chat_id = await new_chat(client)
+
+    events = await stream(client, chat_id, "Say hello")
+
+    assert events[-1] == ("error", {"detail": "AI response generation failed"})
+    assert "done" not in [event for event, _ in events]
+    chat = await get_collection(CHATS).find_one({"_id": ObjectId(chat_id)})
+    assert chat["messageCount"] == 0 and chat["name"] == "New Chat"
+
+
+async def test_disconnect_saves_a_partial_turn(client, model):
+    chat_id = await new_chat(client)
+    await get_collection(CHATS).update_one({"_id": ObjectId(chat_id)}, {"$set": {"code.html": "<main>Old</main>"}})
+
+    events = await chat_service.stream_message_by_chat_id(Prompt(input="Say hello"), chat_id, USER)
+    received = [await events.__anext__() for _ in range(3)]
+    await events.aclose()
+    await chat_service.drain_background_tasks(timeout=5)
+
+    assert all(event.startswith("event: partial") for event in received)
+    bucket = await get_collection(CHAT_MESSAGES).find_one({"chatId": ObjectId(chat_id)})
+    user_message, ai_message = bucket["messages"]
+    assert (user_message["content"], user_message["partial"]) == ("Say hello", False)
+    assert ai_message["type"] == "ai" and ai_message["partial"] is True
+    chat = (await client.get(f"/chats/{chat_id}")).json()
+    assert chat["message_count"] == 2
+    assert chat["code"]["html"] == "<main>Old</main>"